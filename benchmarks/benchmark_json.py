@@ -0,0 +1,99 @@
+""" Benchmark writing the info about every photo in a library as JSON
+    Times the way the command line utility printed JSON previously (PhotoInfo.json()
+    for each photo, joined into one string) and _write_json writing a JSON array and
+    NDJSON with json and, if it's installed, orjson, on a synthetic large library
+    (see synthetic.py), and reports photos written per second
+
+    python benchmarks/benchmark_json.py [--copies N] [--repeat N] """
+
+import argparse
+import os
+import os.path
+import tempfile
+import time
+
+import osxphotos
+from osxphotos._jsonwriter import _ORJSON_AVAILABLE, _write_json
+
+from synthetic import make_synthetic_library
+
+
+def write_joined(photos, file):
+    """ writes photos as a JSON array the way print_photo_info did previously
+        returns number of photos written """
+    rows = [p.json() for p in photos]
+    file.write(("[" + ", ".join(rows) + "]\n").encode("utf-8"))
+    return len(rows)
+
+
+def time_writers(photosdb, writers, repeat):
+    """ returns dict of name: (number of photos, best time in seconds) to write all the
+        photos in photosdb with each writer in writers, a dict of name: write(photos, binary
+        file); the writers take turns so a slow down part way through affects all of them """
+    best = {}
+    with open(os.devnull, "wb") as devnull:
+        for _ in range(repeat):
+            for name, write in writers.items():
+                # new PhotoInfo objects each time so no values are cached from the last run
+                photosdb._photoinfos.clear()
+                start = time.perf_counter()
+                count = write(photosdb.iter_photos(movies=True), devnull)
+                elapsed = time.perf_counter() - start
+                if name not in best or elapsed < best[name][1]:
+                    best[name] = (count, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON output")
+    parser.add_argument(
+        "--copies",
+        type=int,
+        default=14285,
+        help="number of copies of the test library photos in the synthetic library "
+        "(the default gives 100,000 photos)",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="number of times to time each writer"
+    )
+    args = parser.parse_args()
+
+    writers = {
+        "json() joined": write_joined,
+        "array, json": lambda photos, f: _write_json(photos, f, use_orjson=False),
+        "ndjson, json": lambda photos, f: _write_json(
+            photos, f, ndjson=True, use_orjson=False
+        ),
+    }
+    if _ORJSON_AVAILABLE:
+        writers["array, orjson"] = lambda photos, f: _write_json(
+            photos, f, use_orjson=True
+        )
+        writers["ndjson, orjson"] = lambda photos, f: _write_json(
+            photos, f, ndjson=True, use_orjson=True
+        )
+    else:
+        print("orjson is not installed, skipping the orjson writers")
+
+    with tempfile.TemporaryDirectory(prefix="osxphotos_") as tempdir:
+        library = make_synthetic_library(
+            os.path.join(tempdir, "synthetic.photoslibrary"), args.copies
+        )
+        photosdb = osxphotos.PhotosDB(library)
+
+        # resolve the edited and live photo paths once so every writer finds them
+        # in the resource index
+        for p in photosdb.iter_photos(movies=True):
+            p.path_edited, p.path_live_photo
+
+        for name, (count, elapsed) in time_writers(
+            photosdb, writers, args.repeat
+        ).items():
+            print(
+                f"  {name:<16} {count:>8} photos {elapsed:8.3f} s "
+                f"{count / elapsed:>12,.0f} photos/s"
+            )
+
+
+if __name__ == "__main__":
+    main()
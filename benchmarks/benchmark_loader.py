@@ -0,0 +1,65 @@
+""" Benchmark the PhotosDB database loaders
+    Times each loader on the Test-10.15.1 test library and on a synthetic large library
+    built by cloning the photos in the test library (see synthetic.py)
+    and reports photos loaded per second
+
+    python benchmarks/benchmark_loader.py [--copies N] [--repeat N] """
+
+import argparse
+import os.path
+import tempfile
+import time
+
+import osxphotos
+from osxphotos.photosdb import _LOADERS
+
+from synthetic import TEST_LIBRARY, make_synthetic_library
+
+
+def time_loader(library, loader, repeat):
+    """ returns (number of photos, best time in seconds) to open library with loader """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        photosdb = osxphotos.PhotosDB(library, loader=loader)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return (len(photosdb._dbphotos), best)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PhotosDB loaders")
+    parser.add_argument(
+        "--copies",
+        type=int,
+        default=5000,
+        help="number of copies of the test library photos in the synthetic library",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="number of times to time each loader"
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="osxphotos_") as tempdir:
+        # work on copies so the test library isn't touched
+        libraries = {
+            "Test-10.15.1": make_synthetic_library(
+                os.path.join(tempdir, "test.photoslibrary"), 0
+            ),
+            f"synthetic ({args.copies} copies)": make_synthetic_library(
+                os.path.join(tempdir, "synthetic.photoslibrary"), args.copies
+            ),
+        }
+
+        for name, library in libraries.items():
+            print(f"{name}:")
+            for loader in _LOADERS:
+                (count, elapsed) = time_loader(library, loader, args.repeat)
+                print(
+                    f"  {loader:<12} {count:>8} photos {elapsed:8.3f} s "
+                    f"{count / elapsed:>12,.0f} photos/s"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+""" Benchmark the memory used to hold the information about each photo
+    Loads a synthetic large library (see synthetic.py) and compares the bytes per photo
+    used by the per-photo _PhotoRecord with the bytes per photo used by a dict holding
+    the same information (how PhotosDB stored it previously)
+    The field values are shared by both so only the container is measured
+
+    Also compares the keyword, person, and album indexes (_LabelIndex) with the dicts of
+    lists of uuids and names PhotosDB used previously, where every row read from the
+    database had its own copy of the uuid and name strings
+
+    python benchmarks/benchmark_memory.py [--copies N] """
+
+import argparse
+import os.path
+import sys
+import tempfile
+import tracemalloc
+
+import osxphotos
+from osxphotos._labelindex import _LabelIndex
+from osxphotos._photorecord import _PHOTO_RECORD_SLOTS, _PhotoRecord
+
+from synthetic import make_synthetic_library
+
+
+def copy_record(record):
+    """ returns a new _PhotoRecord with the same fields as record """
+    copy = _PhotoRecord()
+    for field in _PHOTO_RECORD_SLOTS:
+        if hasattr(record, field):
+            setattr(copy, field, getattr(record, field))
+    return copy
+
+
+def copy_str(s):
+    """ returns a new str object equal to s, like each row read from sqlite """
+    return s.encode().decode()
+
+
+def label_dicts(photosdb, index):
+    """ returns (dict of uuid: list of labels, dict of label: list of uuids) for index
+        with a new copy of each string as PhotosDB built them previously """
+    by_uuid = {}
+    by_label = {}
+    for label in index.labels():
+        for asset_id in index.asset_ids(label):
+            uuid = photosdb._asset_uuids[asset_id]
+            by_uuid.setdefault(uuid, []).append(copy_str(label))
+            by_label.setdefault(label, []).append(copy_str(uuid))
+    return (by_uuid, by_label)
+
+
+def label_index(photosdb, index):
+    """ returns a new _LabelIndex with the same labels and photos as index """
+    copy = _LabelIndex()
+    for label in index.labels():
+        for asset_id in index.asset_ids(label):
+            copy.add(asset_id, copy_str(label))
+    return copy
+
+
+def traced_bytes(build):
+    """ returns (object returned by build(), bytes allocated while building it) """
+    tracemalloc.start()
+    try:
+        obj = build()
+        (current, _) = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return (obj, current)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-photo memory use")
+    parser.add_argument(
+        "--copies",
+        type=int,
+        default=5000,
+        help="number of copies of the test library photos in the synthetic library",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="osxphotos_") as tempdir:
+        library = make_synthetic_library(
+            os.path.join(tempdir, "synthetic.photoslibrary"), args.copies
+        )
+        photosdb = osxphotos.PhotosDB(library)
+        records = list(photosdb._dbphotos.values())
+
+    count = len(records)
+    fields = sum(len(record) for record in records) / count
+    print(f"{count} photos, {fields:.1f} fields per photo")
+
+    (dicts, dict_bytes) = traced_bytes(
+        lambda: [
+            {
+                field: getattr(record, field)
+                for field in _PHOTO_RECORD_SLOTS
+                if hasattr(record, field)
+            }
+            for record in records
+        ]
+    )
+    (copies, record_bytes) = traced_bytes(
+        lambda: [copy_record(record) for record in records]
+    )
+    for (name, objs, traced) in [
+        ("dict", dicts, dict_bytes),
+        ("_PhotoRecord", copies, record_bytes),
+    ]:
+        print(
+            f"  {name:<12} {traced / count:8.1f} bytes/photo (traced) "
+            f"{sys.getsizeof(objs[0]):6} bytes (getsizeof)"
+        )
+
+    print("keyword, person, and album indexes:")
+    indexes = [photosdb._dbkeywords, photosdb._dbfaces, photosdb._dbalbums]
+    (_, dict_bytes) = traced_bytes(
+        lambda: [label_dicts(photosdb, index) for index in indexes]
+    )
+    (_, index_bytes) = traced_bytes(
+        lambda: [label_index(photosdb, index) for index in indexes]
+    )
+    for (name, traced) in [("dict", dict_bytes), ("_LabelIndex", index_bytes)]:
+        print(f"  {name:<12} {traced / count:8.1f} bytes/photo (traced)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+""" Build a synthetic large Photos 5 library for benchmarking
+    The assets in a small library (by default the Test-10.15.1 test library) are cloned
+    many times along with their keywords, faces, albums, and resources """
+
+import os.path
+import shutil
+import sqlite3
+
+TEST_LIBRARY = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "..",
+    "tests",
+    "Test-10.15.1.photoslibrary",
+)
+
+# table: (column to restrict to the original rows, {column: expression for the copy})
+# {TABLE} is replaced with max(Z_PK) + 1 of TABLE and k is the copy number
+_CLONE_TABLES = {
+    "ZGENERICASSET": (
+        "Z_PK",
+        {
+            "Z_PK": "Z_PK + k * {ZGENERICASSET}",
+            "ZUUID": "ZUUID || '-' || k",
+            "ZADDITIONALATTRIBUTES": "ZADDITIONALATTRIBUTES + k * {ZADDITIONALASSETATTRIBUTES}",
+        },
+    ),
+    "ZADDITIONALASSETATTRIBUTES": (
+        "Z_PK",
+        {
+            "Z_PK": "Z_PK + k * {ZADDITIONALASSETATTRIBUTES}",
+            "ZASSET": "ZASSET + k * {ZGENERICASSET}",
+            "ZMASTERFINGERPRINT": "ZMASTERFINGERPRINT || '-' || k",
+        },
+    ),
+    "ZDETECTEDFACE": (
+        "Z_PK",
+        {
+            "Z_PK": "Z_PK + k * {ZDETECTEDFACE}",
+            "ZASSET": "ZASSET + k * {ZGENERICASSET}",
+        },
+    ),
+    "ZINTERNALRESOURCE": (
+        "Z_PK",
+        {
+            "Z_PK": "Z_PK + k * {ZINTERNALRESOURCE}",
+            "ZASSET": "ZASSET + k * {ZGENERICASSET}",
+            "ZFINGERPRINT": "ZFINGERPRINT || '-' || k",
+        },
+    ),
+    "Z_1KEYWORDS": (
+        "Z_1ASSETATTRIBUTES",
+        {"Z_1ASSETATTRIBUTES": "Z_1ASSETATTRIBUTES + k * {ZADDITIONALASSETATTRIBUTES}"},
+    ),
+    "Z_26ASSETS": ("Z_34ASSETS", {"Z_34ASSETS": "Z_34ASSETS + k * {ZGENERICASSET}"}),
+}
+
+# table whose Z_PK offset is used for the tables without a Z_PK
+_OFFSET_TABLES = {
+    "Z_1KEYWORDS": "ZADDITIONALASSETATTRIBUTES",
+    "Z_26ASSETS": "ZGENERICASSET",
+}
+
+
+def make_synthetic_library(dest, copies, library=TEST_LIBRARY):
+    """ create a library at dest with copies + 1 copies of each photo in library
+        library must be a Photos 5 library
+        returns path to the new library """
+
+    shutil.copytree(os.path.join(library, "database"), os.path.join(dest, "database"))
+    conn = sqlite3.connect(os.path.join(dest, "database", "Photos.sqlite"))
+    c = conn.cursor()
+
+    # the library's triggers call functions only Photos provides
+    c.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+    for (trigger,) in c.fetchall():
+        c.execute(f'DROP TRIGGER "{trigger}"')
+
+    if not copies:
+        conn.commit()
+        conn.close()
+        return dest
+
+    offsets = {}
+    for table in _CLONE_TABLES:
+        if table not in _OFFSET_TABLES:
+            c.execute(f"SELECT max(Z_PK) + 1 FROM {table}")
+            offsets[table] = c.fetchone()[0] or 1
+
+    for table, (key, exprs) in _CLONE_TABLES.items():
+        c.execute(f"PRAGMA table_info({table})")
+        columns = [row[1] for row in c.fetchall()]
+        select = ", ".join(exprs.get(col, col).format(**offsets) for col in columns)
+        limit = offsets[_OFFSET_TABLES.get(table, table)]
+        c.execute(
+            f"WITH RECURSIVE copies(k) AS "
+            f"(SELECT 1 UNION ALL SELECT k + 1 FROM copies WHERE k < ?) "
+            f"INSERT INTO {table} SELECT {select} FROM {table}, copies WHERE {key} < ?",
+            (copies, limit),
+        )
+
+    conn.commit()
+    conn.close()
+    return dest
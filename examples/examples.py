@@ -25,11 +25,9 @@ def main():
     print(f"found {len(photos)} photos")
 
     # find all photos that include Katie but do not contain the keyword wedding
-    photos = [
-        p
-        for p in photosdb.photos(persons=["Katie"])
-        if p not in photosdb.photos(keywords=["wedding"])
-    ]
+    photos = photosdb.difference(
+        photosdb.photos(persons=["Katie"]), photosdb.photos(keywords=["wedding"])
+    )
 
     # get all photos in the database
     photos = photosdb.photos()
@@ -1,5 +1,6 @@
 import csv
 import datetime
+import itertools
 import json
 import os
 import os.path
@@ -12,6 +13,9 @@ import yaml
 import osxphotos
 
 from ._constants import _EXIF_TOOL_URL, _PHOTOS_5_VERSION
+from ._jsonwriter import _write_json
+from ._queryexpr import _QueryPlan
+from .photosdb import _SORT_FIELDS
 from ._version import __version__
 from .utils import create_path_by_date, _copy_file
 
@@ -51,11 +55,12 @@ def get_photos_db(*db_options):
 
 # Click CLI object & context settings
 class CLI_Obj:
-    def __init__(self, db=None, json=False, debug=False):
+    def __init__(self, db=None, json=False, debug=False, use_cache=False):
         if debug:
             osxphotos._set_debug(True)
         self.db = db
         self.json = json
+        self.use_cache = use_cache
 
 
 CTX_SETTINGS = dict(help_option_names=["-h", "--help"])
@@ -85,6 +90,24 @@ JSON_OPTION = click.option(
     help="Print output in JSON format.",
 )
 
+NDJSON_OPTION = click.option(
+    "--ndjson",
+    required=False,
+    is_flag=True,
+    default=False,
+    help="Print output as newline delimited JSON, one photo per line.",
+)
+
+
+def _check_where(ctx, param, value):
+    """ click callback that checks the --where expression is valid before the library is read """
+    if value is not None:
+        try:
+            _QueryPlan(value)
+        except ValueError as e:
+            raise click.BadParameter(e.args[0])
+    return value
+
 
 def query_options(f):
     o = click.option
@@ -111,6 +134,41 @@ def query_options(f):
             is_flag=True,
             help="Search for photos with no description.",
         ),
+        o(
+            "--text",
+            default=None,
+            multiple=True,
+            help="Search for words in title, description, keywords, persons, or albums of photo. "
+            "Case is ignored; all words must match; use word* for words starting with word "
+            'and "two words" for a phrase.',
+        ),
+        o(
+            "--where",
+            default=None,
+            metavar="EXPR",
+            callback=_check_where,
+            help="Search for photos matching boolean query expression EXPR, e.g. "
+            "'keyword:Kids AND (person:Katie OR album:\"Pumpkin Farm\") AND NOT hidden'. "
+            "Terms are keyword:, person:, album:, uuid:, or text: followed by a value "
+            "(quoted if it has spaces) or a flag such as favorite, hidden, missing, edited, "
+            "shared, burst, or live; combine terms with AND, OR, NOT, and parentheses.",
+        ),
+        o(
+            "--near",
+            default=None,
+            nargs=3,
+            type=float,
+            metavar="LATITUDE LONGITUDE KM",
+            help="Search for photos taken within KM kilometers of LATITUDE LONGITUDE (in degrees).",
+        ),
+        o(
+            "--bbox",
+            default=None,
+            nargs=4,
+            type=float,
+            metavar="MIN_LAT MIN_LON MAX_LAT MAX_LON",
+            help="Search for photos taken inside the box bounded by MIN_LAT MIN_LON MAX_LAT MAX_LON (in degrees).",
+        ),
         o(
             "--uti",
             default=None,
@@ -183,6 +241,39 @@ def query_options(f):
             help="Search by end item date, e.g. 2000-01-12T12:00:00 or 2000-12-31 (ISO 8601 w/o TZ).",
             type=click.DateTime(),
         ),
+        o(
+            "--sort-by",
+            default=None,
+            type=click.Choice(list(_SORT_FIELDS)),
+            help="Sort the photos found by FIELD; photos without a value come last.",
+            metavar="FIELD",
+        ),
+        o(
+            "--descending",
+            is_flag=True,
+            help="Sort in descending order, e.g. newest first with --sort-by date.",
+        ),
+        o(
+            "--limit",
+            default=None,
+            type=click.IntRange(min=0),
+            help="Return at most N photos, e.g. --sort-by date --descending --limit 50 for the 50 newest.",
+            metavar="N",
+        ),
+        o(
+            "--offset",
+            default=0,
+            type=click.IntRange(min=0),
+            help="Skip the first N photos found (after sorting), e.g. for the next page after --limit.",
+            metavar="N",
+        ),
+        o(
+            "--prefilter",
+            is_flag=True,
+            help="Only read the photos that could match the search from the library, "
+            "which is faster for a single search of a large library. "
+            "Ignored with --use-cache.",
+        ),
     ]
     for o in options[::-1]:
         f = o(f)
@@ -193,10 +284,18 @@ def query_options(f):
 @DB_OPTION
 @JSON_OPTION
 @click.option("--debug", required=False, is_flag=True, default=False, hidden=True)
+@click.option(
+    "--use-cache",
+    required=False,
+    is_flag=True,
+    default=False,
+    help="Save a snapshot of the Photos library to disk and reuse it "
+    "on subsequent runs if the library has not changed.",
+)
 @click.version_option(__version__, "--version", "-v")
 @click.pass_context
-def cli(ctx, db, json_, debug):
-    ctx.obj = CLI_Obj(db=db, json=json_, debug=debug)
+def cli(ctx, db, json_, debug, use_cache):
+    ctx.obj = CLI_Obj(db=db, json=json_, debug=debug, use_cache=use_cache)
 
 
 @cli.command()
@@ -215,7 +314,7 @@ def keywords(ctx, cli_obj, db, json_, photos_library):
         _list_libraries()
         return
 
-    photosdb = osxphotos.PhotosDB(dbfile=db)
+    photosdb = osxphotos.PhotosDB(dbfile=db, use_cache=cli_obj.use_cache)
     keywords = {"keywords": photosdb.keywords_as_dict}
     if json_ or cli_obj.json:
         click.echo(json.dumps(keywords))
@@ -239,7 +338,7 @@ def albums(ctx, cli_obj, db, json_, photos_library):
         _list_libraries()
         return
 
-    photosdb = osxphotos.PhotosDB(dbfile=db)
+    photosdb = osxphotos.PhotosDB(dbfile=db, use_cache=cli_obj.use_cache)
     albums = {"albums": photosdb.albums_as_dict}
     if photosdb.db_version >= _PHOTOS_5_VERSION:
         albums["shared albums"] = photosdb.albums_shared_as_dict
@@ -266,7 +365,7 @@ def persons(ctx, cli_obj, db, json_, photos_library):
         _list_libraries()
         return
 
-    photosdb = osxphotos.PhotosDB(dbfile=db)
+    photosdb = osxphotos.PhotosDB(dbfile=db, use_cache=cli_obj.use_cache)
     persons = {"persons": photosdb.persons_as_dict}
     if json_ or cli_obj.json:
         click.echo(json.dumps(persons))
@@ -290,28 +389,19 @@ def info(ctx, cli_obj, db, json_, photos_library):
         _list_libraries()
         return
 
-    pdb = osxphotos.PhotosDB(dbfile=db)
+    pdb = osxphotos.PhotosDB(dbfile=db, use_cache=cli_obj.use_cache)
     info = {}
     info["database_path"] = pdb.db_path
     info["database_version"] = pdb.db_version
 
-    photos = pdb.photos()
-    not_shared_photos = [p for p in photos if not p.shared]
-    info["photo_count"] = len(not_shared_photos)
-
-    hidden = [p for p in photos if p.hidden]
-    info["hidden_photo_count"] = len(hidden)
-
-    movies = pdb.photos(images=False, movies=True)
-    not_shared_movies = [p for p in movies if not p.shared]
-    info["movie_count"] = len(not_shared_movies)
+    # counted from the PhotosDB indexes without creating a PhotoInfo for each photo
+    info["photo_count"] = pdb.count(shared=False)
+    info["hidden_photo_count"] = pdb.count(hidden=True)
+    info["movie_count"] = pdb.count(images=False, movies=True, shared=False)
 
     if pdb.db_version >= _PHOTOS_5_VERSION:
-        shared_photos = [p for p in photos if p.shared]
-        info["shared_photo_count"] = len(shared_photos)
-
-        shared_movies = [p for p in movies if p.shared]
-        info["shared_movie_count"] = len(shared_movies)
+        info["shared_photo_count"] = pdb.count(shared=True)
+        info["shared_movie_count"] = pdb.count(images=False, movies=True, shared=True)
 
     keywords = pdb.keywords_as_dict
     info["keywords_count"] = len(keywords)
@@ -350,10 +440,11 @@ def info(ctx, cli_obj, db, json_, photos_library):
 @cli.command()
 @DB_OPTION
 @JSON_OPTION
+@NDJSON_OPTION
 @DB_ARGUMENT
 @click.pass_obj
 @click.pass_context
-def dump(ctx, cli_obj, db, json_, photos_library):
+def dump(ctx, cli_obj, db, json_, ndjson, photos_library):
     """ Print list of all photos & associated info from the Photos library. """
 
     db = get_photos_db(*photos_library, db, cli_obj.db)
@@ -363,9 +454,9 @@ def dump(ctx, cli_obj, db, json_, photos_library):
         _list_libraries()
         return
 
-    pdb = osxphotos.PhotosDB(dbfile=db)
-    photos = pdb.photos(movies=True)
-    print_photo_info(photos, json_ or cli_obj.json)
+    pdb = osxphotos.PhotosDB(dbfile=db, use_cache=cli_obj.use_cache)
+    photos = pdb.iter_photos(movies=True)
+    print_photo_info(photos, json_ or cli_obj.json, ndjson=ndjson)
 
 
 @cli.command(name="list")
@@ -419,6 +510,7 @@ def _list_libraries(json_=False, error=True):
 @cli.command()
 @DB_OPTION
 @JSON_OPTION
+@NDJSON_OPTION
 @query_options
 @click.option("--missing", is_flag=True, help="Search for photos missing from disk.")
 @click.option(
@@ -462,8 +554,13 @@ def query(
     no_title,
     description,
     no_description,
+    text,
+    where,
+    near,
+    bbox,
     ignore_case,
     json_,
+    ndjson,
     edited,
     external_edit,
     favorite,
@@ -487,6 +584,11 @@ def query(
     not_incloud,
     from_date,
     to_date,
+    sort_by,
+    descending,
+    limit,
+    offset,
+    prefilter,
 ):
     """ Query the Photos database using 1 or more search options; 
         if more than one option is provided, they are treated as "AND" 
@@ -500,6 +602,10 @@ def query(
         person,
         album,
         uuid,
+        text,
+        where,
+        near,
+        bbox,
         edited,
         external_edit,
         uti,
@@ -539,7 +645,8 @@ def query(
         _list_libraries()
         return
 
-    photos = _query(
+    cli_use_cache = cli_obj.use_cache if cli_obj is not None else False
+    query_args = dict(
         db=db,
         keyword=keyword,
         person=person,
@@ -549,6 +656,10 @@ def query(
         no_title=no_title,
         description=description,
         no_description=no_description,
+        text=text,
+        where=where,
+        near=near,
+        bbox=bbox,
         ignore_case=ignore_case,
         edited=edited,
         external_edit=external_edit,
@@ -573,11 +684,18 @@ def query(
         not_incloud=not_incloud,
         from_date=from_date,
         to_date=to_date,
+        sort_by=sort_by,
+        descending=descending,
+        limit=limit,
+        offset=offset,
+        use_cache=cli_use_cache,
     )
+    photosdb = _query_photosdb(prefilter=prefilter, **query_args)
+    photos = _query(**query_args, photosdb=photosdb)
 
     # below needed for to make CliRunner work for testing
     cli_json = cli_obj.json if cli_obj is not None else None
-    print_photo_info(photos, cli_json or json_)
+    print_photo_info(photos, cli_json or json_, ndjson=ndjson)
 
 
 @cli.command()
@@ -655,6 +773,10 @@ def export(
     no_title,
     description,
     no_description,
+    text,
+    where,
+    near,
+    bbox,
     uti,
     ignore_case,
     edited,
@@ -667,6 +789,11 @@ def export(
     not_shared,
     from_date,
     to_date,
+    sort_by,
+    descending,
+    limit,
+    offset,
+    prefilter,
     verbose,
     overwrite,
     export_by_date,
@@ -724,7 +851,8 @@ def export(
         _list_libraries()
         return
 
-    photos = _query(
+    cli_use_cache = cli_obj.use_cache if cli_obj is not None else False
+    query_args = dict(
         db=db,
         keyword=keyword,
         person=person,
@@ -734,6 +862,10 @@ def export(
         no_title=no_title,
         description=description,
         no_description=no_description,
+        text=text,
+        where=where,
+        near=near,
+        bbox=bbox,
         ignore_case=ignore_case,
         edited=edited,
         external_edit=external_edit,
@@ -758,22 +890,54 @@ def export(
         not_incloud=False,
         from_date=from_date,
         to_date=to_date,
+        sort_by=sort_by,
+        descending=descending,
+        limit=limit,
+        offset=offset,
+        use_cache=cli_use_cache,
     )
+    photosdb = _query_photosdb(prefilter=prefilter, **query_args)
+
+    # the query is run once and only the uuids are kept; the PhotoInfo objects are
+    # made as the photos are exported so they're never all held in memory at once
+    uuids = [p.uuid for p in _query(**query_args, photosdb=photosdb)]
+
+    # uuids of the burst set of each burst photo to export, looked up in one call
+    burst_sets = {}
+    if export_bursts:
+        bursts = photosdb.bursts(photosdb.get_photo(u) for u in uuids)
+        burst_sets = {
+            p.uuid: [b.uuid for b in members if not b.ismissing]
+            for members in bursts.values()
+            for p in members
+        }
 
-    if photos:
-        if export_bursts:
-            # add the burst_photos to the export set
-            photos_burst = [p for p in photos if p.burst]
-            for burst in photos_burst:
-                burst_set = [p for p in burst.burst_photos if not p.ismissing]
-                photos.extend(burst_set)
-
-        num_photos = len(photos)
+    def uuids_to_export():
+        """ generator that yields the uuids of the photos to export """
+        # photos already exported as part of a burst set, so each is exported once
+        # even if the query matched more than one photo of the set
+        exported = set()
+        for photo_uuid in uuids:
+            if photo_uuid in exported:
+                continue
+            yield photo_uuid
+            if photo_uuid in burst_sets:
+                # also export the other photos in the burst
+                exported.add(photo_uuid)
+                for burst_uuid in burst_sets[photo_uuid]:
+                    if burst_uuid not in exported:
+                        exported.add(burst_uuid)
+                        yield burst_uuid
+
+    export_uuids = list(uuids_to_export())
+    num_photos = len(export_uuids)
+    if num_photos:
         photo_str = "photos" if num_photos > 1 else "photo"
         click.echo(f"Exporting {num_photos} {photo_str} to {dest}...")
+        photos = (photosdb.get_photo(u) for u in export_uuids)
         if not verbose:
             # show progress bar
-            with click.progressbar(photos) as bar:
+            with click.progressbar(photos, length=num_photos) as bar:
                 for p in bar:
                     export_photo(
                         p,
@@ -821,20 +985,20 @@ def help(ctx, topic, **kw):
         click.echo(cli.commands[topic].get_help(ctx))
 
 
-def print_photo_info(photos, json=False):
-    if json:
-        dump = []
-        for p in photos:
-            dump.append(p.json())
-        click.echo(f"[{', '.join(dump)}]")
+def print_photo_info(photos, json=False, ndjson=False):
+    """ print info about photos as JSON, newline delimited JSON, or CSV
+        photos: iterable of PhotoInfo, e.g. from PhotosDB.iter_photos();
+        the photos are printed a batch at a time as they're read so the output
+        is never built up in memory """
+    if json or ndjson:
+        _write_json(photos, click.get_binary_stream("stdout"), ndjson=ndjson)
     else:
         # dump as CSV
         csv_writer = csv.writer(
             sys.stdout, delimiter=",", quotechar='"', quoting=csv.QUOTE_MINIMAL
         )
-        dump = []
         # add headers
-        dump.append(
+        csv_writer.writerow(
             [
                 "uuid",
                 "filename",
@@ -866,7 +1030,7 @@ def print_photo_info(photos, json=False):
             ]
         )
         for p in photos:
-            dump.append(
+            csv_writer.writerow(
                 [
                     p.uuid,
                     p.filename,
@@ -897,8 +1061,108 @@ def print_photo_info(photos, json=False):
                     p.incloud,
                 ]
             )
-        for row in dump:
-            csv_writer.writerow(row)
+
+
+def _query_flags(
+    edited=None,
+    external_edit=None,
+    favorite=None,
+    not_favorite=None,
+    hidden=None,
+    not_hidden=None,
+    missing=None,
+    not_missing=None,
+    shared=None,
+    not_shared=None,
+    burst=None,
+    not_burst=None,
+    live=None,
+    not_live=None,
+    cloudasset=None,
+    not_cloudasset=None,
+    incloud=None,
+    not_incloud=None,
+    **kwargs,
+):
+    """ returns dict of the PhotosDB.photos() flag arguments for the _query arguments """
+    """ e.g. --favorite is favorite=True, --not-favorite is favorite=False """
+    """ other _query arguments (e.g. keyword) are ignored """
+
+    def flag(value, not_value):
+        # if both are given, value wins
+        return True if value else False if not_value else None
+
+    return {
+        "hasadjustments": True if edited else None,
+        "external_edit": True if external_edit else None,
+        "favorite": flag(favorite, not_favorite),
+        "hidden": flag(hidden, not_hidden),
+        "ismissing": flag(missing, not_missing),
+        "shared": flag(shared, not_shared),
+        "burst": flag(burst, not_burst),
+        "live_photo": flag(live, not_live),
+        "iscloudasset": flag(cloudasset, not_cloudasset),
+        "incloud": flag(incloud, not_incloud),
+    }
+
+
+def _query_prefilter(
+    keyword=None,
+    person=None,
+    album=None,
+    uuid=None,
+    title=None,
+    no_title=None,
+    description=None,
+    no_description=None,
+    ignore_case=None,
+    isphoto=None,
+    ismovie=None,
+    uti=None,
+    from_date=None,
+    to_date=None,
+    text=None,
+    where=None,
+    near=None,
+    bbox=None,
+    **kwargs,
+):
+    """ returns PhotosDB prefilter for the _query arguments """
+    """ flags the prefilter can't select (missing, external_edit) are left to _query """
+
+    prefilter = {
+        "keywords": keyword,
+        "persons": person,
+        "albums": album,
+        "uuid": uuid,
+        "images": isphoto,
+        "movies": ismovie,
+        "from_date": from_date,
+        "to_date": to_date,
+        "title": title,
+        "no_title": no_title and not title,
+        "description": description,
+        "no_description": no_description and not description,
+        "ignore_case": ignore_case,
+        "uti": uti,
+        # text, where and locations are searched by PhotosDB so photos are read even if
+        # the keywords, etc. aren't found
+        "other_filters": any([text, where, near, bbox]),
+    }
+    prefilter.update(_query_flags(**kwargs))
+    del prefilter["ismissing"]
+    del prefilter["external_edit"]
+    return prefilter
+
+
+def _query_photosdb(db=None, use_cache=False, prefilter=False, **query_args):
+    """ open the PhotosDB to run _query against with the same arguments """
+    """ if prefilter is True (--prefilter) and the snapshot cache isn't used, only the """
+    """ photos that could match are read from the database so a single query of a """
+    """ large library is quick """
+    if prefilter and not use_cache:
+        return osxphotos.PhotosDB(dbfile=db, prefilter=_query_prefilter(**query_args))
+    return osxphotos.PhotosDB(dbfile=db, use_cache=use_cache)
 
 
 def _query(
@@ -911,6 +1175,10 @@ def _query(
     no_title=None,
     description=None,
     no_description=None,
+    text=None,
+    where=None,
+    near=None,
+    bbox=None,
     ignore_case=None,
     edited=None,
     external_edit=None,
@@ -935,14 +1203,27 @@ def _query(
     not_incloud=None,
     from_date=None,
     to_date=None,
+    sort_by=None,
+    descending=False,
+    limit=None,
+    offset=0,
+    use_cache=False,
+    photosdb=None,
 ):
     """ run a query against PhotosDB to extract the photos based on user supply criteria """
     """ used by query and export commands """
     """ arguments must be passed in same order as query and export """
     """ if either is modified, need to ensure all three functions are updated """
+    """ returns a generator of PhotoInfo so the matching photos aren't all held in memory """
+    """ photosdb: PhotosDB to query, if None, opens db """
+
+    if photosdb is None:
+        photosdb = osxphotos.PhotosDB(dbfile=db, use_cache=use_cache)
 
-    photosdb = osxphotos.PhotosDB(dbfile=db)
-    photos = photosdb.photos(
+    # title, description and uti are filtered below so limit and offset are applied
+    # after them; otherwise PhotosDB only creates the PhotoInfo objects for the page
+    post_filter = any([title, no_title, description, no_description, uti])
+    photos = photosdb.iter_photos(
         keywords=keyword,
         persons=person,
         albums=album,
@@ -951,91 +1232,88 @@ def _query(
         movies=ismovie,
         from_date=from_date,
         to_date=to_date,
+        # words in the title, keywords, etc. are looked up in PhotosDB's text index
+        text=" ".join(text) if text else None,
+        # the expression is parsed by PhotosDB and run as set operations on its indexes
+        where=where,
+        # locations are found with PhotosDB's grid of the photos by location
+        near=near or None,
+        bbox=bbox or None,
+        sort_by=sort_by,
+        descending=descending,
+        limit=None if post_filter else limit,
+        offset=0 if post_filter else offset or 0,
+        # boolean filters such as --favorite are selected by PhotosDB from its flag indexes
+        **_query_flags(
+            edited=edited,
+            external_edit=external_edit,
+            favorite=favorite,
+            not_favorite=not_favorite,
+            hidden=hidden,
+            not_hidden=not_hidden,
+            missing=missing,
+            not_missing=not_missing,
+            shared=shared,
+            not_shared=not_shared,
+            burst=burst,
+            not_burst=not_burst,
+            live=live,
+            not_live=not_live,
+            cloudasset=cloudasset,
+            not_cloudasset=not_cloudasset,
+            incloud=incloud,
+            not_incloud=not_incloud,
+        ),
     )
 
+    # each filter below wraps photos in another generator so photos are filtered one at a time
+
     if title:
         # search title field for text
         # if more than one, find photos with all title values in title
         if ignore_case:
             # case-insensitive
-            for t in title:
-                t = t.lower()
-                photos = [p for p in photos if p.title and t in p.title.lower()]
+            titles = [t.lower() for t in title]
+            photos = (
+                p
+                for p in photos
+                if p.title and all(t in p.title.lower() for t in titles)
+            )
         else:
-            for t in title:
-                photos = [p for p in photos if p.title and t in p.title]
+            photos = (
+                p for p in photos if p.title and all(t in p.title for t in title)
+            )
     elif no_title:
-        photos = [p for p in photos if not p.title]
+        photos = (p for p in photos if not p.title)
 
     if description:
         # search description field for text
         # if more than one, find photos with all name values in description
         if ignore_case:
             # case-insensitive
-            for d in description:
-                d = d.lower()
-                photos = [
-                    p for p in photos if p.description and d in p.description.lower()
-                ]
+            descriptions = [d.lower() for d in description]
+            photos = (
+                p
+                for p in photos
+                if p.description
+                and all(d in p.description.lower() for d in descriptions)
+            )
         else:
-            for d in description:
-                photos = [p for p in photos if p.description and d in p.description]
+            photos = (
+                p
+                for p in photos
+                if p.description and all(d in p.description for d in description)
+            )
     elif no_description:
-        photos = [p for p in photos if not p.description]
-
-    if edited:
-        photos = [p for p in photos if p.hasadjustments]
-
-    if external_edit:
-        photos = [p for p in photos if p.external_edit]
-
-    if favorite:
-        photos = [p for p in photos if p.favorite]
-    elif not_favorite:
-        photos = [p for p in photos if not p.favorite]
-
-    if hidden:
-        photos = [p for p in photos if p.hidden]
-    elif not_hidden:
-        photos = [p for p in photos if not p.hidden]
-
-    if missing:
-        photos = [p for p in photos if p.ismissing]
-    elif not_missing:
-        photos = [p for p in photos if not p.ismissing]
-
-    if shared:
-        photos = [p for p in photos if p.shared]
-    elif not_shared:
-        photos = [p for p in photos if not p.shared]
-
-    if shared:
-        photos = [p for p in photos if p.shared]
-    elif not_shared:
-        photos = [p for p in photos if not p.shared]
+        photos = (p for p in photos if not p.description)
 
     if uti:
-        photos = [p for p in photos if uti in p.uti]
-
-    if burst:
-        photos = [p for p in photos if p.burst]
-    elif not_burst:
-        photos = [p for p in photos if not p.burst]
-
-    if live:
-        photos = [p for p in photos if p.live_photo]
-    elif not_live:
-        photos = [p for p in photos if not p.live_photo]
-
-    if cloudasset:
-        photos = [p for p in photos if p.iscloudasset]
-    elif not_cloudasset:
-        photos = [p for p in photos if not p.iscloudasset]
-
-    if incloud:
-        photos = [p for p in photos if p.incloud]
-    elif not_incloud:
-        photos = [p for p in photos if not p.incloud]
+        photos = (p for p in photos if uti in p.uti)
+
+    if post_filter and (limit is not None or offset):
+        offset = offset or 0
+        end = offset + limit if limit is not None else None
+        photos = itertools.islice(photos, offset, end)
 
     return photos
 
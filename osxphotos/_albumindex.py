@@ -0,0 +1,69 @@
+"""
+_AlbumIndex class
+Album titles and photo counts, derived from the album details and the album index of
+PhotosDB so album queries and listings don't have to walk every album each time
+"""
+
+
+class _AlbumIndex:
+    """
+    Albums by title, with the albums split into the user's own albums and shared albums
+    (Photos 5 only: an album is shared if it has a cloud owner) and the number of photos
+    in the albums with each title; albums with the same title are treated as one album,
+    as they are everywhere else in PhotosDB
+    The index is rebuilt whenever the album details or the photos change
+    """
+
+    def __init__(self, album_details, albums):
+        """ album_details: dict of album uuid: details (PhotosDB._dbalbum_details)
+            albums: _LabelIndex of album uuid by photo (PhotosDB._dbalbums) """
+        # title: list of uuids of the albums with the title, including empty albums
+        self._album_ids = {}
+        for album_id, details in album_details.items():
+            self._album_ids.setdefault(details["title"], []).append(album_id)
+
+        # title: number of photos, for the albums with at least one photo,
+        # in descending order of the number of photos
+        self._owned_counts = {}
+        self._shared_counts = {}
+        for album_id, count in albums.counts().items():
+            details = album_details.get(album_id)
+            if details is None:
+                # e.g. album in the trash
+                continue
+            if details["cloudownerhashedpersonid"] is None:
+                counts = self._owned_counts
+            else:
+                counts = self._shared_counts
+            title = details["title"]
+            counts[title] = counts.get(title, 0) + count
+        self._owned_counts = _sorted_counts(self._owned_counts)
+        self._shared_counts = _sorted_counts(self._shared_counts)
+
+    def __eq__(self, other):
+        if not isinstance(other, self.__class__):
+            return False
+        return (
+            self._album_ids == other._album_ids
+            and self._owned_counts == other._owned_counts
+            and self._shared_counts == other._shared_counts
+        )
+
+    def album_ids(self, title):
+        """ returns list of uuids of the albums with title (empty if there are none) """
+        return self._album_ids.get(title, [])
+
+    def titles(self, shared=False):
+        """ returns list of the titles of the albums with at least one photo
+            shared: if True, shared albums, otherwise the user's own albums """
+        return list(self._shared_counts if shared else self._owned_counts)
+
+    def counts(self, shared=False):
+        """ returns dict of title: number of photos in descending order of number of photos
+            shared: if True, shared albums, otherwise the user's own albums """
+        return dict(self._shared_counts if shared else self._owned_counts)
+
+
+def _sorted_counts(counts):
+    """ returns dict counts in descending order of count """
+    return dict(sorted(counts.items(), key=lambda kv: kv[1], reverse=True))
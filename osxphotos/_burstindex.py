@@ -0,0 +1,60 @@
+"""
+_BurstIndex class
+The photos of each burst set in order, selected key photos first, so a burst set is expanded
+without sorting or looking at the other photos in the library
+"""
+
+
+class _BurstIndex:
+    """
+    Uuids of the photos in each burst set by burst uuid: the key photos (the ones
+    selected in Photos, burst_key is True) then the others, each in date order
+    The index is rebuilt whenever _dbphotos changes
+    """
+
+    def __init__(self, dbphotos_burst, dbphotos, asset_ids):
+        """ dbphotos_burst: dict of burst uuid: set of uuids (PhotosDB._dbphotos_burst)
+            dbphotos: dict of uuid: _PhotoRecord (PhotosDB._dbphotos)
+            asset_ids: dict of uuid: asset id (PhotosDB._asset_ids), to order photos
+            with the same date """
+
+        def order(uuid):
+            record = dbphotos[uuid]
+            return (
+                not record["burst_key"],
+                record["imageDateSeconds"] or 0,
+                asset_ids[uuid],
+            )
+
+        # burst uuid: tuple of uuids
+        self._members = {
+            burst_uuid: tuple(sorted((u for u in uuids if u in dbphotos), key=order))
+            for burst_uuid, uuids in dbphotos_burst.items()
+        }
+        # burst uuid: uuid of the first key photo, for the burst sets that have one
+        self._keys = {
+            burst_uuid: members[0]
+            for burst_uuid, members in self._members.items()
+            if members and dbphotos[members[0]]["burst_key"]
+        }
+
+    def __len__(self):
+        return len(self._members)
+
+    def __eq__(self, other):
+        if not isinstance(other, self.__class__):
+            return False
+        return self._members == other._members
+
+    def __iter__(self):
+        return iter(self._members)
+
+    def members(self, burst_uuid):
+        """ returns tuple of the uuids of the photos in burst set burst_uuid,
+            key photos first, or an empty tuple if there's no such burst set """
+        return self._members.get(burst_uuid, ())
+
+    def key(self, burst_uuid):
+        """ returns uuid of the first selected key photo of burst set burst_uuid
+            or None if it has none """
+        return self._keys.get(burst_uuid)
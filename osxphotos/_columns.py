@@ -0,0 +1,106 @@
+"""
+_ColumnStore class
+Columnar (struct of arrays) copy of the numeric and boolean information about each photo
+held in NumPy arrays so photos can be filtered with vectorized masks instead of a loop
+NumPy is optional: if it's not installed, PhotosDB filters photos one at a time
+"""
+
+from ._constants import _MOVIE_TYPE, _PHOTO_TYPE
+from ._flagindex import _PHOTO_FLAGS
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
+
+# True if the column store can be used
+_NUMPY_AVAILABLE = numpy is not None
+
+# numeric columns: name: (_PhotoRecord field, dtype, value stored for None)
+_NUMERIC_COLUMNS = {
+    # dates are seconds since the Photos epoch as stored in the database
+    "date": ("imageDateSeconds", "float64", float("nan")),
+    "lastmodifieddate": ("lastmodifieddateSeconds", "float64", float("nan")),
+    "tzoffset": ("imageTimeZoneOffsetSeconds", "float64", float("nan")),
+    "latitude": ("latitude", "float64", float("nan")),
+    "longitude": ("longitude", "float64", float("nan")),
+    "type": ("type", "int8", -1),
+    "subtype": ("subtype", "int16", -1),  # Photos 5
+    "specialType": ("specialType", "int16", -1),  # Photos <= 4
+    "customRenderedValue": ("customRenderedValue", "int16", -1),  # Photos 5
+}
+
+# boolean columns are the flags in _PHOTO_FLAGS, named for the PhotoInfo property they match
+
+
+class _ColumnStore:
+    """
+    NumPy arrays with one entry per asset id (see PhotosDB._asset_id)
+    Asset ids of photos that aren't in _dbphotos (e.g. in the trash) have type -1
+    so they're never selected; the store is rebuilt whenever _dbphotos changes
+    """
+
+    def __init__(self, dbphotos, asset_uuids, flags):
+        """ dbphotos: dict of uuid: _PhotoRecord (PhotosDB._dbphotos)
+            asset_uuids: list of uuid for each asset id (PhotosDB._asset_uuids)
+            flags: _FlagIndex built from the same dbphotos, unpacked into the flag columns """
+        records = [dbphotos.get(uuid) for uuid in asset_uuids]
+        self._count = len(records)
+
+        # values of each field for all records, None if the field isn't set
+        values = {}
+
+        def field_values(field):
+            if field not in values:
+                values[field] = [getattr(record, field, None) for record in records]
+            return values[field]
+
+        self.columns = {}
+        for name, (field, dtype, null) in _NUMERIC_COLUMNS.items():
+            column = field_values(field)
+            if null is not None:
+                column = [null if value is None else value for value in column]
+            self.columns[name] = numpy.array(column, dtype=dtype)
+        for name in _PHOTO_FLAGS:
+            self.columns[name] = self.bits_mask(flags.bits({name: True}))
+
+    def __len__(self):
+        return self._count
+
+    def __eq__(self, other):
+        if not isinstance(other, self.__class__):
+            return False
+        return len(self) == len(other) and all(
+            numpy.array_equal(column, other.columns[name], equal_nan=True)
+            for name, column in self.columns.items()
+        )
+
+    def photos_mask(self, images=True, movies=False):
+        """ returns boolean array that's True for each photo PhotosDB.photos() would return
+            for these arguments without considering any of the others (keywords, dates, etc.):
+            images and/or movies and not a non-selected burst photo """
+        columns = self.columns
+        mask = numpy.zeros(len(self), dtype=bool)
+        if images:
+            mask |= columns["type"] == _PHOTO_TYPE
+        if movies:
+            mask |= columns["type"] == _MOVIE_TYPE
+        mask &= ~columns["burst"] | columns["burst_key"]
+        return mask
+
+    def ids_mask(self, asset_ids):
+        """ returns boolean array that's True for each photo with asset id in asset_ids """
+        mask = numpy.zeros(len(self), dtype=bool)
+        mask[numpy.fromiter(asset_ids, dtype=numpy.intp)] = True
+        return mask
+
+    def bits_mask(self, bits):
+        """ returns boolean array that's True for each photo with its asset id set in bits
+            bits: int used as a bitset, see _FlagIndex """
+        data = bits.to_bytes((len(self) + 7) // 8, "little")
+        mask = numpy.unpackbits(numpy.frombuffer(data, dtype=numpy.uint8), bitorder="little")
+        return mask[: len(self)].astype(bool)
+
+    def select(self, mask):
+        """ returns array of the asset ids where mask is True, in asset id order """
+        return numpy.flatnonzero(mask)
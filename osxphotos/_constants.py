@@ -2,6 +2,8 @@
 Constants used by osxphotos 
 """
 
+from datetime import datetime
+
 
 # which Photos library database versions have been tested
 # Photos 2.0 (10.12.6) == 2622
@@ -30,3 +32,13 @@ _PHOTOS_5_SHARED_PHOTO_PATH = "resources/cloudsharing/data"
 _PHOTO_TYPE = 0
 _MOVIE_TYPE = 1
 
+
+# Where osxphotos caches snapshots of parsed Photos libraries (see PhotosDB use_cache)
+_OSXPHOTOS_CACHE_DIR = "~/Library/Caches/osxphotos"
+
+# Version of the snapshot cache format; increment if data structures in PhotosDB change
+_SNAPSHOT_VERSION = 4
+
+# Photos stores dates as seconds since Jan 1, 2001 (the Core Data epoch)
+# this is that date in seconds since the unix epoch (Jan 1, 1970)
+_PHOTOS_EPOCH = (datetime(2001, 1, 1, 0, 0) - datetime(1970, 1, 1, 0, 0)).total_seconds()
@@ -0,0 +1,47 @@
+"""
+_DateIndex class
+Photos sorted by a date so the photos in a date range are found with a binary search
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+
+from ._labelindex import _ID_TYPECODE
+
+
+class _DateIndex:
+    """
+    Asset ids (see PhotosDB._asset_id) of the photos in _dbphotos sorted by one of the
+    _PhotoRecord date fields, held as seconds since the Photos epoch the way they're stored
+    Photos without the date aren't in the index; the index is rebuilt whenever _dbphotos changes
+    """
+
+    def __init__(self, dbphotos, asset_uuids, field):
+        """ dbphotos: dict of uuid: _PhotoRecord (PhotosDB._dbphotos)
+            asset_uuids: list of uuid for each asset id (PhotosDB._asset_uuids)
+            field: name of the _PhotoRecord field to sort by, e.g. imageDateSeconds """
+        dates = {}
+        for asset_id, uuid in enumerate(asset_uuids):
+            record = dbphotos.get(uuid)
+            date = getattr(record, field, None) if record is not None else None
+            if date is not None:
+                dates[asset_id] = date
+        # sorted by date then asset id so photos with the same date are in asset id order
+        asset_ids = sorted(dates, key=lambda asset_id: (dates[asset_id], asset_id))
+        self._dates = array("d", (dates[asset_id] for asset_id in asset_ids))
+        self._asset_ids = array(_ID_TYPECODE, asset_ids)
+
+    def __len__(self):
+        return len(self._asset_ids)
+
+    def __eq__(self, other):
+        if not isinstance(other, self.__class__):
+            return False
+        return self._dates == other._dates and self._asset_ids == other._asset_ids
+
+    def asset_ids(self, from_date=None, to_date=None):
+        """ returns array of the asset ids of the photos with from_date <= date <= to_date,
+            sorted by date; from_date, to_date: seconds since the Photos epoch or None """
+        start = 0 if from_date is None else bisect_left(self._dates, from_date)
+        end = len(self._dates) if to_date is None else bisect_right(self._dates, to_date)
+        return self._asset_ids[start:end]
@@ -0,0 +1,138 @@
+"""
+_FlagIndex class
+Bitset index of the boolean PhotoInfo properties (favorite, hidden, etc.) of every photo
+so photos can be selected by any combination of them with a few bitwise operations
+"""
+
+from ._constants import _MOVIE_TYPE, _PHOTO_TYPE
+
+# boolean properties of PhotoInfo that can be indexed, with the function that computes
+# the property from the _PhotoRecord
+# name: (_PhotoRecord fields, function(*field values) that returns the value of the property)
+# a few are named for the _PhotoRecord field because PhotoInfo has no such property
+_PHOTO_FLAGS = {
+    "favorite": (("favorite",), lambda v: v == 1),
+    "hidden": (("hidden",), lambda v: v == 1),
+    "ismissing": (("isMissing",), lambda v: v == 1),
+    "hasadjustments": (("hasAdjustments",), lambda v: v == 1),
+    "external_edit": (
+        ("adjustmentFormatID",),
+        lambda v: v == "com.apple.Photos.externalEdit",
+    ),
+    "shared": (("shared",), bool),  # Photos 5
+    "burst": (("burst",), bool),
+    "burst_key": (("burst_key",), bool),
+    "live_photo": (("live_photo",), bool),
+    "hdr": (("hdr",), bool),
+    "panorama": (("panorama",), bool),
+    "portrait": (("portrait",), bool),
+    "screenshot": (("screenshot",), bool),
+    "slow_mo": (("slow_mo",), bool),
+    "time_lapse": (("time_lapse",), bool),
+    "selfie": (("selfie",), bool),
+    "incloud": (("incloud",), bool),
+    # cloudAssetGUID is only set by Photos 5 and cloudLibraryState only by Photos <= 4
+    "iscloudasset": (
+        ("cloudAssetGUID", "cloudLibraryState"),
+        lambda guid, state: guid is not None or state not in (None, 0),
+    ),
+}
+
+
+def _bitset(values):
+    """ returns int with bit n set if values[n] is True """
+    # int() of a base 2 string takes time linear in its length
+    # whereas setting the bits one at a time copies the int for every bit
+    return int("0" + "".join("1" if value else "0" for value in reversed(values)), 2)
+
+
+class _FlagIndex:
+    """
+    For each flag in _PHOTO_FLAGS, an int used as a bitset of the asset ids (see
+    PhotosDB._asset_id) of the photos where the flag is True and another for the photos
+    where it's False; bits for asset ids that aren't in _dbphotos (e.g. in the trash) are
+    never set; the index is rebuilt whenever _dbphotos changes
+    """
+
+    def __init__(self, dbphotos, asset_uuids):
+        """ dbphotos: dict of uuid: _PhotoRecord (PhotosDB._dbphotos)
+            asset_uuids: list of uuid for each asset id (PhotosDB._asset_uuids) """
+        records = [dbphotos.get(uuid) for uuid in asset_uuids]
+
+        # bitset of the asset ids that are in dbphotos
+        self.all = _bitset([record is not None for record in records])
+
+        # values of each field for all records, None if the field isn't set
+        values = {}
+
+        def field_values(field):
+            if field not in values:
+                values[field] = [getattr(record, field, None) for record in records]
+            return values[field]
+
+        self._true = {}
+        self._false = {}
+        for name, (fields, flag) in _PHOTO_FLAGS.items():
+            bits = _bitset(list(map(flag, *[field_values(field) for field in fields])))
+            self._true[name] = bits & self.all
+            self._false[name] = ~bits & self.all
+
+        # bitset of the photos of each type (_PHOTO_TYPE, _MOVIE_TYPE)
+        self._types = {
+            type_: _bitset([value == type_ for value in field_values("type")])
+            for type_ in (_PHOTO_TYPE, _MOVIE_TYPE)
+        }
+
+    def __eq__(self, other):
+        if not isinstance(other, self.__class__):
+            return False
+        return (
+            self.all == other.all
+            and self._true == other._true
+            and self._false == other._false
+            and self._types == other._types
+        )
+
+    def bits(self, flags):
+        """ returns bitset of the photos where each flag in flags has the given value
+            flags: dict of flag name: True or False """
+        bits = self.all
+        for name, value in flags.items():
+            bits &= self._true[name] if value else self._false[name]
+        return bits
+
+    def photos_bits(self, images=True, movies=False):
+        """ returns bitset of the photos PhotosDB.photos() would return for these arguments
+            without considering any of the others (keywords, dates, etc.):
+            images and/or movies and not a non-selected burst photo """
+        bits = 0
+        if images:
+            bits |= self._types[_PHOTO_TYPE]
+        if movies:
+            bits |= self._types[_MOVIE_TYPE]
+        return bits & ~(self._true["burst"] & self._false["burst_key"])
+
+    @staticmethod
+    def count(bits, asset_ids=None):
+        """ returns number of bits set in bits or, if asset_ids (iterable of asset ids)
+            is given, number of asset_ids with their bit set """
+        if asset_ids is None:
+            return bin(bits).count("1")
+        # a byte lookup per asset id instead of shifting the whole int
+        data = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+        size = len(data)
+        return sum(
+            1
+            for asset_id in asset_ids
+            if asset_id >> 3 < size and data[asset_id >> 3] >> (asset_id & 7) & 1
+        )
+
+    @staticmethod
+    def asset_ids(bits):
+        """ generator that yields the asset id of each bit set in bits, in order """
+        # bin() is most significant bit first, reverse it so index n is bit n
+        digits = bin(bits)[:1:-1]
+        asset_id = digits.find("1")
+        while asset_id >= 0:
+            yield asset_id
+            asset_id = digits.find("1", asset_id + 1)
@@ -0,0 +1,170 @@
+"""
+_GeoIndex class
+Grid of the photos by location so the photos in a bounding box or near a point are found
+by looking only at the grid cells around it
+"""
+
+import math
+from array import array
+
+from ._labelindex import _ID_TYPECODE
+
+# size of a grid cell in degrees of latitude and longitude (about 11 km at the equator)
+_CELL_DEGREES = 0.1
+_LAT_CELLS = round(180 / _CELL_DEGREES)
+_LON_CELLS = round(360 / _CELL_DEGREES)
+
+# mean radius of the earth in km
+_EARTH_RADIUS_KM = 6371.0088
+
+
+def _lat_cell(lat):
+    return min(int((lat + 90.0) / _CELL_DEGREES), _LAT_CELLS - 1)
+
+
+def _lon_cell(lon):
+    return min(int((lon + 180.0) / _CELL_DEGREES), _LON_CELLS - 1)
+
+
+def _distance_km(lat1, lon1, lat2, lon2):
+    """ returns great circle distance in km between two points given in degrees """
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * _EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _check_lat_lon(lat, lon):
+    if not -90.0 <= lat <= 90.0:
+        raise ValueError(f"latitude must be between -90 and 90: {lat}", lat)
+    if not -180.0 <= lon <= 180.0:
+        raise ValueError(f"longitude must be between -180 and 180: {lon}", lon)
+
+
+class _GeoIndex:
+    """
+    Asset ids (see PhotosDB._asset_id) of the photos in _dbphotos with a location, by the
+    _CELL_DEGREES x _CELL_DEGREES grid cell the location is in, with the latitude and
+    longitude of each photo so the photos in the cells at the edge of a query can be checked
+    Photos without a location aren't in the index; the index is rebuilt whenever _dbphotos changes
+    """
+
+    def __init__(self, dbphotos, asset_uuids):
+        """ dbphotos: dict of uuid: _PhotoRecord (PhotosDB._dbphotos)
+            asset_uuids: list of uuid for each asset id (PhotosDB._asset_uuids) """
+        # (lat cell, lon cell): (array of asset ids, array of latitudes, array of longitudes)
+        self._cells = {}
+        for asset_id, uuid in enumerate(asset_uuids):
+            record = dbphotos.get(uuid)
+            if record is None:
+                continue
+            lat, lon = record.latitude, record.longitude
+            if lat is None or lon is None:
+                continue
+            try:
+                _check_lat_lon(lat, lon)
+            except ValueError:
+                continue
+            key = (_lat_cell(lat), _lon_cell(lon))
+            try:
+                (ids, lats, lons) = self._cells[key]
+            except KeyError:
+                (ids, lats, lons) = self._cells[key] = (
+                    array(_ID_TYPECODE),
+                    array("d"),
+                    array("d"),
+                )
+            ids.append(asset_id)
+            lats.append(lat)
+            lons.append(lon)
+
+    def __len__(self):
+        return sum(len(ids) for (ids, _, _) in self._cells.values())
+
+    def __eq__(self, other):
+        if not isinstance(other, self.__class__):
+            return False
+        return self._cells == other._cells
+
+    def _candidates(self, min_lat, max_lat, lon_ranges):
+        """ generator that yields (asset id, lat, lon) of the photos in the cells
+            overlapping min_lat..max_lat and any of lon_ranges (list of (min_lon, max_lon)) """
+        lat_cells = range(_lat_cell(min_lat), _lat_cell(max_lat) + 1)
+        lon_cells = set()
+        for (min_lon, max_lon) in lon_ranges:
+            lon_cells.update(range(_lon_cell(min_lon), _lon_cell(max_lon) + 1))
+        if len(lat_cells) * len(lon_cells) <= len(self._cells):
+            keys = (
+                (lat, lon)
+                for lat in lat_cells
+                for lon in lon_cells
+                if (lat, lon) in self._cells
+            )
+        else:
+            # a box bigger than the part of the world with photos: check the cells with photos
+            keys = (
+                key for key in self._cells if key[0] in lat_cells and key[1] in lon_cells
+            )
+        for key in keys:
+            (ids, lats, lons) = self._cells[key]
+            yield from zip(ids, lats, lons)
+
+    def bbox_asset_ids(self, min_lat, min_lon, max_lat, max_lon):
+        """ returns set of the asset ids of the photos with min_lat <= latitude <= max_lat
+            and min_lon <= longitude <= max_lon; if min_lon > max_lon the box crosses
+            the 180th meridian (e.g. min_lon=170, max_lon=-170 is 20 degrees wide) """
+        _check_lat_lon(min_lat, min_lon)
+        _check_lat_lon(max_lat, max_lon)
+        if min_lat > max_lat:
+            raise ValueError(
+                f"min latitude must be <= max latitude: {min_lat}, {max_lat}",
+                min_lat,
+                max_lat,
+            )
+        if min_lon <= max_lon:
+            lon_ranges = [(min_lon, max_lon)]
+        else:
+            lon_ranges = [(min_lon, 180.0), (-180.0, max_lon)]
+        return {
+            asset_id
+            for (asset_id, lat, lon) in self._candidates(min_lat, max_lat, lon_ranges)
+            if min_lat <= lat <= max_lat
+            and any(lo <= lon <= hi for (lo, hi) in lon_ranges)
+        }
+
+    def near_asset_ids(self, lat, lon, radius):
+        """ returns dict of asset id: distance in km of the photos within radius km
+            of latitude lat, longitude lon """
+        _check_lat_lon(lat, lon)
+        if radius < 0:
+            raise ValueError(f"radius must be >= 0: {radius}", radius)
+
+        # bounding box of the circle: the latitudes are radius / earth radius away, the
+        # longitudes are widest where the circle touches its meridians (Chan, "Bounding
+        # coordinates"); if the circle contains a pole, all longitudes
+        angle = radius / _EARTH_RADIUS_KM
+        min_lat = math.degrees(math.radians(lat) - angle)
+        max_lat = math.degrees(math.radians(lat) + angle)
+        if min_lat <= -90.0 or max_lat >= 90.0 or angle >= math.pi / 2:
+            min_lat, max_lat = max(min_lat, -90.0), min(max_lat, 90.0)
+            lon_ranges = [(-180.0, 180.0)]
+        else:
+            delta = math.degrees(math.asin(math.sin(angle) / math.cos(math.radians(lat))))
+            min_lon, max_lon = lon - delta, lon + delta
+            if min_lon < -180.0:
+                lon_ranges = [(min_lon + 360.0, 180.0), (-180.0, max_lon)]
+            elif max_lon > 180.0:
+                lon_ranges = [(min_lon, 180.0), (-180.0, max_lon - 360.0)]
+            else:
+                lon_ranges = [(min_lon, max_lon)]
+
+        found = {}
+        for (asset_id, photo_lat, photo_lon) in self._candidates(
+            min_lat, max_lat, lon_ranges
+        ):
+            distance = _distance_km(lat, lon, photo_lat, photo_lon)
+            if distance <= radius:
+                found[asset_id] = distance
+        return found
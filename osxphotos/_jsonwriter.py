@@ -0,0 +1,68 @@
+"""
+_write_json function
+Writes the info about many photos as a JSON array or as newline delimited JSON (NDJSON)
+a batch of photos at a time, so the output is never built up in memory
+orjson is optional: if it's installed it's used to encode the photos, otherwise json
+The output is compact (no spaces after "," and ":") and non-ASCII characters aren't escaped,
+which is what orjson writes, so the output is the same whether or not orjson is installed
+"""
+
+import itertools
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+# True if orjson is used to encode the photos
+_ORJSON_AVAILABLE = orjson is not None
+
+# number of photos encoded and written to the output at a time
+_BATCH_SIZE = 512
+
+
+def _batch_encoder(ndjson=False, use_orjson=_ORJSON_AVAILABLE):
+    """ returns function that encodes a list of dicts as compact UTF-8 bytes: the items of
+        a JSON array separated by "," without the brackets or, if ndjson is True, one JSON
+        object per line; values json can't encode (e.g. pathlib.Path) are encoded as str """
+    if use_orjson:
+        separator = b"\n" if ndjson else b","
+        end = b"\n" if ndjson else b""
+        return (
+            lambda rows: separator.join([orjson.dumps(row, default=str) for row in rows])
+            + end
+        )
+
+    # the same separators and escaping as orjson
+    encode = json.JSONEncoder(
+        separators=(",", ":"), ensure_ascii=False, default=str
+    ).encode
+    if ndjson:
+        return lambda rows: ("\n".join(map(encode, rows)) + "\n").encode("utf-8")
+    # one call for the whole batch, which json separates with ",", then drop the brackets
+    return lambda rows: encode(rows)[1:-1].encode("utf-8")
+
+
+def _write_json(photos, file, ndjson=False, use_orjson=_ORJSON_AVAILABLE):
+    """ writes the info about photos (iterable of PhotoInfo) to binary file as a JSON
+        array or, if ndjson is True, as one JSON object per line
+        use_orjson: if False, encode with json even if orjson is installed
+        returns number of photos written """
+    encode = _batch_encoder(ndjson, use_orjson)
+    photos = iter(photos)
+    count = 0
+    if not ndjson:
+        file.write(b"[")
+    while True:
+        batch = [p._json_dict() for p in itertools.islice(photos, _BATCH_SIZE)]
+        if not batch:
+            break
+        if count and not ndjson:
+            file.write(b",")
+        file.write(encode(batch))
+        count += len(batch)
+    if not ndjson:
+        file.write(b"]\n")
+    file.flush()
+    return count
@@ -0,0 +1,106 @@
+"""
+_LabelIndex class
+Two-way index between photos and the labels (keywords, persons, or albums) attached to them
+"""
+
+from array import array
+
+# typecode of the arrays holding asset ids and label ids (unsigned int, at least 4 bytes
+# on every platform Photos runs on)
+_ID_TYPECODE = "I"
+
+
+class _LabelIndex:
+    """
+    Index of labels (keyword, person name, or album uuid) by photo and photos by label
+    Photos are referred to by the integer asset id PhotosDB assigns to each uuid
+    and each distinct label is stored once and referred to by an integer label id
+    so the index holds only small arrays of integers
+    """
+
+    def __init__(self):
+        # label id: label
+        self._labels = []
+        # label: label id
+        self._label_ids = {}
+        # label id: array of asset ids, in the order they were added
+        # a label is removed from this when it no longer has any photos
+        self._by_label = {}
+        # asset id: array of label ids, in the order they were added
+        self._by_asset = {}
+
+    def add(self, asset_id, label):
+        """ attach label to the photo with asset_id """
+        try:
+            label_id = self._label_ids[label]
+        except KeyError:
+            label_id = self._label_ids[label] = len(self._labels)
+            self._labels.append(label)
+
+        try:
+            self._by_label[label_id].append(asset_id)
+        except KeyError:
+            self._by_label[label_id] = array(_ID_TYPECODE, [asset_id])
+
+        try:
+            self._by_asset[asset_id].append(label_id)
+        except KeyError:
+            self._by_asset[asset_id] = array(_ID_TYPECODE, [label_id])
+
+    def remove(self, asset_ids):
+        """ remove the photos with asset id in asset_ids (a set) from the index """
+        label_ids = set()
+        for asset_id in asset_ids:
+            label_ids.update(self._by_asset.pop(asset_id, ()))
+
+        # rebuild the photos only for the labels that were affected
+        for label_id in label_ids:
+            remaining = array(
+                _ID_TYPECODE,
+                (a for a in self._by_label[label_id] if a not in asset_ids),
+            )
+            if remaining:
+                self._by_label[label_id] = remaining
+            else:
+                del self._by_label[label_id]
+
+    def __contains__(self, label):
+        label_id = self._label_ids.get(label)
+        return label_id is not None and label_id in self._by_label
+
+    def __eq__(self, other):
+        if not isinstance(other, self.__class__):
+            return False
+        return self.labels() == other.labels() and all(
+            self._by_label[self._label_ids[label]]
+            == other._by_label[other._label_ids[label]]
+            for label in self.labels()
+        )
+
+    def __repr__(self):
+        by_label = {label: list(self.asset_ids(label)) for label in self.labels()}
+        return f"{self.__class__.__name__}({by_label})"
+
+    def labels(self):
+        """ returns list of all labels attached to at least one photo """
+        return [self._labels[label_id] for label_id in self._by_label]
+
+    def labels_for(self, asset_id):
+        """ returns list of labels attached to the photo with asset_id """
+        return [self._labels[label_id] for label_id in self._by_asset.get(asset_id, ())]
+
+    def has_labels(self, asset_id):
+        """ returns True if any label is attached to the photo with asset_id """
+        return asset_id in self._by_asset
+
+    def asset_ids(self, label):
+        """ returns array of asset ids of the photos label is attached to """
+        label_id = self._label_ids.get(label)
+        return self._by_label.get(label_id, array(_ID_TYPECODE))
+
+    def counts(self):
+        """ returns dict of label: number of photos label is attached to """
+        return {
+            self._labels[label_id]: len(asset_ids)
+            for label_id, asset_ids in self._by_label.items()
+        }
@@ -0,0 +1,40 @@
+"""
+_PhotoInfoCache class
+Identity map of the PhotoInfo objects of a PhotosDB so each photo has at most one PhotoInfo
+object in use and the values it has already computed are shared by every query that returns it
+"""
+
+import weakref
+
+
+class _PhotoInfoCache:
+    """
+    PhotoInfo objects by uuid, held by weak references so a PhotoInfo object is freed
+    when nothing else uses it
+    Cleared by PhotosDB whenever its photos change (load or refresh) so a query after
+    a refresh gets new PhotoInfo objects with the new data
+    """
+
+    def __init__(self, factory):
+        """ factory: function(uuid) that returns a new PhotoInfo object for uuid """
+        self._factory = factory
+        self._photos = weakref.WeakValueDictionary()
+
+    def __len__(self):
+        return len(self._photos)
+
+    def __eq__(self, other):
+        # the cached objects are made from what's in PhotosDB so they don't make
+        # two PhotosDB objects different
+        return isinstance(other, self.__class__)
+
+    def get(self, uuid):
+        """ returns the PhotoInfo object for uuid, making it if there isn't one in use """
+        photo = self._photos.get(uuid)
+        if photo is None:
+            photo = self._photos[uuid] = self._factory(uuid)
+        return photo
+
+    def clear(self):
+        """ forget all the PhotoInfo objects; the ones still in use keep their data """
+        self._photos.clear()
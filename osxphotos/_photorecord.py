@@ -0,0 +1,129 @@
+"""
+_PhotoRecord class
+Fixed-layout record that holds the information read from the Photos database for one photo
+"""
+
+from collections.abc import Mapping
+from datetime import datetime
+
+from ._constants import _PHOTOS_EPOCH
+
+# every field stored in a photo record
+# Photos <= 4 and Photos 5 each set a subset of these, see PhotosDB._process_database4
+# and PhotosDB._process_asset_row5
+# keywords, persons, and albums aren't stored here but in the PhotosDB indexes (see _LabelIndex)
+_PHOTO_RECORD_SLOTS = (
+    "_uuid",
+    "modelID",
+    "masterUuid",
+    "masterModelID",
+    "masterFingerprint",
+    "name",
+    "filename",
+    "originalFilename",
+    "directory",
+    "imagePath",
+    "volumeId",
+    "volume",
+    "lastmodifieddateSeconds",  # seconds since the Photos epoch
+    "imageDateSeconds",  # seconds since the Photos epoch
+    "imageTimeZoneOffsetSeconds",
+    "mainRating",
+    "hidden",
+    "favorite",
+    "latitude",
+    "longitude",
+    "extendedDescription",
+    "hasKeywords",
+    "hasPersons",
+    "hasAlbums",
+    "hasAdjustments",
+    "adjustmentUuid",
+    "adjustmentFormatID",
+    "edit_resource_id",
+    "type",
+    "UTI",
+    "burstUUID",
+    "burstPickType",
+    "burst",
+    "burst_key",
+    "specialType",
+    "subtype",
+    "customRenderedValue",
+    "live_photo",
+    "live_model_id",
+    "modeResourceIsOnDisk",
+    "screenshot",
+    "slow_mo",
+    "time_lapse",
+    "hdr",
+    "portrait",
+    "panorama",
+    "selfie",
+    "localAvailability",
+    "remoteAvailability",
+    "isMissing",
+    "cloudbatchpublishdate",
+    "shared",
+    "cloudAssetGUID",
+    "cloudLocalState",
+    "cloudLibraryState",
+    "cloudStatus",
+    "cloudAvailable",
+    "incloud",
+)
+
+# fields computed from the stored fields when they're read, see the _PhotoRecord properties
+_PHOTO_RECORD_COMPUTED_FIELDS = ("lastmodifieddate", "imageDate")
+
+_PHOTO_RECORD_FIELDS = _PHOTO_RECORD_SLOTS + _PHOTO_RECORD_COMPUTED_FIELDS
+_PHOTO_RECORD_FIELD_SET = frozenset(_PHOTO_RECORD_FIELDS)
+
+
+def _local_datetime(seconds):
+    """ returns naive datetime in local time for seconds since the Photos epoch or None """
+    if seconds is None:
+        return None
+    return datetime.fromtimestamp(seconds + _PHOTOS_EPOCH)
+
+
+class _PhotoRecord(Mapping):
+    """
+    Information about one photo, stored in slots instead of a per-photo dict
+    Fields are set as attributes while the database is loaded, e.g. record.burst = True
+    PhotoInfo reads them through the read-only mapping interface, e.g. record["burst"],
+    which behaves like the dict used previously: a field that was never set is missing
+    Dates are stored as read from the database and only made into datetimes when read
+    """
+
+    __slots__ = _PHOTO_RECORD_SLOTS
+
+    @property
+    def lastmodifieddate(self):
+        """ last modified date as naive datetime in local time """
+        return _local_datetime(self.lastmodifieddateSeconds)
+
+    @property
+    def imageDate(self):
+        """ creation date as naive datetime in local time """
+        return _local_datetime(self.imageDateSeconds)
+
+    def __getitem__(self, key):
+        if key not in _PHOTO_RECORD_FIELD_SET:
+            raise KeyError(key)
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __iter__(self):
+        for field in _PHOTO_RECORD_FIELDS:
+            if hasattr(self, field):
+                yield field
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        # same as the dict so repr(PhotoInfo) can still be evaluated to re-create the PhotoInfo
+        return repr(dict(self))
@@ -0,0 +1,290 @@
+"""
+Prefilter for PhotosDB
+Turns the arguments of PhotosDB.photos() and the other photo filters used by the command line
+query and export commands into a parameterized SQL query that returns the uuids of the photos
+that could match so PhotosDB only has to read those photos from the database
+The query may return more photos than match (e.g. the other photos of a burst) but never fewer:
+the filters are applied again to the photos that are read
+"""
+
+from ._constants import _PHOTOS_EPOCH, _UNKNOWN_PERSON
+
+# name of the SQL function registered by PhotosDB._prefilter_uuids to lower case text the same
+# way as str.lower (SQLite's lower() only handles ASCII)
+_LOWER_FUNCTION = "osxphotos_lower"
+
+# keys of the prefilter dict and what they select
+_PREFILTER_KEYS = {
+    # same as the PhotosDB.photos() argument
+    "keywords",
+    "uuid",
+    "persons",
+    "albums",
+    "images",
+    "movies",
+    "from_date",
+    "to_date",
+    # list of str: title / description contains every one
+    "title",
+    "description",
+    # if True, title and description are matched ignoring case
+    "ignore_case",
+    # if True, title / description is empty
+    "no_title",
+    "no_description",
+    # str: UTI contains this
+    "uti",
+    # True / False: PhotoInfo property with the same name is True / False; None: either
+    "favorite",
+    "hidden",
+    "hasadjustments",
+    "shared",
+    "burst",
+    "live_photo",
+    "iscloudasset",
+    "incloud",
+    # if True, the photos() call also has filters the prefilter doesn't select (e.g. text)
+    # so photos are read even if none of the keywords, etc. are in the library
+    "other_filters",
+}
+
+# everything below is (Photos <= 4, Photos 5)
+
+# tables and conditions of the photos read by PhotosDB._process_database4 / 5
+# correlated subqueries below refer to these tables by name
+_FROM = (
+    "RKVersion, RKMaster",
+    "ZGENERICASSET JOIN ZADDITIONALASSETATTRIBUTES "
+    "ON ZADDITIONALASSETATTRIBUTES.ZASSET = ZGENERICASSET.Z_PK",
+)
+_WHERE = (
+    "RKVersion.isInTrash = 0 AND RKVersion.masterUuid = RKMaster.uuid "
+    "AND RKVersion.filename NOT LIKE '%.pdf'",
+    "ZGENERICASSET.ZTRASHEDSTATE = 0",
+)
+
+# the same photos as a standalone subquery
+_ALL_UUIDS = (
+    "SELECT v.uuid FROM RKVersion AS v, RKMaster AS m "
+    "WHERE v.isInTrash = 0 AND v.masterUuid = m.uuid AND v.filename NOT LIKE '%.pdf'",
+    "SELECT a.ZUUID FROM ZGENERICASSET AS a "
+    "JOIN ZADDITIONALASSETATTRIBUTES AS aa ON aa.ZASSET = a.Z_PK "
+    "WHERE a.ZTRASHEDSTATE = 0",
+)
+
+# columns
+_UUID = ("RKVersion.uuid", "ZGENERICASSET.ZUUID")
+_BURST_UUID = ("RKVersion.burstUuid", "ZGENERICASSET.ZAVALANCHEUUID")
+_DATE = ("RKVersion.imageDate", "ZGENERICASSET.ZDATECREATED")
+_TYPE = ("RKVersion.type", "ZGENERICASSET.ZKIND")
+_TITLE = ("RKVersion.name", "ZADDITIONALASSETATTRIBUTES.ZTITLE")
+_DESCRIPTION = (
+    "RKVersion.extendedDescription",
+    "(SELECT ZASSETDESCRIPTION.ZLONGDESCRIPTION FROM ZASSETDESCRIPTION "
+    "WHERE ZASSETDESCRIPTION.Z_PK = ZADDITIONALASSETATTRIBUTES.ZASSETDESCRIPTION)",
+)
+_UTI = ("RKMaster.UTI", "ZGENERICASSET.ZUNIFORMTYPEIDENTIFIER")
+
+# value of _TYPE for images and movies
+_TYPE_VALUES = {"images": (2, 0), "movies": (8, 1)}
+
+# flags: name: (SQL true if the PhotoInfo property is True, SQL true if it's False)
+# each SQL is (Photos <= 4, Photos 5); a False SQL of None means NOT IFNULL(true SQL, 0)
+# "1" is used where a value can't be selected exactly (it's left to the filters applied later)
+_FLAGS = {
+    "favorite": (("RKVersion.isFavorite = 1", "ZGENERICASSET.ZFAVORITE = 1"), None),
+    "hidden": (("RKVersion.isHidden = 1", "ZGENERICASSET.ZHIDDEN = 1"), None),
+    "hasadjustments": (
+        ("RKVersion.hasAdjustments = 1", "ZGENERICASSET.ZHASADJUSTMENTS = 1"),
+        None,
+    ),
+    # shared is always None on Photos <= 4
+    "shared": (("0", "ZGENERICASSET.ZCLOUDBATCHPUBLISHDATE IS NOT NULL"), None),
+    "burst": (
+        ("RKVersion.burstUuid IS NOT NULL", "ZGENERICASSET.ZAVALANCHEUUID IS NOT NULL"),
+        None,
+    ),
+    "live_photo": (
+        ("RKVersion.specialType IN (5, 8)", "ZGENERICASSET.ZKINDSUBTYPE = 2"),
+        None,
+    ),
+    # on Photos <= 4 the cloud state is read from the last of possibly several RKCloudResource
+    # rows so only the True value is selected
+    "iscloudasset": (
+        (
+            "EXISTS (SELECT 1 FROM RKCloudResource, RKMaster AS m "
+            "WHERE m.fingerprint = RKCloudResource.fingerprint "
+            "AND m.uuid = RKVersion.masterUuid AND m.cloudLibraryState IS NOT NULL)",
+            "ZGENERICASSET.ZCLOUDASSETGUID IS NOT NULL",
+        ),
+        ("1", None),
+    ),
+    "incloud": (
+        (
+            "EXISTS (SELECT 1 FROM RKCloudResource, RKMaster AS m "
+            "WHERE m.fingerprint = RKCloudResource.fingerprint "
+            "AND m.uuid = RKVersion.masterUuid AND RKCloudResource.available = 1)",
+            "EXISTS (SELECT 1 FROM ZCLOUDMASTER "
+            "WHERE ZCLOUDMASTER.Z_PK = ZGENERICASSET.ZMASTER "
+            "AND ZCLOUDMASTER.ZCLOUDLOCALSTATE = 3)",
+        ),
+        ("1", None),
+    ),
+}
+
+# keywords, persons, and albums: (SQL true if the photo has the label, SQL true if any photo
+# has the label) with a ? for each of the names of the label (see _label_names)
+# photos() ignores a keyword, person, or album that's not in the library so both are needed
+_LABELS = {
+    "keywords": (
+        (
+            "EXISTS (SELECT 1 FROM RKKeywordForVersion, RKKeyword "
+            "WHERE RKKeyword.modelId = RKKeywordForVersion.keywordID "
+            "AND RKKeywordForVersion.versionID = RKVersion.modelId AND RKKeyword.name = ?)",
+            "EXISTS (SELECT 1 FROM Z_1KEYWORDS, ZKEYWORD "
+            "WHERE ZKEYWORD.Z_PK = Z_1KEYWORDS.Z_37KEYWORDS "
+            "AND Z_1KEYWORDS.Z_1ASSETATTRIBUTES = ZADDITIONALASSETATTRIBUTES.Z_PK "
+            "AND ZKEYWORD.ZTITLE = ?)",
+        ),
+        (
+            "EXISTS (SELECT 1 FROM RKKeywordForVersion, RKKeyword, RKVersion AS v, RKMaster AS m "
+            "WHERE RKKeyword.modelId = RKKeywordForVersion.keywordID "
+            "AND RKKeywordForVersion.versionID = v.modelId AND v.masterUuid = m.uuid "
+            "AND v.filename NOT LIKE '%.pdf' AND v.isInTrash = 0 AND RKKeyword.name = ?)",
+            "EXISTS (SELECT 1 FROM Z_1KEYWORDS, ZKEYWORD, ZGENERICASSET AS a "
+            "JOIN ZADDITIONALASSETATTRIBUTES AS aa ON aa.ZASSET = a.Z_PK "
+            "WHERE ZKEYWORD.Z_PK = Z_1KEYWORDS.Z_37KEYWORDS "
+            "AND Z_1KEYWORDS.Z_1ASSETATTRIBUTES = aa.Z_PK "
+            "AND a.ZTRASHEDSTATE = 0 AND ZKEYWORD.ZTITLE = ?)",
+        ),
+    ),
+    "persons": (
+        (
+            "EXISTS (SELECT 1 FROM RKFace, RKPerson "
+            "WHERE RKFace.personID = RKPerson.modelID "
+            "AND RKFace.imageModelId = RKVersion.modelId AND RKPerson.name = ?)",
+            "EXISTS (SELECT 1 FROM ZDETECTEDFACE, ZPERSON "
+            "WHERE ZDETECTEDFACE.ZPERSON = ZPERSON.Z_PK "
+            "AND ZDETECTEDFACE.ZASSET = ZGENERICASSET.Z_PK AND ZPERSON.ZFULLNAME IN (?, ?))",
+        ),
+        (
+            "EXISTS (SELECT 1 FROM RKFace, RKPerson, RKVersion AS v, RKMaster AS m "
+            "WHERE RKFace.personID = RKPerson.modelID AND v.modelId = RKFace.imageModelId "
+            "AND v.masterUuid = m.uuid AND v.filename NOT LIKE '%.pdf' AND v.isInTrash = 0 "
+            "AND RKPerson.name = ?)",
+            "EXISTS (SELECT 1 FROM ZDETECTEDFACE, ZPERSON, ZGENERICASSET AS a "
+            "WHERE ZDETECTEDFACE.ZPERSON = ZPERSON.Z_PK AND ZDETECTEDFACE.ZASSET = a.Z_PK "
+            "AND a.ZTRASHEDSTATE = 0 AND ZPERSON.ZFULLNAME IN (?, ?))",
+        ),
+    ),
+    # albums are selected by title, as in photos()
+    "albums": (
+        (
+            "EXISTS (SELECT 1 FROM RKAlbumVersion, RKAlbum "
+            "WHERE RKAlbum.modelID = RKAlbumVersion.albumId "
+            "AND RKAlbumVersion.versionID = RKVersion.modelId "
+            "AND RKAlbum.isInTrash = 0 AND RKAlbum.name = ?)",
+            "EXISTS (SELECT 1 FROM Z_26ASSETS, ZGENERICALBUM "
+            "WHERE ZGENERICALBUM.Z_PK = Z_26ASSETS.Z_26ALBUMS "
+            "AND Z_26ASSETS.Z_34ASSETS = ZGENERICASSET.Z_PK AND ZGENERICALBUM.ZTITLE = ?)",
+        ),
+        (
+            "EXISTS (SELECT 1 FROM RKAlbum WHERE RKAlbum.isInTrash = 0 AND RKAlbum.name = ?)",
+            "EXISTS (SELECT 1 FROM ZGENERICALBUM WHERE ZGENERICALBUM.ZTITLE = ?)",
+        ),
+    ),
+    "uuid": (
+        ("RKVersion.uuid = ?", "ZGENERICASSET.ZUUID = ?"),
+        (f"? IN ({_ALL_UUIDS[0]})", f"? IN ({_ALL_UUIDS[1]})"),
+    ),
+}
+
+
+def _label_names(key, label, photos5):
+    """ returns tuple of the names stored in the database for label (see _LABELS) """
+    if key == "persons" and photos5:
+        # Photos 5 stores the unknown person as an empty name, see PhotosDB._process_database5
+        return (label, "" if label == _UNKNOWN_PERSON else label)
+    return (label,)
+
+
+def _prefilter_sql(prefilter, photos5):
+    """ returns (sql, params) for the query that returns the uuid of every photo that
+        could match prefilter, a dict with keys in _PREFILTER_KEYS,
+        and of the other photos in the same burst as each such photo
+        photos5: True for Photos 5, False for Photos <= 4
+        text matched ignoring case is lower cased with the _LOWER_FUNCTION SQL function """
+    v = 1 if photos5 else 0
+    conditions = []
+    params = []
+
+    # keywords, persons, albums, uuid: each one the photo must have unless it's not in the library
+    found = []
+    found_params = []
+    for key in ["keywords", "persons", "albums", "uuid"]:
+        (has_sql, any_sql) = _LABELS[key]
+        for label in prefilter.get(key) or []:
+            names = _label_names(key, label, photos5)
+            conditions.append(f"({has_sql[v]} OR NOT {any_sql[v]})")
+            params.extend(names + names)
+            found.append(any_sql[v])
+            found_params.extend(names)
+
+    from_date = prefilter.get("from_date")
+    to_date = prefilter.get("to_date")
+    if found and not (from_date or to_date or prefilter.get("other_filters")):
+        # photos() returns nothing if none of them are in the library
+        conditions.append(f"({' OR '.join(found)})")
+        params.extend(found_params)
+
+    # dates are compared as seconds since the Photos epoch, see PhotosDB.photos
+    if from_date:
+        conditions.append(f"{_DATE[v]} >= ?")
+        params.append(from_date.timestamp() - _PHOTOS_EPOCH)
+    if to_date:
+        conditions.append(f"{_DATE[v]} <= ?")
+        params.append(to_date.timestamp() - _PHOTOS_EPOCH)
+
+    for key in ["images", "movies"]:
+        if prefilter.get(key) is False:
+            conditions.append(f"IFNULL({_TYPE[v]} <> {_TYPE_VALUES[key][v]}, 1)")
+
+    ignore_case = prefilter.get("ignore_case")
+    for (key, column) in [("title", _TITLE), ("description", _DESCRIPTION)]:
+        column = column[v]
+        for text in prefilter.get(key) or []:
+            if ignore_case:
+                conditions.append(f"instr({_LOWER_FUNCTION}({column}), ?) > 0")
+                params.append(text.lower())
+            else:
+                conditions.append(f"instr({column}, ?) > 0")
+                params.append(text)
+        if prefilter.get(f"no_{key}"):
+            conditions.append(f"IFNULL({column}, '') = ''")
+
+    uti = prefilter.get("uti")
+    if uti:
+        conditions.append(f"instr({_UTI[v]}, ?) > 0")
+        params.append(uti)
+
+    for (key, (true_sql, false_sql)) in _FLAGS.items():
+        value = prefilter.get(key)
+        if value is None:
+            continue
+        if value:
+            conditions.append(true_sql[v])
+        elif false_sql is None or false_sql[v] is None:
+            conditions.append(f"NOT IFNULL({true_sql[v]}, 0)")
+        else:
+            conditions.append(false_sql[v])
+
+    where = " AND ".join([_WHERE[v]] + conditions)
+    sql = (
+        f"WITH matched(uuid, burst_uuid) AS "
+        f"(SELECT {_UUID[v]}, {_BURST_UUID[v]} FROM {_FROM[v]} WHERE {where}) "
+        f"SELECT uuid FROM matched "
+        # the other photos in each burst so PhotoInfo.burst_photos is complete
+        f"UNION SELECT {_UUID[v]} FROM {_FROM[v]} WHERE {_WHERE[v]} "
+        f"AND {_BURST_UUID[v]} IN (SELECT burst_uuid FROM matched)"
+    )
+    return (sql, params)
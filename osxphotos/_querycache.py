@@ -0,0 +1,90 @@
+"""
+_QueryCache class
+Least recently used cache of the results of PhotosDB.photos() queries so the same query
+asked again is answered without running it, until the library is read again
+"""
+
+from collections import OrderedDict, namedtuple
+
+# statistics of a _QueryCache, same fields as functools.lru_cache's cache_info()
+QueryCacheInfo = namedtuple("QueryCacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+# maximum total number of uuids held by all the results in a _QueryCache
+# (about 8 bytes each as the uuid strings are shared with PhotosDB)
+_MAX_UUIDS = 1_000_000
+
+
+class _QueryCache:
+    """
+    Query results (tuple of the uuids of the matching photos) by query key, holding at
+    most maxsize results and maxuuids uuids in all; when it's full the least recently
+    used results are dropped and a result with more than maxuuids uuids isn't held at all
+    Cleared by PhotosDB whenever its photos change (load or refresh); hits and misses
+    are counted for the life of the cache
+    """
+
+    def __init__(self, maxsize, maxuuids=_MAX_UUIDS):
+        """ maxsize: maximum number of results to hold; 0 disables the cache
+            maxuuids: maximum total number of uuids in the results """
+        self.maxsize = maxsize
+        self.maxuuids = maxuuids
+        self.hits = 0
+        self.misses = 0
+        # incremented by clear so a result computed before the cache was cleared
+        # isn't added after it (see put)
+        self.generation = 0
+        self._results = OrderedDict()
+        # total number of uuids in _results
+        self._uuids = 0
+
+    def __len__(self):
+        return len(self._results)
+
+    def __eq__(self, other):
+        # the cached results are copies of what's in PhotosDB so they don't make
+        # two PhotosDB objects different
+        if not isinstance(other, self.__class__):
+            return False
+        return self.maxsize == other.maxsize
+
+    def get(self, key):
+        """ returns the result for key or None if it's not in the cache """
+        if not self.maxsize:
+            return None
+        try:
+            result = self._results[key]
+        except KeyError:
+            self.misses += 1
+            return None
+        self._results.move_to_end(key)
+        self.hits += 1
+        return result
+
+    def put(self, key, result, generation):
+        """ add result for key, dropping the least recently used result if the cache is full
+            generation: value of generation when the query was started; if the cache has
+            been cleared since, result may be out of date and isn't added """
+        if (
+            not self.maxsize
+            or generation != self.generation
+            or len(result) > self.maxuuids
+        ):
+            return
+        previous = self._results.pop(key, None)
+        if previous is not None:
+            self._uuids -= len(previous)
+        self._results[key] = result
+        self._uuids += len(result)
+        while len(self._results) > self.maxsize or self._uuids > self.maxuuids:
+            (_, dropped) = self._results.popitem(last=False)
+            self._uuids -= len(dropped)
+
+    def clear(self):
+        """ drop all the results; the statistics are kept """
+        self._results.clear()
+        self._uuids = 0
+        self.generation += 1
+
+    def info(self):
+        """ returns QueryCacheInfo with the cache statistics """
+        return QueryCacheInfo(self.hits, self.misses, self.maxsize, len(self._results))
@@ -0,0 +1,246 @@
+"""
+_QueryPlan class
+Parser for the boolean query expressions of PhotosDB.query(), e.g.
+keyword:Kids AND (person:Katie OR album:"Pumpkin Farm") AND NOT hidden
+and the plan that runs them as set operations on the PhotosDB indexes
+"""
+
+import re
+
+from ._flagindex import _PHOTO_FLAGS
+
+# fields of field:value terms; the value is looked up in the index for the field
+_QUERY_FIELDS = ("keyword", "person", "album", "uuid", "text")
+
+# flag names that can be used as terms: the _FlagIndex flags and the names
+# of the matching options of the command line utility
+_QUERY_FLAGS = {name: name for name in _PHOTO_FLAGS}
+_QUERY_FLAGS.update(
+    {
+        "missing": "ismissing",
+        "edited": "hasadjustments",
+        "live": "live_photo",
+        "cloudasset": "iscloudasset",
+    }
+)
+
+# tokens: parentheses, field:value (value may be quoted), "quoted string", or a word
+_TOKEN_RE = re.compile(
+    r'\s*(?:(?P<paren>[()])|(?P<field>\w+):(?:"(?P<quoted_value>[^"]*)"|(?P<value>[^\s()"]+))'
+    r'|"(?P<quoted>[^"]*)"|(?P<word>[^\s()"]+))'
+)
+
+
+def _tokenize(expr):
+    """ returns list of (kind, value) tokens of expr: ("(", None), (")", None),
+        ("term", (field, value)) or ("word", word) """
+    tokens = []
+    pos = 0
+    expr = expr.rstrip()
+    while pos < len(expr):
+        match = _TOKEN_RE.match(expr, pos)
+        if match is None or match.end() == pos:
+            raise ValueError(f"invalid query at position {pos}: {expr[pos:]}", expr)
+        pos = match.end()
+        if match["paren"]:
+            tokens.append((match["paren"], None))
+        elif match["field"]:
+            value = match["quoted_value"]
+            if value is None:
+                value = match["value"]
+            tokens.append(("term", (match["field"].lower(), value)))
+        elif match["quoted"] is not None:
+            # a quoted string by itself is a text search
+            tokens.append(("term", ("text", f'"{match["quoted"]}"')))
+        else:
+            tokens.append(("word", match["word"]))
+    return tokens
+
+
+class _Parser:
+    """ recursive descent parser for query expressions:
+        expr := and_expr (OR and_expr)*
+        and_expr := not_expr ([AND] not_expr)*
+        not_expr := NOT not_expr | ( expr ) | field:value | flag
+        returns nested tuples: ("or", [nodes]), ("and", [nodes]), ("not", node),
+        ("term", field, value), or ("flag", name) """
+
+    def __init__(self, expr):
+        self._expr = expr
+        self._tokens = _tokenize(expr)
+        self._pos = 0
+
+    def parse(self):
+        if not self._tokens:
+            raise ValueError("empty query", self._expr)
+        node = self._or()
+        if self._pos < len(self._tokens):
+            self._error("unexpected ')'")
+        return node
+
+    def _error(self, message):
+        raise ValueError(f"invalid query: {message}: {self._expr}", self._expr)
+
+    def _peek(self):
+        return self._tokens[self._pos] if self._pos < len(self._tokens) else (None, None)
+
+    def _is_operator(self, name):
+        kind, value = self._peek()
+        return kind == "word" and value.upper() == name
+
+    def _or(self):
+        nodes = [self._and()]
+        while self._is_operator("OR"):
+            self._pos += 1
+            nodes.append(self._and())
+        return nodes[0] if len(nodes) == 1 else ("or", nodes)
+
+    def _and(self):
+        nodes = [self._not()]
+        while True:
+            if self._is_operator("AND"):
+                self._pos += 1
+            else:
+                # terms next to each other are ANDed
+                kind, _ = self._peek()
+                if kind is None or kind == ")" or self._is_operator("OR"):
+                    break
+            nodes.append(self._not())
+        return nodes[0] if len(nodes) == 1 else ("and", nodes)
+
+    def _not(self):
+        kind, value = self._peek()
+        if kind is None:
+            self._error("unexpected end of query")
+        self._pos += 1
+        if kind == "(":
+            node = self._or()
+            if self._peek()[0] != ")":
+                self._error("missing ')'")
+            self._pos += 1
+            return node
+        if kind == ")":
+            self._error("unexpected ')'")
+        if kind == "term":
+            field, term = value
+            if field not in _QUERY_FIELDS:
+                self._error(
+                    f"unknown field '{field}', must be one of {', '.join(_QUERY_FIELDS)}"
+                )
+            return ("term", field, term)
+        if value.upper() == "NOT":
+            return ("not", self._not())
+        if value.upper() in ("AND", "OR"):
+            self._error(f"unexpected {value.upper()}")
+        if value.lower() not in _QUERY_FLAGS:
+            self._error(f"unknown flag '{value}'")
+        return ("flag", _QUERY_FLAGS[value.lower()])
+
+
+class _QueryPlan:
+    """
+    Parsed query expression that's run as set operations on the asset ids (see
+    PhotosDB._asset_id) of the photos matching each term
+    The terms of an AND are looked up first and intersected smallest first, the flags
+    of an AND are combined into one _FlagIndex lookup, and NOT inside an AND is a set
+    difference so the set of all photos is only needed for a NOT or AND of only NOTs
+    """
+
+    def __init__(self, expr):
+        """ expr: query expression; raises ValueError if it's not valid """
+        self.expr = expr
+        self.root = _Parser(expr).parse()
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.root!r})"
+
+    def asset_ids(self, lookup, flag_ids, all_ids):
+        """ returns set of the asset ids of the photos matching the expression
+            lookup: function(field, value) that returns the asset ids for a term
+            flag_ids: function(dict of flag name: True or False) that returns the asset ids
+            of the photos where each flag has the given value (see _FlagIndex.bits)
+            all_ids: function that returns the set of asset ids of all the photos """
+        return _Run(lookup, flag_ids, all_ids).run(self.root)
+
+
+class _Run:
+    """ one run of a _QueryPlan against the indexes given by the args of asset_ids """
+
+    def __init__(self, lookup, flag_ids, all_ids):
+        self._lookup = lookup
+        self._flag_ids = flag_ids
+        self._all_ids = all_ids
+        self._all = None
+
+    def _universe(self):
+        if self._all is None:
+            self._all = self._all_ids()
+        return self._all
+
+    def run(self, node):
+        """ returns set of the asset ids of the photos matching node """
+        kind = node[0]
+        if kind == "term":
+            return set(self._lookup(node[1], node[2]))
+        if kind == "flag":
+            return set(self._flag_ids({node[1]: True}))
+        if kind == "not":
+            child = node[1]
+            if child[0] == "flag":
+                return set(self._flag_ids({child[1]: False}))
+            return self._universe() - self.run(child)
+        if kind == "or":
+            asset_ids = set()
+            for child in node[1]:
+                asset_ids |= self.run(child)
+            return asset_ids
+        return self._run_and(node[1])
+
+    def _run_and(self, nodes):
+        # flags and NOT flags are combined into a single bitset lookup
+        flags = {}
+        terms = []
+        groups = []
+        negated = []
+        for node in nodes:
+            if node[0] == "flag" or (node[0] == "not" and node[1][0] == "flag"):
+                name, value = (node[1], True) if node[0] == "flag" else (node[1][1], False)
+                if flags.get(name, value) != value:
+                    # e.g. favorite AND NOT favorite
+                    return set()
+                flags[name] = value
+            elif node[0] == "term":
+                terms.append(node)
+            elif node[0] == "not":
+                negated.append(node[1])
+            else:
+                groups.append(node)
+
+        # terms are cheap index lookups so they're run first and the groups are
+        # skipped if the terms already select no photos
+        sets = [self.run(node) for node in terms]
+        if flags:
+            sets.append(set(self._flag_ids(flags)))
+        if any(not s for s in sets):
+            return set()
+        for node in groups:
+            asset_ids = self.run(node)
+            if not asset_ids:
+                return set()
+            sets.append(asset_ids)
+
+        if sets:
+            sets.sort(key=len)
+            asset_ids = set(sets[0])
+            for s in sets[1:]:
+                asset_ids &= s
+                if not asset_ids:
+                    return asset_ids
+        else:
+            asset_ids = set(self._universe())
+
+        for node in negated:
+            if not asset_ids:
+                break
+            asset_ids -= self.run(node)
+        return asset_ids
@@ -0,0 +1,90 @@
+"""
+_ResourceIndex class
+Index of the files in the resources folders of a Photos library so the edited and live photo
+files are found with one scan of each folder instead of a file system lookup for every photo
+"""
+
+import os
+
+# folders under the library holding the edited versions (Photos <= 4 and Photos 5)
+# and the video of live photos (Photos <= 4)
+_RESOURCE_FOLDERS = {
+    "version": os.path.join("resources", "media", "version"),
+    "master": os.path.join("resources", "media", "master"),
+    "renders": os.path.join("resources", "renders"),
+}
+
+
+def _scan(top):
+    """ generator that yields (path, filename) of the files under top, the folders
+        in each folder in sorted order (so 00 is first) and the files before the folders """
+    try:
+        with os.scandir(top) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
+    except OSError:
+        # the folder doesn't exist, e.g. a library without edits
+        return
+    folders = []
+    for entry in entries:
+        try:
+            if entry.is_dir():
+                folders.append(entry.path)
+            else:
+                yield (entry.path, entry.name)
+        except OSError:
+            continue
+    for folder in folders:
+        yield from _scan(folder)
+
+
+class _ResourceIndex:
+    """
+    Paths of the files in each resources folder by (top level folder, filename), e.g.
+    ("00", "fullsizeoutput_9.jpeg") for resources/media/version/00/02/fullsizeoutput_9.jpeg
+    A folder is scanned the first time a file in it is looked up; PhotoInfo path properties
+    resolved with resolve are kept until the index is rebuilt by PhotosDB (load or refresh)
+    """
+
+    def __init__(self, library_path):
+        """ library_path: path to the Photos library """
+        self._library_path = library_path
+        # folder name in _RESOURCE_FOLDERS: dict of (top level folder, filename): path
+        self._folders = {}
+        # (uuid, property name): resolved value
+        self._resolved = {}
+
+    def __eq__(self, other):
+        # the contents are read from disk on demand so they don't make two
+        # PhotosDB objects different
+        if not isinstance(other, self.__class__):
+            return False
+        return self._library_path == other._library_path
+
+    def _folder(self, name):
+        try:
+            return self._folders[name]
+        except KeyError:
+            pass
+        top = os.path.join(self._library_path, _RESOURCE_FOLDERS[name])
+        files = {}
+        for path, filename in _scan(top):
+            parts = os.path.relpath(path, top).split(os.sep)
+            # the first file found is kept, as the files in folder 00 come first
+            files.setdefault((parts[0] if len(parts) > 1 else "", filename), path)
+        self._folders[name] = files
+        return files
+
+    def find(self, name, folder, filename):
+        """ returns path of filename anywhere under top level folder of resources folder
+            name ("version", "master" or "renders") or None if there's no such file """
+        return self._folder(name).get((folder, filename))
+
+    def resolve(self, uuid, prop, compute):
+        """ returns the value of property prop of photo uuid, calling compute() to
+            get it the first time """
+        key = (uuid, prop)
+        try:
+            return self._resolved[key]
+        except KeyError:
+            value = self._resolved[key] = compute()
+            return value
@@ -0,0 +1,130 @@
+"""
+_TextIndex class
+Inverted index of the words in the titles, descriptions, keywords, persons and album titles
+of the photos so text searches don't have to look at every photo
+"""
+
+import re
+from array import array
+from bisect import bisect_left
+
+from ._labelindex import _ID_TYPECODE
+
+# a word is a run of letters, digits or underscores
+_WORD_RE = re.compile(r"\w+")
+
+# a search term is a "quoted phrase" or a run of non-space characters
+_TERM_RE = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def _words(text):
+    """ returns list of the case folded words in text """
+    return _WORD_RE.findall(text.casefold()) if text else []
+
+
+class _TextIndex:
+    """
+    Asset ids (see PhotosDB._asset_id) of the photos by each case folded word in their text
+    The index is rebuilt whenever the photos or their keywords, persons or albums change
+    """
+
+    def __init__(self, texts):
+        """ texts: iterable of (text, asset ids of the photos with text), e.g. a keyword
+            and the photos it's attached to; the same text may appear more than once """
+        postings = {}
+        # the words of each distinct text, as many photos share a keyword or title
+        words = {}
+        for text, asset_ids in texts:
+            try:
+                text_words = words[text]
+            except KeyError:
+                text_words = words[text] = set(_words(text))
+            for word in text_words:
+                postings.setdefault(word, set()).update(asset_ids)
+
+        # word: array of asset ids in ascending order
+        self._postings = {
+            word: array(_ID_TYPECODE, sorted(asset_ids))
+            for word, asset_ids in postings.items()
+        }
+        # all the words in sorted order so the words with a prefix are found with bisect
+        self._words = sorted(self._postings)
+
+    def __len__(self):
+        return len(self._words)
+
+    def __eq__(self, other):
+        if not isinstance(other, self.__class__):
+            return False
+        return self._postings == other._postings
+
+    def asset_ids(self, word):
+        """ returns array of the asset ids of the photos with word (case folded) """
+        return self._postings.get(word, array(_ID_TYPECODE))
+
+    def prefix_asset_ids(self, prefix):
+        """ returns set of the asset ids of the photos with a word starting with prefix """
+        asset_ids = set()
+        for i in range(bisect_left(self._words, prefix), len(self._words)):
+            word = self._words[i]
+            if not word.startswith(prefix):
+                break
+            asset_ids.update(self._postings[word])
+        return asset_ids
+
+    def search(self, text, texts_for):
+        """ returns set of the asset ids of the photos matching every term in text
+            a term is a word, a prefix ending in * (e.g. pump*) or a "quoted phrase"
+            whose words must appear next to each other in one of the photo's texts;
+            case is ignored
+            texts_for: function that returns the list of texts of a photo given its
+            asset id, used to check phrases against the photos with all the phrase words """
+        words = []
+        prefixes = []
+        phrases = []
+        for phrase, term in _TERM_RE.findall(text):
+            if phrase:
+                phrase_words = _words(phrase)
+                words.extend(phrase_words)
+                if len(phrase_words) > 1:
+                    phrases.append(phrase_words)
+            elif term.endswith("*") and _words(term):
+                term_words = _words(term)
+                words.extend(term_words[:-1])
+                prefixes.append(term_words[-1])
+            else:
+                words.extend(_words(term))
+
+        if not words and not prefixes:
+            return set()
+
+        # intersect the posting lists starting with the shortest
+        postings = sorted(
+            [self.asset_ids(word) for word in set(words)], key=lambda ids: len(ids)
+        )
+        postings.extend(self.prefix_asset_ids(prefix) for prefix in set(prefixes))
+        asset_ids = set(postings[0])
+        for ids in postings[1:]:
+            if not asset_ids:
+                break
+            asset_ids.intersection_update(ids)
+
+        if phrases:
+            asset_ids = {
+                asset_id
+                for asset_id in asset_ids
+                if all(_has_phrase(texts_for(asset_id), p) for p in phrases)
+            }
+        return asset_ids
+
+
+def _has_phrase(texts, phrase_words):
+    """ returns True if the words in phrase_words appear in order next to each other
+        in any of texts """
+    n = len(phrase_words)
+    for text in texts:
+        text_words = _words(text)
+        for i in range(len(text_words) - n + 1):
+            if text_words[i : i + n] == phrase_words:
+                return True
+    return False
@@ -4,6 +4,7 @@ Represents a single photo in the Photos library and provides access to the photo
 PhotosDB.photos() returns a list of PhotoInfo objects
 """
 
+import functools
 import json
 import logging
 import os.path
@@ -11,7 +12,7 @@ import pathlib
 import re
 import subprocess
 import sys
-from datetime import timedelta, timezone
+from datetime import datetime, timedelta, timezone
 from pprint import pformat
 
 import yaml
@@ -20,6 +21,7 @@ from ._constants import (
     _MOVIE_TYPE,
     _PHOTO_TYPE,
     _PHOTOS_5_SHARED_PHOTO_PATH,
+    _PHOTOS_EPOCH,
     _PHOTOS_5_VERSION,
 )
 from .utils import (
@@ -32,16 +34,44 @@ from .utils import (
 # TODO: check pylint output
 
 
+@functools.lru_cache(maxsize=None)
+def _timezone(seconds):
+    """ returns timezone for offset from UTC in seconds
+        cached since a library has only a few distinct offsets """
+    return timezone(timedelta(seconds=seconds))
+
+
+def _cached_property(func):
+    """ property whose value is computed the first time it's read and kept in the
+        PhotoInfo object's _cache; a list value is copied so callers can't change it """
+    name = func.__name__
+
+    @functools.wraps(func)
+    def getter(self):
+        try:
+            value = self._cache[name]
+        except KeyError:
+            value = self._cache[name] = func(self)
+        return list(value) if isinstance(value, list) else value
+
+    return property(getter)
+
+
 class PhotoInfo:
     """
     Info about a specific photo, contains all the details about the photo
     including keywords, persons, albums, uuid, path, etc.
+    PhotosDB returns the same PhotoInfo object for a photo while it's in use
     """
 
+    __slots__ = ("_uuid", "_info", "_db", "_cache", "__weakref__")
+
     def __init__(self, db=None, uuid=None, info=None):
         self._uuid = uuid
         self._info = info
         self._db = db
+        # values of the _cached_property properties
+        self._cache = {}
 
     @property
     def filename(self):
@@ -54,22 +84,20 @@ class PhotoInfo:
             Photos 5 mangles filenames upon import """
         return self._info["originalFilename"]
 
-    @property
+    @_cached_property
     def date(self):
         """ image creation date as timezone aware datetime object """
-        imagedate = self._info["imageDate"]
         seconds = self._info["imageTimeZoneOffsetSeconds"] or 0
-        delta = timedelta(seconds=seconds)
-        tz = timezone(delta)
-        imagedate_utc = imagedate.astimezone(tz=tz)
-        return imagedate_utc
+        return datetime.fromtimestamp(
+            self._info["imageDateSeconds"] + _PHOTOS_EPOCH, _timezone(seconds)
+        )
 
     @property
     def tzoffset(self):
         """ timezone offset from UTC in seconds """
         return self._info["imageTimeZoneOffsetSeconds"]
 
-    @property
+    @_cached_property
     def path(self):
         """ absolute path on disk of the original picture """
 
@@ -119,6 +147,10 @@ class PhotoInfo:
     def path_edited(self):
         """ absolute path on disk of the edited picture """
         """ None if photo has not been edited """
+        return self._db._resources.resolve(self._uuid, "path_edited", self._path_edited)
+
+    def _path_edited(self):
+        """ returns path_edited, looking for the file in the library's resource index """
 
         # TODO: break this code into a _path_edited_4 and _path_edited_5
         # version to simplify the big if/then; same for path_live_photo
@@ -147,33 +179,22 @@ class PhotoInfo:
 
                     # photopath appears to usually be in "00" subfolder but
                     # could be elsewhere--I haven't figured out this logic yet
-                    # first see if it's in 00
-                    photopath = os.path.join(
-                        library,
-                        "resources",
-                        "media",
-                        "version",
-                        folder_id,
-                        "00",
-                        filename,
-                    )
-
-                    if not os.path.isfile(photopath):
-                        rootdir = os.path.join(
-                            library, "resources", "media", "version", folder_id
+                    # the resource index looks in 00 first then the rest of folder_id
+                    photopath = self._db._resources.find("version", folder_id, filename)
+
+                    if photopath is None:
+                        expected = os.path.join(
+                            library,
+                            "resources",
+                            "media",
+                            "version",
+                            folder_id,
+                            "00",
+                            filename,
                         )
-
-                        for dirname, _, filelist in os.walk(rootdir):
-                            if filename in filelist:
-                                photopath = os.path.join(dirname, filename)
-                                break
-
-                    # check again to see if we found a valid file
-                    if not os.path.isfile(photopath):
                         logging.warning(
-                            f"MISSING PATH: edited file for UUID {self._uuid} should be at {photopath} but does not appear to exist"
+                            f"MISSING PATH: edited file for UUID {self._uuid} should be at {expected} but does not appear to exist"
                         )
-                        photopath = None
                 else:
                     logging.warning(
                         f"{self.uuid} hasAdjustments but edit_resource_id is None"
@@ -209,15 +230,15 @@ class PhotoInfo:
                     logging.debug(f"WARNING: unknown type {self._info['type']}")
                     return None
 
-                photopath = os.path.join(
-                    library, "resources", "renders", directory, filename
-                )
+                photopath = self._db._resources.find("renders", directory, filename)
 
-                if not os.path.isfile(photopath):
+                if photopath is None:
+                    expected = os.path.join(
+                        library, "resources", "renders", directory, filename
+                    )
                     logging.warning(
-                        f"edited file for UUID {self._uuid} should be at {photopath} but does not appear to exist"
+                        f"edited file for UUID {self._uuid} should be at {expected} but does not appear to exist"
                     )
-                    photopath = None
             else:
                 photopath = None
 
@@ -234,23 +255,25 @@ class PhotoInfo:
         """ long / extended description of picture """
         return self._info["extendedDescription"]
 
-    @property
+    @_cached_property
     def persons(self):
         """ list of persons in picture """
-        return self._info["persons"]
+        return self._db._dbfaces.labels_for(self._asset_id)
 
-    @property
+    @_cached_property
     def albums(self):
         """ list of albums picture is contained in """
         albums = []
-        for album in self._info["albums"]:
+        for album in self._db._dbalbums.labels_for(self._asset_id):
             albums.append(self._db._dbalbum_details[album]["title"])
         return albums
 
-    @property
+    @_cached_property
     def keywords(self):
         """ list of keywords for picture """
-        return self._info["keywords"]
+        if self._info["hasKeywords"] != 1:
+            return []
+        return self._db._dbkeywords.labels_for(self._asset_id)
 
     @property
     def title(self):
@@ -360,16 +383,32 @@ class PhotoInfo:
         """ Returns True if photo is part of a Burst photo set, otherwise False """
         return self._info["burst"]
 
+    @property
+    def burst_key(self):
+        """ Returns True if photo is a selected (key) photo of a Burst photo set,
+            False if it's part of a Burst photo set but not selected, otherwise None """
+        return self._info["burst_key"]
+
+    @property
+    def burst_key_photo(self):
+        """ If photo is a burst photo, returns PhotoInfo object of the selected (key)
+            photo of its Burst photo set, which may be self; otherwise returns None.
+            If more than one photo was selected, returns the earliest """
+        if not self._info["burst"]:
+            return None
+        key = self._db._bursts.key(self._info["burstUUID"])
+        return self._db._photoinfos.get(key) if key is not None else None
+
     @property
     def burst_photos(self):
         """ If photo is a burst photo, returns list of PhotoInfo objects 
             that are part of the same burst photo set; otherwise returns empty list.
-            self is not included in the returned list """
+            self is not included in the returned list; key photos are first """
         if self._info["burst"]:
             burst_uuid = self._info["burstUUID"]
             burst_photos = [
-                PhotoInfo(db=self._db, uuid=u, info=self._db._dbphotos[u])
-                for u in self._db._dbphotos_burst[burst_uuid]
+                self._db._photoinfos.get(u)
+                for u in self._db._bursts.members(burst_uuid)
                 if u != self._uuid
             ]
             return burst_photos
@@ -386,6 +425,13 @@ class PhotoInfo:
         """ Returns path to the associated video file for a live photo
             If photo is not a live photo, returns None
             If photo is missing, returns None """
+        return self._db._resources.resolve(
+            self._uuid, "path_live_photo", self._path_live_photo
+        )
+
+    def _path_live_photo(self):
+        """ returns path_live_photo, looking for the file in the library's resource
+            index on Photos <= 4 """
 
         photopath = None
         if self._db._db_version < _PHOTOS_5_VERSION:
@@ -396,26 +442,26 @@ class PhotoInfo:
                     photopath = None
                 else:
                     folder_id, file_id = _get_resource_loc(live_model_id)
-                    library_path = self._db.library_path
-                    photopath = os.path.join(
-                        library_path,
-                        "resources",
-                        "media",
-                        "master",
-                        folder_id,
-                        "00",
-                        f"jpegvideocomplement_{file_id}.mov",
-                    )
-                    if not os.path.isfile(photopath):
+                    filename = f"jpegvideocomplement_{file_id}.mov"
+                    photopath = self._db._resources.find("master", folder_id, filename)
+                    if photopath is None:
                         # In testing, I've seen occasional missing movie for live photo
                         # These appear to be valid -- e.g. live component hasn't been downloaded from iCloud
                         # photos 4 has "isOnDisk" column we could check
                         # or could do the actual check with "isfile"
                         # TODO: should this be a warning or debug?
+                        expected = os.path.join(
+                            self._db.library_path,
+                            "resources",
+                            "media",
+                            "master",
+                            folder_id,
+                            "00",
+                            filename,
+                        )
                         logging.debug(
-                            f"MISSING PATH: live photo path for UUID {self._uuid} should be at {photopath} but does not appear to exist"
+                            f"MISSING PATH: live photo path for UUID {self._uuid} should be at {expected} but does not appear to exist"
                         )
-                        photopath = None
             else:
                 photopath = None
         else:
@@ -646,6 +692,11 @@ class PhotoInfo:
         f.write(json_str)
         f.close()
 
+    @property
+    def _asset_id(self):
+        """ Returns the integer id of the photo in the PhotosDB indexes """
+        return self._db._asset_ids[self._uuid]
+
     @property
     def _longitude(self):
         """ Returns longitude, in degrees """
@@ -693,7 +744,11 @@ class PhotoInfo:
 
     def json(self):
         """ return JSON representation """
-        pic = {
+        return json.dumps(self._json_dict())
+
+    def _json_dict(self):
+        """ returns dict of the values in the JSON representation, see json() """
+        return {
             "uuid": self.uuid,
             "filename": self.filename,
             "original_filename": self.original_filename,
@@ -722,14 +777,23 @@ class PhotoInfo:
             "iscloudasset": self.iscloudasset,
             "incloud": self.incloud,
         }
-        return json.dumps(pic)
+
+    def _key(self):
+        """ (library path, uuid) that identifies the photo """
+        library_path = self._db._library_path if self._db is not None else None
+        return (library_path, self._uuid)
 
     # compare two PhotoInfo objects for equality
+    # two PhotoInfo objects are the same photo if they're from the same library and have
+    # the same uuid, so photos from different calls to PhotosDB.photos() compare equal
     def __eq__(self, other):
         if isinstance(other, self.__class__):
-            return self.__dict__ == other.__dict__
+            return self._key() == other._key()
 
         return False
 
     def __ne__(self, other):
         return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash(self._key())
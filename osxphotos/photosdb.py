@@ -3,47 +3,309 @@ PhotosDB class
 Processes a Photos.app library database to extract information about photos
 """
 
+import hashlib
+import heapq
+import itertools
 import logging
 import os
 import os.path
 import pathlib
+import pickle
 import platform
 import sqlite3
 import sys
 import tempfile
-from datetime import datetime
-from pprint import pformat
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 from shutil import copyfile
 
+from ._albumindex import _AlbumIndex
+from ._burstindex import _BurstIndex
+from ._columns import _NUMPY_AVAILABLE, _ColumnStore
 from ._constants import (
     _MOVIE_TYPE,
+    _OSXPHOTOS_CACHE_DIR,
     _PHOTO_TYPE,
+    _PHOTOS_EPOCH,
     _PHOTOS_5_VERSION,
+    _SNAPSHOT_VERSION,
     _TESTED_DB_VERSIONS,
     _TESTED_OS_VERSIONS,
     _UNKNOWN_PERSON,
 )
+from ._dateindex import _DateIndex
+from ._flagindex import _PHOTO_FLAGS, _FlagIndex
+from ._geoindex import _GeoIndex, _distance_km
+from ._labelindex import _LabelIndex
+from ._photocache import _PhotoInfoCache
+from ._photorecord import _PhotoRecord
+from ._prefilter import _LOWER_FUNCTION, _PREFILTER_KEYS, _prefilter_sql
+from ._querycache import _QueryCache
+from ._queryexpr import _QueryPlan
+from ._resourceindex import _ResourceIndex
+from ._textindex import _TextIndex
 from ._version import __version__
 from .photoinfo import PhotoInfo
 from .utils import _check_file_exists, _get_os_version, get_last_library_path, _debug
 
 # TODO: Add test for imageTimeZoneOffsetSeconds = None
-# TODO: Fix command line so multiple --keyword, etc. are AND (instead of OR as they are in .photos())
-#       Or fix the help text to match behavior
 # TODO: Add test for __str__ and to_json
 # TODO: fix docstrings
 # TODO: Add special albums and magic albums
 # TODO: cleanup os.path and pathlib code (import pathlib and also from pathlib import Path)
 
+# PhotosDB attributes saved to / restored from the snapshot cache
+_SNAPSHOT_ATTRIBUTES = [
+    "_db_version",
+    "_dbfile_actual",
+    "_dbphotos",
+    "_dbphotos_burst",
+    "_asset_ids",
+    "_asset_uuids",
+    "_dbfaces",
+    "_dbkeywords",
+    "_dbalbums",
+    "_dbalbum_details",
+    "_dbvolumes",
+]
+
+# ways of reading the database, see PhotosDB.__init__
+_LOADERS = ["sequential", "joined", "parallel"]
+
+# details about all albums, see PhotosDB._process_album_details5
+_PHOTOS_5_ALBUM_DETAILS_QUERY = (
+    "SELECT "
+    "ZUUID, "  # 0
+    "ZTITLE, "  # 1
+    "ZCLOUDLOCALSTATE, "  # 2
+    "ZCLOUDOWNERFIRSTNAME, "  # 3
+    "ZCLOUDOWNERLASTNAME, "  # 4
+    "ZCLOUDOWNERHASHEDPERSONID "  # 5
+    "FROM ZGENERICALBUM"
+)
+
+# columns read for each asset by _process_database5 and _process_database5_joined
+# see _process_asset_row5 for the meaning of each column
+_PHOTOS_5_ASSET_COLUMNS = """ZGENERICASSET.ZUUID, 
+                ZADDITIONALASSETATTRIBUTES.ZMASTERFINGERPRINT, 
+                ZADDITIONALASSETATTRIBUTES.ZTITLE, 
+                ZADDITIONALASSETATTRIBUTES.ZORIGINALFILENAME, 
+                ZGENERICASSET.ZMODIFICATIONDATE, 
+                ZGENERICASSET.ZDATECREATED, 
+                ZADDITIONALASSETATTRIBUTES.ZTIMEZONEOFFSET, 
+                ZADDITIONALASSETATTRIBUTES.ZINFERREDTIMEZONEOFFSET, 
+                ZADDITIONALASSETATTRIBUTES.ZTIMEZONENAME, 
+                ZGENERICASSET.ZHIDDEN, 
+                ZGENERICASSET.ZFAVORITE, 
+                ZGENERICASSET.ZDIRECTORY, 
+                ZGENERICASSET.ZFILENAME, 
+                ZGENERICASSET.ZLATITUDE, 
+                ZGENERICASSET.ZLONGITUDE, 
+                ZGENERICASSET.ZHASADJUSTMENTS, 
+                ZGENERICASSET.ZCLOUDBATCHPUBLISHDATE, 
+                ZGENERICASSET.ZKIND, 
+                ZGENERICASSET.ZUNIFORMTYPEIDENTIFIER,
+                ZGENERICASSET.ZAVALANCHEUUID,
+                ZGENERICASSET.ZAVALANCHEPICKTYPE,
+                ZGENERICASSET.ZKINDSUBTYPE,
+                ZGENERICASSET.ZCUSTOMRENDEREDVALUE,
+                ZADDITIONALASSETATTRIBUTES.ZCAMERACAPTUREDEVICE,
+                ZGENERICASSET.ZCLOUDASSETGUID
+"""
+
+
+def _lower(text):
+    """ SQL function that lower cases text the same way as str.lower, see _prefilter """
+    return text.lower() if text is not None else None
+
+
+# sort_by values of photos(): (_PhotoRecord field or None for the uuid, True to ignore case)
+_SORT_FIELDS = {
+    "date": ("imageDateSeconds", False),
+    "modified_date": ("lastmodifieddateSeconds", False),
+    "title": ("name", True),
+    "description": ("extendedDescription", True),
+    "filename": ("filename", True),
+    "original_filename": ("originalFilename", True),
+    "uuid": (None, False),
+}
+
+
+# group_by values of count_by(), in addition to the flags in _PHOTO_FLAGS
+_COUNT_BY_FIELDS = ("year", "month", "type", "uti", "keyword", "person", "album")
+
+
+def _check_page(sort_by, limit, offset):
+    """ raises ValueError if the sort_by, limit, or offset args to photos() aren't valid """
+    if sort_by is not None and sort_by not in _SORT_FIELDS:
+        raise ValueError(
+            f"sort_by must be one of {', '.join(_SORT_FIELDS)}: {sort_by}", sort_by
+        )
+    if limit is not None and limit < 0:
+        raise ValueError(f"limit must be >= 0: {limit}", limit)
+    if offset < 0:
+        raise ValueError(f"offset must be >= 0: {offset}", offset)
+
+
+def _query_key(
+    keywords,
+    uuid,
+    persons,
+    albums,
+    images,
+    movies,
+    from_date,
+    to_date,
+    from_modified_date,
+    to_modified_date,
+    flags,
+    text,
+    where,
+    near,
+    bbox,
+):
+    """ returns hashable key for the _QueryCache from the args to photos() so the same
+        query written differently (e.g. keywords in another order) has the same key
+        flags: dict of flag name: True or False for the flag args to photos() """
+
+    def names(values):
+        # keywords, etc. are "or"ed so their order doesn't matter
+        return tuple(sorted(set(values))) if values else None
+
+    def seconds(date):
+        # naive datetimes are local time so compare the times they refer to
+        return date.timestamp() if date else None
+
+    return (
+        names(keywords),
+        names(uuid),
+        names(persons),
+        names(albums),
+        bool(images),
+        bool(movies),
+        seconds(from_date),
+        seconds(to_date),
+        seconds(from_modified_date),
+        seconds(to_modified_date),
+        tuple(sorted(flags.items())),
+        text or None,
+        where or None,
+        tuple(near) if near else None,
+        tuple(bbox) if bbox else None,
+    )
+
+
+class _LoaderQueries:
+    """ runs the queries used by a PhotosDB loader (e.g. _process_database5)
+        queries: dict of name: SQL query; rows for each query are accessed as results[name]
+        uuids: if not None, create the temp table of uuids used to filter queries (see refresh) 
+        if photosdb._loader is "parallel", all the queries are started at once on a thread pool 
+        with a separate read-only connection for each; otherwise they're run one at a time 
+        on a single connection as each one's rows are needed
+        used as a context manager so the connection(s) are closed even if loading fails """
+
+    def __init__(self, photosdb, queries, uuids=None):
+        self._photosdb = photosdb
+        self._queries = queries
+        self._uuids = uuids
+        self._conn = None
+        self._executor = None
+        self._futures = None
+
+        if photosdb._loader == "parallel":
+            # rows from the first queries can be processed while the others are still running
+            workers = min(len(queries), os.cpu_count() or 1)
+            self._executor = ThreadPoolExecutor(max_workers=workers)
+            self._futures = {
+                name: self._executor.submit(self._fetch_rows, sql)
+                for name, sql in queries.items()
+            }
+        else:
+            (self._conn, c) = photosdb._open_sql_file(photosdb._tmp_db)
+            if uuids is not None:
+                try:
+                    photosdb._create_uuid_table(c, uuids)
+                except Exception:
+                    self.close()
+                    raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __getitem__(self, name):
+        if self._futures is not None:
+            return self._futures[name].result()
+        return self._conn.execute(self._queries[name])
+
+    def _fetch_rows(self, sql):
+        """ run a single query on its own connection and return all the rows """
+        (conn, c) = self._photosdb._open_sql_file(self._photosdb._tmp_db)
+        try:
+            if self._uuids is not None:
+                self._photosdb._create_uuid_table(c, self._uuids)
+            c.execute(sql)
+            return c.fetchall()
+        finally:
+            conn.close()
+
+    def close(self):
+        """ close the database connection(s) """
+        if self._executor is not None:
+            # queries that haven't started aren't needed if loading stopped part way
+            for future in self._futures.values():
+                future.cancel()
+            # wait for the workers to close their connections
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
 
 class PhotosDB:
     """ Processes a Photos.app library database to extract information about photos """
 
-    def __init__(self, *dbfile_, dbfile=None):
+    def __init__(
+        self,
+        *dbfile_,
+        dbfile=None,
+        copy_db=True,
+        immutable=False,
+        use_cache=False,
+        cache_dir=None,
+        loader="sequential",
+        prefilter=None,
+        query_cache_size=128,
+    ):
         """ create a new PhotosDB object 
             path to photos library or database may be specified EITHER as first argument or as named argument dbfile=path 
             specify full path to photos library or photos.db as first argument 
-            specify path to photos library or photos.db using named argument dbfile=path """
+            specify path to photos library or photos.db using named argument dbfile=path 
+            copy_db: if True (default), read from a temporary copy of the database;
+                     if False, read the database in place (read-only), falling back to
+                     a copy if the database is locked or changes while it's read
+            immutable: with copy_db=False, open the database as immutable (no locking)
+                       if it has no write-ahead log; only safe if Photos isn't running
+            use_cache: if True, save a snapshot of the parsed library to disk and reuse it 
+                       the next time the library is opened if the database files have not changed
+            cache_dir: directory for the snapshot cache; default is ~/Library/Caches/osxphotos 
+            loader: how the database is read; one of:
+                    "sequential" (default): one query per table 
+                    "joined": Photos 5 only, reads all the per-photo data in two joined queries; 
+                              Photos <= 4 libraries are always read with "sequential" 
+                    "parallel": same queries as "sequential" but run at the same time,
+                                each on its own connection 
+            prefilter: if not None, dict of filters (see _prefilter._PREFILTER_KEYS) 
+                       evaluated in SQL so only the photos that could match them are read 
+                       from the database; photos(), keywords, albums, etc. then only know about 
+                       those photos; can't be used with use_cache 
+            query_cache_size: number of photos() results to keep so the same query asked again
+                              is answered without running it; default is 128, 0 disables it;
+                              the results are dropped whenever the library is read or refreshed """
 
         # Check OS version
         system = platform.system()
@@ -61,30 +323,99 @@ class PhotosDB:
         self._dbfile = None
         # the actual file with library data which on Photos 5 is Photos.sqlite instead of photos.db
         self._dbfile_actual = None
-        # Dict with information about all photos by uuid
+        # Dict with information (a _PhotoRecord) about all photos by uuid
         self._dbphotos = {}
         # Dict with information about all burst photos by burst uuid
         self._dbphotos_burst = {}
-        # Dict with information about all persons/photos by uuid
-        self._dbfaces_uuid = {}
-        # Dict with information about all persons/photos by person
-        self._dbfaces_person = {}
-        # Dict with information about all keywords/photos by uuid
-        self._dbkeywords_uuid = {}
-        # Dict with information about all keywords/photos by keyword
-        self._dbkeywords_keyword = {}
-        # Dict with information about all albums/photos by uuid
-        self._dbalbums_uuid = {}
-        # Dict with information about all albums/photos by album
-        self._dbalbums_album = {}
+        # Dict with integer asset id of every photo uuid seen in the database, see _asset_id
+        self._asset_ids = {}
+        # List with the uuid of each asset id
+        self._asset_uuids = []
+        # Index of persons by asset id and asset ids by person
+        self._dbfaces = _LabelIndex()
+        # Index of keywords by asset id and asset ids by keyword
+        self._dbkeywords = _LabelIndex()
+        # Index of albums (album uuid) by asset id and asset ids by album
+        self._dbalbums = _LabelIndex()
         # Dict with information about album details
         self._dbalbum_details = {}
         # Dict with information about all the volumes/photos by uuid
         self._dbvolumes = {}
 
+        # columnar copy of _dbphotos for vectorized filtering, None if NumPy isn't installed
+        # built from _dbphotos by _build_indexes so it's not saved in the snapshot cache
+        self._columns = None
+
+        # bitsets of the photos where each flag (favorite, hidden, etc.) is True / False
+        # built from _dbphotos by _build_indexes so it's not saved in the snapshot cache
+        self._flags = None
+
+        # photos sorted by creation date and by last modified date, for date range queries
+        # built from _dbphotos by _build_indexes so they're not saved in the snapshot cache
+        self._dates = None
+        self._modified_dates = None
+
+        # album uuids by title and photo counts of owned / shared albums by title
+        # built from _dbalbum_details and _dbalbums by _build_indexes so it's not saved in the snapshot cache
+        self._album_titles = None
+
+        # photos of each burst set in order, key photos first
+        # built from _dbphotos_burst by _build_indexes so it's not saved in the snapshot cache
+        self._bursts = None
+
+        # photos by location, for location queries
+        # built from _dbphotos by _build_indexes so it's not saved in the snapshot cache
+        self._locations = None
+
+        # photos by each word of their title, description, keywords, persons and album titles
+        # built by _build_indexes so it's not saved in the snapshot cache
+        self._text = None
+
+        # files in the resources folders and the resolved edited / live photo paths
+        # rebuilt by _build_indexes as the files may have changed, not saved in the snapshot cache
+        self._resources = None
+
+        # least recently used photos() results, cleared by _build_indexes
+        self._query_cache = _QueryCache(query_cache_size)
+
+        # the PhotoInfo object of each photo in use, so queries share them; cleared by _build_indexes
+        self._photoinfos = _PhotoInfoCache(self._new_photoinfo)
+
         # list of temporary files created so we can clean them up later
         self._tmp_files = []
 
+        # if True, copy the database to a temp file instead of reading it in place
+        self._copy_db = copy_db
+        # if True and reading in place, open the database with immutable=1
+        self._immutable = immutable
+        # how the database was opened: "immutable", "readonly", or "copy" (see _prepare_db_file)
+        # or "snapshot" if restored from the snapshot cache
+        self._db_open_mode = None
+        # file or URI of the database to read from (see _prepare_db_file)
+        self._tmp_db = None
+
+        if loader not in _LOADERS:
+            raise ValueError(
+                f"loader must be one of {', '.join(_LOADERS)}: {loader}", loader
+            )
+        self._loader = loader
+
+        if prefilter is not None:
+            unknown = set(prefilter) - _PREFILTER_KEYS
+            if unknown:
+                raise ValueError(
+                    f"unknown prefilter keys: {', '.join(sorted(unknown))}", prefilter
+                )
+            if use_cache:
+                raise ValueError(
+                    "prefilter can't be used with use_cache", prefilter, use_cache
+                )
+        self._prefilter = prefilter
+
+        # snapshot cache of the parsed library
+        self._use_cache = use_cache
+        self._cache_dir = os.path.expanduser(cache_dir or _OSXPHOTOS_CACHE_DIR)
+
         if _debug():
             logging.debug(f"dbfile = {dbfile}")
 
@@ -125,7 +456,35 @@ class PhotosDB:
 
         self._dbfile = self._dbfile_actual = os.path.abspath(dbfile)
 
-        self._tmp_db = self._copy_db_file(self._dbfile)
+        # fingerprint must be taken before reading the database in case it changes while being read
+        self._fingerprint = self._db_fingerprint()
+        snapshot_loaded = self._use_cache and self._load_snapshot(self._fingerprint)
+
+        if not snapshot_loaded:
+            self._read_with_fallback(self._read_database)
+
+        library_path = os.path.dirname(self._dbfile)
+        (library_path, _) = os.path.split(library_path)  # drop /database from path
+        self._library_path = library_path
+        if int(self._db_version) < int(_PHOTOS_5_VERSION):
+            masters_path = os.path.join(library_path, "Masters")
+            self._masters_path = masters_path
+        else:
+            masters_path = os.path.join(library_path, "originals")
+            self._masters_path = masters_path
+
+        if _debug():
+            logging.debug(f"library = {library_path}, masters = {masters_path}")
+
+        if not snapshot_loaded and self._use_cache:
+            self._save_snapshot(self._fingerprint)
+
+        self._build_indexes()
+
+    def _read_database(self):
+        """ reads the version and all the photos (or those matching the prefilter) from the
+            library database into the empty data structures set up by __init__ """
+        self._tmp_db = self._prepare_db_file(self._dbfile)
         self._db_version = self._get_db_version()
 
         # If Photos >= 5, actual data isn't in photos.db but in Photos.sqlite
@@ -137,30 +496,51 @@ class PhotosDB:
             if not _check_file_exists(dbfile):
                 sys.exit(f"dbfile {dbfile} does not exist")
             else:
-                self._tmp_db = self._copy_db_file(dbfile)
+                self._tmp_db = self._prepare_db_file(dbfile)
                 self._dbfile_actual = dbfile
             if _debug():
                 logging.debug(
                     f"_dbfile = {self._dbfile}, _dbfile_actual = {self._dbfile_actual}"
                 )
 
-        library_path = os.path.dirname(os.path.abspath(dbfile))
-        (library_path, _) = os.path.split(library_path)  # drop /database from path
-        self._library_path = library_path
-        if int(self._db_version) < int(_PHOTOS_5_VERSION):
-            masters_path = os.path.join(library_path, "Masters")
-            self._masters_path = masters_path
-        else:
-            masters_path = os.path.join(library_path, "originals")
-            self._masters_path = masters_path
-
-        if _debug():
-            logging.debug(f"library = {library_path}, masters = {masters_path}")
-
-        if int(self._db_version) < int(_PHOTOS_5_VERSION):
-            self._process_database4()
+        if self._prefilter is None:
+            self._load_database()
         else:
-            self._process_database5()
+            self._load_database(uuids=self._prefilter_uuids())
+
+    def _read_with_fallback(self, read):
+        """ calls read(), which reads from the database; returns True if it failed
+            and the library was read again from a copy, otherwise False
+            If the database is read in place (copy_db=False) and Photos writes to it
+            while it's being read, SQLite can report it's locked (SQLITE_BUSY) or corrupt
+            (SQLITE_CORRUPT) part way through; then everything read so far is dropped and
+            the whole library is read again from a temporary copy """
+        try:
+            read()
+            return False
+        except sqlite3.DatabaseError as e:
+            if self._db_open_mode not in ("readonly", "immutable"):
+                raise
+            logging.warning(
+                f"could not read {self._dbfile_actual} in place ({e}), reading a copy"
+            )
+            self._reset_data()
+            self._copy_db = True
+            self._read_database()
+            return True
+
+    def _reset_data(self):
+        """ empties the data structures read from the database """
+        self._dbfile_actual = self._dbfile
+        self._dbphotos = {}
+        self._dbphotos_burst = {}
+        self._asset_ids = {}
+        self._asset_uuids = []
+        self._dbfaces = _LabelIndex()
+        self._dbkeywords = _LabelIndex()
+        self._dbalbums = _LabelIndex()
+        self._dbalbum_details = {}
+        self._dbvolumes = {}
 
     def _cleanup_tmp_files(self):
         """ removes all temporary files whose names are stored in self.tmp_files
@@ -190,76 +570,45 @@ class PhotosDB:
     @property
     def keywords_as_dict(self):
         """ return keywords as dict of keyword, count in reverse sorted order (descending) """
-        keywords = {}
-        for k in self._dbkeywords_keyword.keys():
-            keywords[k] = len(self._dbkeywords_keyword[k])
+        keywords = self._dbkeywords.counts()
         keywords = dict(sorted(keywords.items(), key=lambda kv: kv[1], reverse=True))
         return keywords
 
     @property
     def persons_as_dict(self):
         """ return persons as dict of person, count in reverse sorted order (descending) """
-        persons = {}
-        for k in self._dbfaces_person.keys():
-            persons[k] = len(self._dbfaces_person[k])
+        persons = self._dbfaces.counts()
         persons = dict(sorted(persons.items(), key=lambda kv: kv[1], reverse=True))
         return persons
 
     @property
     def albums_as_dict(self):
         """ return albums as dict of albums, count in reverse sorted order (descending) """
-        albums = {}
-        album_keys = [
-            k
-            for k in self._dbalbums_album.keys()
-            if self._dbalbum_details[k]["cloudownerhashedpersonid"] is None
-        ]
-        for k in album_keys:
-            title = self._dbalbum_details[k]["title"]
-            if title in albums:
-                albums[title] += len(self._dbalbums_album[k])
-            else:
-                albums[title] = len(self._dbalbums_album[k])
-        albums = dict(sorted(albums.items(), key=lambda kv: kv[1], reverse=True))
-        return albums
+        return self._album_titles.counts()
 
     @property
     def albums_shared_as_dict(self):
         """ returns shared albums as dict of albums, count in reverse sorted order (descending)
             valid only on Photos 5; on Photos <= 4, prints warning and returns empty dict """
 
-        # if _dbalbum_details[key]["cloudownerhashedpersonid"] is not None, then it's a shared album
         if self._db_version < _PHOTOS_5_VERSION:
             logging.warning(
                 f"albums_shared not implemented for Photos versions < {_PHOTOS_5_VERSION}"
             )
             return {}
 
-        albums = {}
-        album_keys = [
-            k
-            for k in self._dbalbums_album.keys()
-            if self._dbalbum_details[k]["cloudownerhashedpersonid"] is not None
-        ]
-        for k in album_keys:
-            title = self._dbalbum_details[k]["title"]
-            if title in albums:
-                albums[title] += len(self._dbalbums_album[k])
-            else:
-                albums[title] = len(self._dbalbums_album[k])
-        albums = dict(sorted(albums.items(), key=lambda kv: kv[1], reverse=True))
-        return albums
+        return self._album_titles.counts(shared=True)
 
     @property
     def keywords(self):
         """ return list of keywords found in photos database """
-        keywords = self._dbkeywords_keyword.keys()
+        keywords = self._dbkeywords.labels()
         return list(keywords)
 
     @property
     def persons(self):
         """ return list of persons found in photos database """
-        persons = self._dbfaces_person.keys()
+        persons = self._dbfaces.labels()
         return list(persons)
 
     @property
@@ -268,16 +617,7 @@ class PhotosDB:
 
         # Could be more than one album with same name
         # Right now, they are treated as same album and photos are combined from albums with same name
-
-        albums = set()
-        album_keys = [
-            k
-            for k in self._dbalbums_album.keys()
-            if self._dbalbum_details[k]["cloudownerhashedpersonid"] is None
-        ]
-        for album in album_keys:
-            albums.add(self._dbalbum_details[album]["title"])
-        return list(albums)
+        return self._album_titles.titles()
 
     @property
     def albums_shared(self):
@@ -287,23 +627,13 @@ class PhotosDB:
         # Could be more than one album with same name
         # Right now, they are treated as same album and photos are combined from albums with same name
 
-        # if _dbalbum_details[key]["cloudownerhashedpersonid"] is not None, then it's a shared album
-
         if self._db_version < _PHOTOS_5_VERSION:
             logging.warning(
                 f"albums_shared not implemented for Photos versions < {_PHOTOS_5_VERSION}"
             )
             return []
 
-        albums = set()
-        album_keys = [
-            k
-            for k in self._dbalbums_album.keys()
-            if self._dbalbum_details[k]["cloudownerhashedpersonid"] is not None
-        ]
-        for album in album_keys:
-            albums.add(self._dbalbum_details[album]["title"])
-        return list(albums)
+        return self._album_titles.titles(shared=True)
 
     @property
     def db_version(self):
@@ -320,6 +650,50 @@ class PhotosDB:
         """ returns path to the Photos library PhotosDB was initialized with """
         return self._library_path
 
+    @property
+    def db_open_mode(self):
+        """ returns how the library database was read: 
+            "immutable" or "readonly" if read in place, "copy" if read from a temporary copy,
+            "snapshot" if restored from the snapshot cache """
+        return self._db_open_mode
+
+    def _prepare_db_file(self, fname):
+        """ returns the name of the sqlite file or URI to pass to _open_sql_file for database fname
+            By default (copy_db=True) the database is copied to a temp file with _copy_db_file
+            With copy_db=False, it's read in place via a read-only URI: "readonly", or
+            "immutable" if immutable=True was requested and there is no write-ahead log
+            to replay; if it can't be opened in place (e.g. it's locked by Photos),
+            falls back to the copy; see also _read_with_fallback
+            Sets self._db_open_mode to the method used """
+        if not self._copy_db:
+            fname = os.path.abspath(fname)
+            wal = f"{fname}-wal"
+            if self._immutable and not (
+                os.path.exists(wal) and os.path.getsize(wal) > 0
+            ):
+                # only safe if nothing writes to the database while it's read
+                mode = "immutable"
+                uri = f"file:{urllib.parse.quote(fname)}?immutable=1"
+            else:
+                mode = "readonly"
+                uri = f"file:{urllib.parse.quote(fname)}?mode=ro"
+
+            try:
+                conn = sqlite3.connect(uri, uri=True)
+                conn.execute("SELECT name FROM sqlite_master LIMIT 1").fetchall()
+                conn.close()
+            except sqlite3.Error as e:
+                if _debug():
+                    logging.debug(f"could not open {fname} in place ({e}), copying")
+            else:
+                if _debug():
+                    logging.debug(f"reading {fname} in place, mode = {mode}")
+                self._db_open_mode = mode
+                return uri
+
+        self._db_open_mode = "copy"
+        return self._copy_db_file(fname)
+
     def _copy_db_file(self, fname):
         """ copies the sqlite database file to a temp file """
         """ returns the name of the temp file and appends name to self->_tmp_files """
@@ -348,17 +722,127 @@ class PhotosDB:
 
         return tmp
 
+    def _db_fingerprint(self):
+        """ returns a tuple that identifies the current state of the library database:
+            size and modification time of photos.db, Photos.sqlite (Photos 5) and 
+            their write-ahead logs, plus the osxphotos and snapshot format versions """
+        fingerprint = [__version__, _SNAPSHOT_VERSION]
+        dbpath = os.path.dirname(self._dbfile)
+        for fname in [self._dbfile, os.path.join(dbpath, "Photos.sqlite")]:
+            for f in [fname, f"{fname}-wal"]:
+                try:
+                    st = os.stat(f)
+                    fingerprint.append((f, st.st_size, st.st_mtime_ns))
+                except FileNotFoundError:
+                    fingerprint.append((f, None, None))
+        return tuple(fingerprint)
+
+    def _snapshot_path(self):
+        """ returns path to the snapshot cache file for this library """
+        name = hashlib.sha1(self._dbfile.encode("utf-8")).hexdigest()
+        return os.path.join(self._cache_dir, f"{name}.snapshot")
+
+    def _load_snapshot(self, fingerprint):
+        """ restores the parsed library from the snapshot cache 
+            fingerprint: current database fingerprint as returned by _db_fingerprint 
+            returns True if snapshot was loaded, False if there's no snapshot or it's out of date """
+        snapshot = self._snapshot_path()
+        try:
+            with open(snapshot, "rb") as fd:
+                # snapshot is two pickles: fingerprint, then the data
+                # so the data is only read if the fingerprint matches
+                if pickle.load(fd) != fingerprint:
+                    if _debug():
+                        logging.debug(f"snapshot {snapshot} is out of date")
+                    return False
+                state = pickle.load(fd)
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            logging.warning(f"could not load snapshot {snapshot}: {e}")
+            return False
+
+        for attr in _SNAPSHOT_ATTRIBUTES:
+            setattr(self, attr, state[attr])
+        self._db_open_mode = "snapshot"
+
+        if _debug():
+            logging.debug(f"loaded snapshot {snapshot}")
+        return True
+
+    def _save_snapshot(self, fingerprint):
+        """ saves the parsed library to the snapshot cache 
+            fingerprint: database fingerprint taken before the database was read """
+        snapshot = self._snapshot_path()
+        state = {attr: getattr(self, attr) for attr in _SNAPSHOT_ATTRIBUTES}
+        tmp = None
+        try:
+            os.makedirs(self._cache_dir, exist_ok=True)
+            # write to temp file then rename so a partial snapshot is never read
+            fd, tmp = tempfile.mkstemp(dir=self._cache_dir, prefix="osxphotos-")
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(fingerprint, f, protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, snapshot)
+            tmp = None
+        except (
+            OSError,
+            pickle.PicklingError,
+            TypeError,
+            AttributeError,
+            RecursionError,
+        ) as e:
+            # the snapshot is only a cache so carry on without it
+            logging.warning(f"could not save snapshot {snapshot}: {e}")
+            return
+        finally:
+            if tmp is not None:
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+
+        if _debug():
+            logging.debug(f"saved snapshot {snapshot}")
+
     def _open_sql_file(self, file):
-        """ opens sqlite file and returns connection to the database """
+        """ opens sqlite file and returns connection to the database 
+            file may be a path or a file: URI as returned by _prepare_db_file """
         fname = file
         try:
-            conn = sqlite3.connect(f"{fname}")
+            conn = sqlite3.connect(f"{fname}", uri=True)
             c = conn.cursor()
         except sqlite3.Error as e:
             print(f"An error occurred: {e.args[0]} {fname}", file=sys.stderr)
             sys.exit(3)
         return (conn, c)
 
+    def _create_uuid_table(self, c, uuids):
+        """ creates temporary table _osxphotos_uuids containing uuids
+            used to restrict queries to a subset of photos, e.g. in refresh 
+            c: cursor for the database connection """
+        c.execute("CREATE TEMP TABLE _osxphotos_uuids (uuid TEXT PRIMARY KEY)")
+        c.executemany(
+            "INSERT INTO temp._osxphotos_uuids VALUES (?)", ((u,) for u in uuids)
+        )
+
+    def _prefilter_uuids(self):
+        """ returns set of the uuids of the photos that could match self._prefilter """
+        (sql, params) = _prefilter_sql(
+            self._prefilter, int(self._db_version) >= int(_PHOTOS_5_VERSION)
+        )
+        (conn, c) = self._open_sql_file(self._tmp_db)
+        conn.create_function(_LOWER_FUNCTION, 1, _lower)
+        try:
+            c.execute(sql, params)
+            uuids = {row[0] for row in c}
+        finally:
+            conn.close()
+
+        if _debug():
+            logging.debug(f"prefilter {self._prefilter} matched {len(uuids)} photos")
+        return uuids
+
     def _get_db_version(self):
         """ gets the Photos DB version from LiGlobals table """
         """ returns the version as str"""
@@ -382,516 +866,876 @@ class PhotosDB:
 
         return version
 
-    def _process_database4(self):
-        """ process the Photos database to extract info
-            works on Photos version <= 4.0 """
-
-        # TODO: Update strings to remove + (not needed)
-        # Epoch is Jan 1, 2001
-        td = (datetime(2001, 1, 1, 0, 0) - datetime(1970, 1, 1, 0, 0)).total_seconds()
-
-        (conn, c) = self._open_sql_file(self._tmp_db)
-
-        # Look for all combinations of persons and pictures
-        c.execute(
-            "select RKPerson.name, RKVersion.uuid from RKFace, RKPerson, RKVersion, RKMaster "
-            + "where RKFace.personID = RKperson.modelID and RKVersion.modelId = RKFace.ImageModelId "
-            + "and RKVersion.masterUuid = RKMaster.uuid and "
-            + "RKVersion.filename not like '%.pdf' and RKVersion.isInTrash = 0"
-        )
-        for person in c:
-            if person[0] is None:
-                continue
-            if not person[1] in self._dbfaces_uuid:
-                self._dbfaces_uuid[person[1]] = []
-            if not person[0] in self._dbfaces_person:
-                self._dbfaces_person[person[0]] = []
-            self._dbfaces_uuid[person[1]].append(person[0])
-            self._dbfaces_person[person[0]].append(person[1])
-
-        # Get info on albums
-        c.execute(
-            "select RKAlbum.uuid, RKVersion.uuid from RKAlbum, RKVersion, RKAlbumVersion "
-            + "where RKAlbum.modelID = RKAlbumVersion.albumId and "
-            + "RKAlbumVersion.versionID = RKVersion.modelId and "
-            + "RKVersion.filename not like '%.pdf' and RKVersion.isInTrash = 0"
-        )
-        for album in c:
-            # store by uuid in _dbalbums_uuid and by album in _dbalbums_album
-            if not album[1] in self._dbalbums_uuid:
-                self._dbalbums_uuid[album[1]] = []
-            if not album[0] in self._dbalbums_album:
-                self._dbalbums_album[album[0]] = []
-            self._dbalbums_uuid[album[1]].append(album[0])
-            self._dbalbums_album[album[0]].append(album[1])
-
-        # now get additional details about albums
-        c.execute(
-            "SELECT "
-            "uuid, "  # 0
-            "name, "  # 1
-            "cloudLibraryState, "  # 2
-            "cloudIdentifier "  # 3
-            "FROM RKAlbum "
-            "WHERE isInTrash = 0"
+    def _asset_id(self, uuid):
+        """ returns the integer asset id of the photo with uuid, assigning the next id
+            if uuid hasn't been seen before; ids are never reused so they're the same
+            for the life of the PhotosDB object (and its snapshot) """
+        try:
+            return self._asset_ids[uuid]
+        except KeyError:
+            asset_id = self._asset_ids[uuid] = len(self._asset_uuids)
+            self._asset_uuids.append(uuid)
+            return asset_id
+
+    def _new_photoinfo(self, uuid):
+        """ returns a new PhotoInfo object for the photo with uuid (see _photoinfos) """
+        return PhotoInfo(db=self, uuid=uuid, info=self._dbphotos[uuid])
+
+    def _build_indexes(self):
+        """ build the indexes derived from _dbphotos; called whenever _dbphotos changes """
+        self._query_cache.clear()
+        self._photoinfos.clear()
+        self._flags = _FlagIndex(self._dbphotos, self._asset_uuids)
+        self._album_titles = _AlbumIndex(self._dbalbum_details, self._dbalbums)
+        self._bursts = _BurstIndex(self._dbphotos_burst, self._dbphotos, self._asset_ids)
+        self._dates = _DateIndex(self._dbphotos, self._asset_uuids, "imageDateSeconds")
+        self._modified_dates = _DateIndex(
+            self._dbphotos, self._asset_uuids, "lastmodifieddateSeconds"
         )
+        self._text = _TextIndex(self._texts())
+        self._locations = _GeoIndex(self._dbphotos, self._asset_uuids)
+        self._resources = _ResourceIndex(self._library_path)
+        if _NUMPY_AVAILABLE:
+            self._columns = _ColumnStore(self._dbphotos, self._asset_uuids, self._flags)
+
+    def _texts(self):
+        """ generator that yields (text, asset ids) for the text index: the title and
+            description of each photo and each keyword, person and album title """
+        for uuid, info in self._dbphotos.items():
+            asset_id = [self._asset_ids[uuid]]
+            for text in (info["name"], info["extendedDescription"]):
+                if text:
+                    yield text, asset_id
+        for index in (self._dbkeywords, self._dbfaces):
+            for label in index.labels():
+                yield label, index.asset_ids(label)
+        for album_id in self._dbalbums.labels():
+            details = self._dbalbum_details.get(album_id)
+            if details is not None and details["title"]:
+                yield details["title"], self._dbalbums.asset_ids(album_id)
+
+    def _photo_texts(self, asset_id):
+        """ returns list of the texts of the photo with asset_id that are in the text index """
+        uuid = self._asset_uuids[asset_id]
+        info = self._dbphotos.get(uuid)
+        texts = [info["name"], info["extendedDescription"]] if info is not None else []
+        texts.extend(self._dbkeywords.labels_for(asset_id))
+        texts.extend(self._dbfaces.labels_for(asset_id))
+        for album_id in self._dbalbums.labels_for(asset_id):
+            details = self._dbalbum_details.get(album_id)
+            if details is not None:
+                texts.append(details["title"])
+        return [text for text in texts if text]
+
+    def _load_database(self, uuids=None):
+        """ read the database with the loader for the database version and self._loader 
+            uuids: if not None, only process photos whose uuid is in uuids (see refresh) """
+        if int(self._db_version) < int(_PHOTOS_5_VERSION):
+            self._process_database4(uuids=uuids)
+        elif self._loader == "joined":
+            self._process_database5_joined(uuids=uuids)
+        else:
+            self._process_database5(uuids=uuids)
 
-        for album in c:
-            self._dbalbum_details[album[0]] = {
-                "title": album[1],
-                "cloudlibrarystate": album[2],
-                "cloudidentifier": album[3],
-                "cloudlocalstate": None,  # Photos 5
-                "cloudownerfirstname": None,  # Photos 5
-                "cloudownderlastname": None,  # Photos 5
-                "cloudownerhashedpersonid": None,  # Photos 5
+    def _membership_queries(self, uuid_filter=""):
+        """ returns dict of the queries that read the persons, albums, and keywords of the photos
+            as rows of (label, photo uuid, ...); uuid_filter is added to the WHERE clause of each """
+        if int(self._db_version) < int(_PHOTOS_5_VERSION):
+            return {
+                "persons": (
+                    "select RKPerson.name, RKVersion.uuid from RKFace, RKPerson, RKVersion, RKMaster "
+                    + "where RKFace.personID = RKperson.modelID and RKVersion.modelId = RKFace.ImageModelId "
+                    + "and RKVersion.masterUuid = RKMaster.uuid and "
+                    + "RKVersion.filename not like '%.pdf' and RKVersion.isInTrash = 0 "
+                    + uuid_filter
+                    + "ORDER BY RKVersion.modelId "
+                ),
+                "albums": (
+                    "select RKAlbum.uuid, RKVersion.uuid from RKAlbum, RKVersion, RKAlbumVersion "
+                    + "where RKAlbum.modelID = RKAlbumVersion.albumId and "
+                    + "RKAlbumVersion.versionID = RKVersion.modelId and "
+                    + "RKVersion.filename not like '%.pdf' and RKVersion.isInTrash = 0 "
+                    + uuid_filter
+                    + "ORDER BY RKVersion.modelId "
+                ),
+                "keywords": (
+                    "select RKKeyword.name, RKVersion.uuid, RKMaster.uuid from "
+                    + "RKKeyword, RKKeywordForVersion, RKVersion, RKMaster "
+                    + "where RKKeyword.modelId = RKKeyWordForVersion.keywordID and "
+                    + "RKVersion.modelID = RKKeywordForVersion.versionID "
+                    + "and RKMaster.uuid = RKVersion.masterUuid "
+                    + "and RKVersion.filename not like '%.pdf' and RKVersion.isInTrash = 0 "
+                    + uuid_filter
+                    + "ORDER BY RKVersion.modelId "
+                ),
             }
 
-        if _debug():
-            logging.debug(f"Finished walking through albums")
-            logging.debug(pformat(self._dbalbums_album))
-            logging.debug(pformat(self._dbalbums_uuid))
-            logging.debug(pformat(self._dbalbum_details))
-
-        # Get info on keywords
-        c.execute(
-            "select RKKeyword.name, RKVersion.uuid, RKMaster.uuid from "
-            + "RKKeyword, RKKeywordForVersion, RKVersion, RKMaster "
-            + "where RKKeyword.modelId = RKKeyWordForVersion.keywordID and "
-            + "RKVersion.modelID = RKKeywordForVersion.versionID "
-            + "and RKMaster.uuid = RKVersion.masterUuid "
-            + "and RKVersion.filename not like '%.pdf' and RKVersion.isInTrash = 0"
-        )
-        for keyword in c:
-            if not keyword[1] in self._dbkeywords_uuid:
-                self._dbkeywords_uuid[keyword[1]] = []
-            if not keyword[0] in self._dbkeywords_keyword:
-                self._dbkeywords_keyword[keyword[0]] = []
-            self._dbkeywords_uuid[keyword[1]].append(keyword[0])
-            self._dbkeywords_keyword[keyword[0]].append(keyword[1])
-
-        # Get info on disk volumes
-        c.execute("select RKVolume.modelId, RKVolume.name from RKVolume")
-        for vol in c:
-            self._dbvolumes[vol[0]] = vol[1]
-
-        # Get photo details
-        c.execute(
-            """ SELECT RKVersion.uuid, RKVersion.modelId, RKVersion.masterUuid, RKVersion.filename, 
-                RKVersion.lastmodifieddate, RKVersion.imageDate, RKVersion.mainRating, 
-                RKVersion.hasAdjustments, RKVersion.hasKeywords, RKVersion.imageTimeZoneOffsetSeconds, 
-                RKMaster.volumeId, RKMaster.imagePath, RKVersion.extendedDescription, RKVersion.name, 
-                RKMaster.isMissing, RKMaster.originalFileName, RKVersion.isFavorite, RKVersion.isHidden, 
-                RKVersion.latitude, RKVersion.longitude, 
-                RKVersion.adjustmentUuid, RKVersion.type, RKMaster.UTI,
-                RKVersion.burstUuid, RKVersion.burstPickType,
-                RKVersion.specialType, RKMaster.modelID
-                FROM RKVersion, RKMaster WHERE RKVersion.isInTrash = 0 AND 
-                RKVersion.masterUuid = RKMaster.uuid AND RKVersion.filename NOT LIKE '%.pdf' """
-        )
+        return {
+            "persons": (
+                "SELECT ZPERSON.ZFULLNAME, ZGENERICASSET.ZUUID "
+                "FROM ZPERSON, ZDETECTEDFACE, ZGENERICASSET "
+                "WHERE ZDETECTEDFACE.ZPERSON = ZPERSON.Z_PK AND ZDETECTEDFACE.ZASSET = ZGENERICASSET.Z_PK "
+                "AND ZGENERICASSET.ZTRASHEDSTATE = 0 " + uuid_filter
+            ),
+            "albums": (
+                "SELECT ZGENERICALBUM.ZUUID, ZGENERICASSET.ZUUID "
+                "FROM ZGENERICASSET "
+                "JOIN Z_26ASSETS ON Z_26ASSETS.Z_34ASSETS = ZGENERICASSET.Z_PK "
+                "JOIN ZGENERICALBUM ON ZGENERICALBUM.Z_PK = Z_26ASSETS.Z_26ALBUMS "
+                "WHERE ZGENERICASSET.ZTRASHEDSTATE = 0 " + uuid_filter
+            ),
+            "keywords": (
+                "SELECT ZKEYWORD.ZTITLE, ZGENERICASSET.ZUUID "
+                "FROM ZGENERICASSET "
+                "JOIN ZADDITIONALASSETATTRIBUTES ON ZADDITIONALASSETATTRIBUTES.ZASSET = ZGENERICASSET.Z_PK "
+                "JOIN Z_1KEYWORDS ON Z_1KEYWORDS.Z_1ASSETATTRIBUTES = ZADDITIONALASSETATTRIBUTES.Z_PK "
+                "JOIN ZKEYWORD ON ZKEYWORD.Z_PK = Z_1KEYWORDS.Z_37KEYWORDS "
+                "WHERE ZGENERICASSET.ZTRASHEDSTATE = 0 " + uuid_filter
+            ),
+        }
+
+    def _process_database4(self, uuids=None):
+        """ process the Photos database to extract info
+            works on Photos version <= 4.0 
+            uuids: if not None, only process photos whose uuid is in uuids (see refresh) """
+
+        # if only processing some photos, restrict each query to those uuids
+        # photos are given asset ids in the order they're first read so the queries that
+        # read them first are ORDER BY RKVersion.modelId: the photos are then read in the
+        # same order whether all or only some are processed (photos() returns them in that order)
+        uuid_filter = uuid_where = ""
+        if uuids is not None:
+            uuid_filter = "AND RKVersion.uuid IN temp._osxphotos_uuids "
+            uuid_where = "WHERE RKVersion.uuid IN temp._osxphotos_uuids "
+
+        queries = {
+            **self._membership_queries(uuid_filter),
+            "album_details": (
+                "SELECT "
+                "uuid, "  # 0
+                "name, "  # 1
+                "cloudLibraryState, "  # 2
+                "cloudIdentifier "  # 3
+                "FROM RKAlbum "
+                "WHERE isInTrash = 0"
+            ),
+            "volumes": "select RKVolume.modelId, RKVolume.name from RKVolume",
+            "photos": (
+                """ SELECT RKVersion.uuid, RKVersion.modelId, RKVersion.masterUuid, RKVersion.filename, 
+                    RKVersion.lastmodifieddate, RKVersion.imageDate, RKVersion.mainRating, 
+                    RKVersion.hasAdjustments, RKVersion.hasKeywords, RKVersion.imageTimeZoneOffsetSeconds, 
+                    RKMaster.volumeId, RKMaster.imagePath, RKVersion.extendedDescription, RKVersion.name, 
+                    RKMaster.isMissing, RKMaster.originalFileName, RKVersion.isFavorite, RKVersion.isHidden, 
+                    RKVersion.latitude, RKVersion.longitude, 
+                    RKVersion.adjustmentUuid, RKVersion.type, RKMaster.UTI,
+                    RKVersion.burstUuid, RKVersion.burstPickType,
+                    RKVersion.specialType, RKMaster.modelID
+                    FROM RKVersion, RKMaster WHERE RKVersion.isInTrash = 0 AND 
+                    RKVersion.masterUuid = RKMaster.uuid AND RKVersion.filename NOT LIKE '%.pdf' """
+                + uuid_filter
+                + "ORDER BY RKVersion.modelId "
+            ),
+            "edits": (
+                """ SELECT RKVersion.uuid, RKVersion.adjustmentUuid, RKModelResource.modelId,
+                    RKModelResource.resourceTag, RKModelResource.UTI, RKVersion.specialType,
+                    RKModelResource.attachedModelType, RKModelResource.resourceType
+                    FROM RKVersion
+                    JOIN RKModelResource on RKModelResource.attachedModelId = RKVersion.modelId
+                    WHERE RKVersion.isInTrash = 0 """
+                + uuid_filter
+            ),
+            "external_edits": (
+                "SELECT RKVersion.uuid, "
+                "RKVersion.adjustmentUuid, "
+                "RKAdjustmentData.originator, "
+                "RKAdjustmentData.format "
+                "FROM RKVersion, RKAdjustmentData "
+                "WHERE RKVersion.adjustmentUuid = RKAdjustmentData.uuid "
+                "AND RKVersion.isInTrash = 0 " + uuid_filter
+            ),
+            "live_photos": (
+                            """ SELECT 
+                    RKVersion.uuid, 
+                    RKModelResource.modelId,
+                    RKModelResource.UTI,
+                    RKVersion.specialType, 
+                    RKModelResource.attachedModelType,
+                    RKModelResource.resourceType,
+                    RKModelResource.isOnDisk
+                    FROM RKVersion 
+                    INNER JOIN RKMaster on RKVersion.masterUuid = RKMaster.uuid 
+                    INNER JOIN RKModelResource on RKMaster.modelId = RKModelResource.attachedModelId  
+                    WHERE RKModelResource.UTI = 'com.apple.quicktime-movie'
+                    AND RKMaster.isInTrash = 0
+                    AND RKVersion.isInTrash = 0 
+                              """
+                            + uuid_filter
+            ),
+            "cloud": (
+                """ SELECT 
+                    RKVersion.uuid, 
+                    RKMaster.cloudLibraryState,
+                    RKCloudResource.available, 
+                    RKCloudResource.status
+                    FROM RKCloudResource
+                    INNER JOIN RKMaster ON RKMaster.fingerprint = RKCloudResource.fingerprint
+                    INNER JOIN RKVersion ON RKVersion.masterUuid = RKMaster.uuid """
+                + uuid_where
+            ),
+        }
+
+        # the queries don't depend on each other so they can run at the same time (loader="parallel")
+        # rows are always processed in the order below so the result is the same for every loader
+        with _LoaderQueries(self, queries, uuids) as results:
+            # Look for all combinations of persons and pictures
+            for person in results["persons"]:
+                if person[0] is None:
+                    continue
+                self._dbfaces.add(self._asset_id(person[1]), person[0])
+
+            # Get info on albums
+            for album in results["albums"]:
+                # index album uuid by photo and photo by album uuid
+                self._dbalbums.add(self._asset_id(album[1]), album[0])
+
+            # now get additional details about albums
+            for album in results["album_details"]:
+                self._dbalbum_details[album[0]] = {
+                    "title": album[1],
+                    "cloudlibrarystate": album[2],
+                    "cloudidentifier": album[3],
+                    "cloudlocalstate": None,  # Photos 5
+                    "cloudownerfirstname": None,  # Photos 5
+                    "cloudownderlastname": None,  # Photos 5
+                    "cloudownerhashedpersonid": None,  # Photos 5
+                }
 
-        #  TODO:               RKVersion.selfPortrait -- only in Photos 3 and up
-
-        # order of results
-        # 0     RKVersion.uuid
-        # 1     RKVersion.modelId
-        # 2     RKVersion.masterUuid
-        # 3     RKVersion.filename
-        # 4     RKVersion.lastmodifieddate
-        # 5     RKVersion.imageDate
-        # 6     RKVersion.mainRating
-        # 7     RKVersion.hasAdjustments
-        # 8     RKVersion.hasKeywords
-        # 9     RKVersion.imageTimeZoneOffsetSeconds
-        # 10    RKMaster.volumeId
-        # 11    RKMaster.imagePath
-        # 12    RKVersion.extendedDescription
-        # 13    RKVersion.name
-        # 14    RKMaster.isMissing
-        # 15    RKMaster.originalFileName
-        # 16    RKVersion.isFavorite
-        # 17    RKVersion.isHidden
-        # 18    RKVersion.latitude
-        # 19    RKVersion.longitude
-        # 20    RKVersion.adjustmentUuid
-        # 21    RKVersion.type
-        # 22    RKMaster.UTI
-        # 23    RKVersion.burstUuid
-        # 24    RKVersion.burstPickType
-        # 25    RKVersion.specialType
-        # 26    RKMaster.modelID
-
-        # 27    RKVersion.selfPortrait -- 1 if selfie (not yet implemented)
-
-        for row in c:
-            uuid = row[0]
             if _debug():
-                logging.debug(f"uuid = '{uuid}, master = '{row[2]}")
-            self._dbphotos[uuid] = {}
-            self._dbphotos[uuid]["_uuid"] = uuid  # stored here for easier debugging
-            self._dbphotos[uuid]["modelID"] = row[1]
-            self._dbphotos[uuid]["masterUuid"] = row[2]
-            self._dbphotos[uuid]["filename"] = row[3]
-
-            try:
-                self._dbphotos[uuid]["lastmodifieddate"] = datetime.fromtimestamp(
-                    row[4] + td
-                )
-            except:
-                self._dbphotos[uuid]["lastmodifieddate"] = datetime.fromtimestamp(
-                    row[5] + td
+                logging.debug(
+                    f"Finished walking through albums: {len(self._dbalbum_details)} albums"
                 )
 
-            self._dbphotos[uuid]["imageDate"] = datetime.fromtimestamp(
-                row[5] + td
-            )  # - row[9],  timezone.utc)
-            self._dbphotos[uuid]["mainRating"] = row[6]
-            self._dbphotos[uuid]["hasAdjustments"] = row[7]
-            self._dbphotos[uuid]["hasKeywords"] = row[8]
-            self._dbphotos[uuid]["imageTimeZoneOffsetSeconds"] = row[9]
-            self._dbphotos[uuid]["volumeId"] = row[10]
-            self._dbphotos[uuid]["imagePath"] = row[11]
-            self._dbphotos[uuid]["extendedDescription"] = row[12]
-            self._dbphotos[uuid]["name"] = row[13]
-            self._dbphotos[uuid]["isMissing"] = row[14]
-            self._dbphotos[uuid]["originalFilename"] = row[15]
-            self._dbphotos[uuid]["favorite"] = row[16]
-            self._dbphotos[uuid]["hidden"] = row[17]
-            self._dbphotos[uuid]["latitude"] = row[18]
-            self._dbphotos[uuid]["longitude"] = row[19]
-            self._dbphotos[uuid]["adjustmentUuid"] = row[20]
-            self._dbphotos[uuid]["adjustmentFormatID"] = None
-
-            # find type and UTI
-            if row[21] == 2:
-                # photo
-                self._dbphotos[uuid]["type"] = _PHOTO_TYPE
-            elif row[21] == 8:
-                # movie
-                self._dbphotos[uuid]["type"] = _MOVIE_TYPE
-            else:
-                # unknown
+            # Get info on keywords
+            for keyword in results["keywords"]:
+                self._dbkeywords.add(self._asset_id(keyword[1]), keyword[0])
+
+            # Get info on disk volumes
+            for vol in results["volumes"]:
+                self._dbvolumes[vol[0]] = vol[1]
+
+            # Get photo details
+            #  TODO:               RKVersion.selfPortrait -- only in Photos 3 and up
+
+            # order of results
+            # 0     RKVersion.uuid
+            # 1     RKVersion.modelId
+            # 2     RKVersion.masterUuid
+            # 3     RKVersion.filename
+            # 4     RKVersion.lastmodifieddate
+            # 5     RKVersion.imageDate
+            # 6     RKVersion.mainRating
+            # 7     RKVersion.hasAdjustments
+            # 8     RKVersion.hasKeywords
+            # 9     RKVersion.imageTimeZoneOffsetSeconds
+            # 10    RKMaster.volumeId
+            # 11    RKMaster.imagePath
+            # 12    RKVersion.extendedDescription
+            # 13    RKVersion.name
+            # 14    RKMaster.isMissing
+            # 15    RKMaster.originalFileName
+            # 16    RKVersion.isFavorite
+            # 17    RKVersion.isHidden
+            # 18    RKVersion.latitude
+            # 19    RKVersion.longitude
+            # 20    RKVersion.adjustmentUuid
+            # 21    RKVersion.type
+            # 22    RKMaster.UTI
+            # 23    RKVersion.burstUuid
+            # 24    RKVersion.burstPickType
+            # 25    RKVersion.specialType
+            # 26    RKMaster.modelID
+
+            # 27    RKVersion.selfPortrait -- 1 if selfie (not yet implemented)
+
+            # uuids of photos processed in this pass
+            processed = []
+
+            for row in results["photos"]:
+                uuid = row[0]
                 if _debug():
-                    logging.debug(f"WARNING: {uuid} found unknown type {row[21]}")
-                self._dbphotos[uuid]["type"] = None
-
-            self._dbphotos[uuid]["UTI"] = row[22]
-
-            # handle burst photos
-            # if burst photo, determine whether or not it's a selected burst photo
-            self._dbphotos[uuid]["burstUUID"] = row[23]
-            self._dbphotos[uuid]["burstPickType"] = row[24]
-            if row[23] is not None:
-                # it's a burst photo
-                self._dbphotos[uuid]["burst"] = True
-                burst_uuid = row[23]
-                if burst_uuid not in self._dbphotos_burst:
-                    self._dbphotos_burst[burst_uuid] = set()
-                self._dbphotos_burst[burst_uuid].add(uuid)
-                if row[24] != 2 and row[24] != 4:
-                    self._dbphotos[uuid][
-                        "burst_key"
-                    ] = True  # it's a key photo (selected from the burst)
+                    logging.debug(f"uuid = '{uuid}, master = '{row[2]}")
+                processed.append(uuid)
+                self._asset_id(uuid)
+                self._dbphotos[uuid] = _PhotoRecord()
+                self._dbphotos[uuid]._uuid = uuid  # stored here for easier debugging
+                self._dbphotos[uuid].modelID = row[1]
+                self._dbphotos[uuid].masterUuid = row[2]
+                self._dbphotos[uuid].filename = row[3]
+
+                # dates are stored as read (seconds since the Photos epoch)
+                # and only made into datetimes when used, see _PhotoRecord
+                self._dbphotos[uuid].lastmodifieddateSeconds = (
+                    row[4] if row[4] is not None else row[5]
+                )
+                self._dbphotos[uuid].imageDateSeconds = row[5]
+                self._dbphotos[uuid].mainRating = row[6]
+                self._dbphotos[uuid].hasAdjustments = row[7]
+                self._dbphotos[uuid].hasKeywords = row[8]
+                self._dbphotos[uuid].imageTimeZoneOffsetSeconds = row[9]
+                self._dbphotos[uuid].volumeId = row[10]
+                self._dbphotos[uuid].imagePath = row[11]
+                self._dbphotos[uuid].extendedDescription = row[12]
+                self._dbphotos[uuid].name = row[13]
+                self._dbphotos[uuid].isMissing = row[14]
+                self._dbphotos[uuid].originalFilename = row[15]
+                self._dbphotos[uuid].favorite = row[16]
+                self._dbphotos[uuid].hidden = row[17]
+                self._dbphotos[uuid].latitude = row[18]
+                self._dbphotos[uuid].longitude = row[19]
+                self._dbphotos[uuid].adjustmentUuid = row[20]
+                self._dbphotos[uuid].adjustmentFormatID = None
+
+                # find type and UTI
+                if row[21] == 2:
+                    # photo
+                    self._dbphotos[uuid].type = _PHOTO_TYPE
+                elif row[21] == 8:
+                    # movie
+                    self._dbphotos[uuid].type = _MOVIE_TYPE
                 else:
-                    self._dbphotos[uuid][
-                        "burst_key"
-                    ] = False  # it's a burst photo but not one that's selected
-            else:
-                # not a burst photo
-                self._dbphotos[uuid]["burst"] = False
-                self._dbphotos[uuid]["burst_key"] = None
-
-            # RKVersion.specialType
-            # 1 == panorama
-            # 2 == slow-mo movie
-            # 3 == time-lapse movie
-            # 4 == HDR
-            # 5 == live photo
-            # 6 == screenshot
-            # 8 == HDR live photo
-            # 9 = portrait
-
-            # get info on special types
-            self._dbphotos[uuid]["specialType"] = row[25]
-            self._dbphotos[uuid]["masterModelID"] = row[26]
-            self._dbphotos[uuid]["panorama"] = True if row[25] == 1 else False
-            self._dbphotos[uuid]["slow_mo"] = True if row[25] == 2 else False
-            self._dbphotos[uuid]["time_lapse"] = True if row[25] == 3 else False
-            self._dbphotos[uuid]["hdr"] = (
-                True if (row[25] == 4 or row[25] == 8) else False
+                    # unknown
+                    if _debug():
+                        logging.debug(f"WARNING: {uuid} found unknown type {row[21]}")
+                    self._dbphotos[uuid].type = None
+
+                self._dbphotos[uuid].UTI = row[22]
+
+                # handle burst photos
+                # if burst photo, determine whether or not it's a selected burst photo
+                self._dbphotos[uuid].burstUUID = row[23]
+                self._dbphotos[uuid].burstPickType = row[24]
+                if row[23] is not None:
+                    # it's a burst photo
+                    self._dbphotos[uuid].burst = True
+                    burst_uuid = row[23]
+                    if burst_uuid not in self._dbphotos_burst:
+                        self._dbphotos_burst[burst_uuid] = set()
+                    self._dbphotos_burst[burst_uuid].add(uuid)
+                    if row[24] != 2 and row[24] != 4:
+                        self._dbphotos[uuid].burst_key = True  # it's a key photo (selected from the burst)
+                    else:
+                        self._dbphotos[uuid].burst_key = False  # it's a burst photo but not one that's selected
+                else:
+                    # not a burst photo
+                    self._dbphotos[uuid].burst = False
+                    self._dbphotos[uuid].burst_key = None
+
+                # RKVersion.specialType
+                # 1 == panorama
+                # 2 == slow-mo movie
+                # 3 == time-lapse movie
+                # 4 == HDR
+                # 5 == live photo
+                # 6 == screenshot
+                # 8 == HDR live photo
+                # 9 = portrait
+
+                # get info on special types
+                self._dbphotos[uuid].specialType = row[25]
+                self._dbphotos[uuid].masterModelID = row[26]
+                self._dbphotos[uuid].panorama = True if row[25] == 1 else False
+                self._dbphotos[uuid].slow_mo = True if row[25] == 2 else False
+                self._dbphotos[uuid].time_lapse = True if row[25] == 3 else False
+                self._dbphotos[uuid].hdr = (
+                    True if (row[25] == 4 or row[25] == 8) else False
+                )
+                self._dbphotos[uuid].live_photo = (
+                    True if (row[25] == 5 or row[25] == 8) else False
+                )
+                self._dbphotos[uuid].screenshot = True if row[25] == 6 else False
+                self._dbphotos[uuid].portrait = True if row[25] == 9 else False
+
+                # TODO: Handle selfies (front facing camera, RKVersion.selfPortrait == 1)
+                # self._dbphotos[uuid].selfie = True if row[27] == 1 else False
+                self._dbphotos[uuid].selfie = None
+
+                # Init cloud details that will be filled in later if cloud asset
+                self._dbphotos[uuid].cloudAssetGUID = None  # Photos 5
+                self._dbphotos[uuid].cloudLocalState = None  # Photos 5
+                self._dbphotos[uuid].cloudLibraryState = None
+                self._dbphotos[uuid].cloudStatus = None
+                self._dbphotos[uuid].cloudAvailable = None
+                self._dbphotos[uuid].incloud = None
+
+            # get details needed to find path of the edited photos
+
+            # get info on path of live photo movie
+
+            # Order of results:
+            # 0     RKVersion.uuid
+            # 1     RKVersion.adjustmentUuid
+            # 2     RKModelResource.modelId
+            # 3     RKModelResource.resourceTag
+            # 4     RKModelResource.UTI
+            # 5     RKVersion.specialType
+            # 6     RKModelResource.attachedModelType
+            # 7     RKModelResource.resourceType
+            for row in results["edits"]:
+                uuid = row[0]
+                if uuid in self._dbphotos:
+                    # get info on adjustments (edits)
+                    if self._dbphotos[uuid]["adjustmentUuid"] == row[3]:
+                        if (
+                            row[1] != "UNADJUSTEDNONRAW"
+                            and row[1] != "UNADJUSTED"
+                            # and row[4] == "public.jpeg"
+                            and row[6] == 2
+                        ):
+                            if "edit_resource_id" in self._dbphotos[uuid]:
+                                if _debug():
+                                    logging.debug(
+                                        f"WARNING: found more than one edit_resource_id for "
+                                        f"UUID {row[0]},adjustmentUUID {row[1]}, modelID {row[2]}"
+                                    )
+                            # TODO: I think there should never be more than one edit but
+                            # I've seen this once in my library
+                            # should we return all edits or just most recent one?
+                            # For now, return most recent edit
+                            self._dbphotos[uuid].edit_resource_id = row[2]
+
+            # get details on external edits
+            for row in results["external_edits"]:
+                uuid = row[0]
+                if uuid in self._dbphotos:
+                    self._dbphotos[uuid].adjustmentFormatID = row[3]
+
+            # get details to find path of live photos
+            # Order of results
+            # 0     RKVersion.uuid,
+            # 1     RKModelResource.modelId,
+            # 2     RKModelResource.UTI,
+            # 3     RKVersion.specialType,
+            # 4     RKModelResource.attachedModelType,
+            # 5     RKModelResource.resourceType
+            # 6     RKModelResource.isOnDisk
+
+            # TODO: don't think we need most of these fields, remove from SQL query?
+            for row in results["live_photos"]:
+                uuid = row[0]
+                if uuid in self._dbphotos:
+                    self._dbphotos[uuid].live_model_id = row[1]
+                    self._dbphotos[uuid].modeResourceIsOnDisk = (
+                        True if row[6] == 1 else False
+                    )
+
+            # init any uuids that had no edits or live photos
+            for uuid in processed:
+                if "edit_resource_id" not in self._dbphotos[uuid]:
+                    self._dbphotos[uuid].edit_resource_id = None
+                if "live_model_id" not in self._dbphotos[uuid]:
+                    self._dbphotos[uuid].live_model_id = None
+                    self._dbphotos[uuid].modeResourceIsOnDisk = None
+
+            # get cloud details
+            # Order of results
+            # 0  RKMaster.uuid,
+            # 1  RKMaster.cloudLibraryState,
+            # 2  RKCloudResource.available,
+            # 3  RKCloudResource.status
+            for row in results["cloud"]:
+                uuid = row[0]
+                if uuid in self._dbphotos:
+                    self._dbphotos[uuid].cloudLibraryState = row[1]
+                    self._dbphotos[uuid].cloudAvailable = row[2]
+                    self._dbphotos[uuid].cloudStatus = row[3]
+                    self._dbphotos[uuid].incloud = True if row[2] == 1 else False
+
+        # note which photos have faces and albums
+        # (keywords, persons, and albums themselves are looked up in the indexes by PhotoInfo)
+        for uuid in processed:
+            asset_id = self._asset_ids[uuid]
+            self._dbphotos[uuid].hasPersons = (
+                1 if self._dbfaces.has_labels(asset_id) else 0
             )
-            self._dbphotos[uuid]["live_photo"] = (
-                True if (row[25] == 5 or row[25] == 8) else False
+            self._dbphotos[uuid].hasAlbums = (
+                1 if self._dbalbums.has_labels(asset_id) else 0
             )
-            self._dbphotos[uuid]["screenshot"] = True if row[25] == 6 else False
-            self._dbphotos[uuid]["portrait"] = True if row[25] == 9 else False
-
-            # TODO: Handle selfies (front facing camera, RKVersion.selfPortrait == 1)
-            # self._dbphotos[uuid]["selfie"] = True if row[27] == 1 else False
-            self._dbphotos[uuid]["selfie"] = None
-
-            # Init cloud details that will be filled in later if cloud asset
-            self._dbphotos[uuid]["cloudAssetGUID"] = None  # Photos 5
-            self._dbphotos[uuid]["cloudLocalState"] = None  # Photos 5
-            self._dbphotos[uuid]["cloudLibraryState"] = None
-            self._dbphotos[uuid]["cloudStatus"] = None
-            self._dbphotos[uuid]["cloudAvailable"] = None
-            self._dbphotos[uuid]["incloud"] = None
-
-        # get details needed to find path of the edited photos
-        c.execute(
-            """ SELECT RKVersion.uuid, RKVersion.adjustmentUuid, RKModelResource.modelId,
-                RKModelResource.resourceTag, RKModelResource.UTI, RKVersion.specialType,
-                RKModelResource.attachedModelType, RKModelResource.resourceType
-                FROM RKVersion
-                JOIN RKModelResource on RKModelResource.attachedModelId = RKVersion.modelId
-                WHERE RKVersion.isInTrash = 0 """
-        )
-        # get info on path of live photo movie
-
-        # Order of results:
-        # 0     RKVersion.uuid
-        # 1     RKVersion.adjustmentUuid
-        # 2     RKModelResource.modelId
-        # 3     RKModelResource.resourceTag
-        # 4     RKModelResource.UTI
-        # 5     RKVersion.specialType
-        # 6     RKModelResource.attachedModelType
-        # 7     RKModelResource.resourceType
-
-        for row in c:
-            uuid = row[0]
-            if uuid in self._dbphotos:
-                # get info on adjustments (edits)
-                if self._dbphotos[uuid]["adjustmentUuid"] == row[3]:
-                    if (
-                        row[1] != "UNADJUSTEDNONRAW"
-                        and row[1] != "UNADJUSTED"
-                        # and row[4] == "public.jpeg"
-                        and row[6] == 2
-                    ):
-                        if "edit_resource_id" in self._dbphotos[uuid]:
-                            if _debug():
-                                logging.debug(
-                                    f"WARNING: found more than one edit_resource_id for "
-                                    f"UUID {row[0]},adjustmentUUID {row[1]}, modelID {row[2]}"
-                                )
-                        # TODO: I think there should never be more than one edit but
-                        # I've seen this once in my library
-                        # should we return all edits or just most recent one?
-                        # For now, return most recent edit
-                        self._dbphotos[uuid]["edit_resource_id"] = row[2]
-
-        # get details on external edits
-        c.execute(
-            "SELECT RKVersion.uuid, "
-            "RKVersion.adjustmentUuid, "
-            "RKAdjustmentData.originator, "
-            "RKAdjustmentData.format "
-            "FROM RKVersion, RKAdjustmentData "
-            "WHERE RKVersion.adjustmentUuid = RKAdjustmentData.uuid "
-            "AND RKVersion.isInTrash = 0"
-        )
 
-        for row in c:
-            uuid = row[0]
-            if uuid in self._dbphotos:
-                self._dbphotos[uuid]["adjustmentFormatID"] = row[3]
+            if self._dbphotos[uuid]["volumeId"] is not None:
+                self._dbphotos[uuid].volume = self._dbvolumes[
+                    self._dbphotos[uuid]["volumeId"]
+                ]
+            else:
+                self._dbphotos[uuid].volume = None
 
-        # get details to find path of live photos
-        c.execute(
-            """ SELECT 
-                RKVersion.uuid, 
-                RKModelResource.modelId,
-                RKModelResource.UTI,
-                RKVersion.specialType, 
-                RKModelResource.attachedModelType,
-                RKModelResource.resourceType,
-                RKModelResource.isOnDisk
-                FROM RKVersion 
-                INNER JOIN RKMaster on RKVersion.masterUuid = RKMaster.uuid 
-                INNER JOIN RKModelResource on RKMaster.modelId = RKModelResource.attachedModelId  
-                WHERE RKModelResource.UTI = 'com.apple.quicktime-movie'
-				AND RKMaster.isInTrash = 0
-                AND RKVersion.isInTrash = 0 
-              """
-        )
+        # remove temporary files
+        self._cleanup_tmp_files()
 
-        # Order of results
-        # 0     RKVersion.uuid,
-        # 1     RKModelResource.modelId,
-        # 2     RKModelResource.UTI,
-        # 3     RKVersion.specialType,
-        # 4     RKModelResource.attachedModelType,
-        # 5     RKModelResource.resourceType
-        # 6     RKModelResource.isOnDisk
-
-        # TODO: don't think we need most of these fields, remove from SQL query?
-        for row in c:
-            uuid = row[0]
-            if uuid in self._dbphotos:
-                self._dbphotos[uuid]["live_model_id"] = row[1]
-                self._dbphotos[uuid]["modeResourceIsOnDisk"] = (
-                    True if row[6] == 1 else False
-                )
+        self._debug_summary()
 
-        # init any uuids that had no edits or live photos
-        for uuid in self._dbphotos:
-            if "edit_resource_id" not in self._dbphotos[uuid]:
-                self._dbphotos[uuid]["edit_resource_id"] = None
-            if "live_model_id" not in self._dbphotos[uuid]:
-                self._dbphotos[uuid]["live_model_id"] = None
-                self._dbphotos[uuid]["modeResourceIsOnDisk"] = None
+    def _process_database5(self, uuids=None):
+        """ process the Photos database to extract info """
+        """ works on Photos version >= 5.0 """
+        """ uuids: if not None, only process photos whose uuid is in uuids (see refresh) """
 
-        # get cloud details
-        c.execute(
-            """ SELECT 
-                RKVersion.uuid, 
-                RKMaster.cloudLibraryState,
-                RKCloudResource.available, 
-                RKCloudResource.status
-                FROM RKCloudResource
-                INNER JOIN RKMaster ON RKMaster.fingerprint = RKCloudResource.fingerprint
-                INNER JOIN RKVersion ON RKVersion.masterUuid = RKMaster.uuid """
-        )
+        if _debug():
+            logging.debug(f"_process_database5")
 
-        # Order of results
-        # 0  RKMaster.uuid,
-        # 1  RKMaster.cloudLibraryState,
-        # 2  RKCloudResource.available,
-        # 3  RKCloudResource.status
-
-        for row in c:
-            uuid = row[0]
-            if uuid in self._dbphotos:
-                self._dbphotos[uuid]["cloudLibraryState"] = row[1]
-                self._dbphotos[uuid]["cloudAvailable"] = row[2]
-                self._dbphotos[uuid]["cloudStatus"] = row[3]
-                self._dbphotos[uuid]["incloud"] = True if row[2] == 1 else False
-
-        # done with the database connection
-        conn.close()
+        # if only processing some photos, restrict each query to those uuids
+        uuid_filter = uuid_where = ""
+        if uuids is not None:
+            uuid_filter = "AND ZGENERICASSET.ZUUID IN temp._osxphotos_uuids "
+            uuid_where = "WHERE ZGENERICASSET.ZUUID IN temp._osxphotos_uuids "
+
+        queries = {
+            **self._membership_queries(uuid_filter),
+            "album_details": _PHOTOS_5_ALBUM_DETAILS_QUERY,
+            "volumes": "SELECT ZUUID, ZNAME from ZFILESYSTEMVOLUME",
+            "photos": (
+                "SELECT "
+                + _PHOTOS_5_ASSET_COLUMNS
+                + """FROM ZGENERICASSET 
+                    JOIN ZADDITIONALASSETATTRIBUTES ON ZADDITIONALASSETATTRIBUTES.ZASSET = ZGENERICASSET.Z_PK 
+                    WHERE ZGENERICASSET.ZTRASHEDSTATE = 0  """
+                + uuid_filter
+                + "ORDER BY ZGENERICASSET.ZUUID "
+            ),
+            "descriptions": (
+                "SELECT ZGENERICASSET.ZUUID, "
+                "ZASSETDESCRIPTION.ZLONGDESCRIPTION "
+                "FROM ZGENERICASSET "
+                "JOIN ZADDITIONALASSETATTRIBUTES ON ZADDITIONALASSETATTRIBUTES.ZASSET = ZGENERICASSET.Z_PK "
+                "JOIN ZASSETDESCRIPTION ON ZASSETDESCRIPTION.Z_PK = ZADDITIONALASSETATTRIBUTES.ZASSETDESCRIPTION "
+                + uuid_where
+                + "ORDER BY ZGENERICASSET.ZUUID "
+            ),
+            "adjustments": (
+                "SELECT ZGENERICASSET.ZUUID, "
+                "ZGENERICASSET.ZHASADJUSTMENTS, "
+                "ZUNMANAGEDADJUSTMENT.ZADJUSTMENTFORMATIDENTIFIER "
+                "FROM ZGENERICASSET, ZUNMANAGEDADJUSTMENT "
+                "JOIN ZADDITIONALASSETATTRIBUTES ON ZADDITIONALASSETATTRIBUTES.ZASSET = ZGENERICASSET.Z_PK "
+                "WHERE ZADDITIONALASSETATTRIBUTES.ZUNMANAGEDADJUSTMENT = ZUNMANAGEDADJUSTMENT.Z_PK "
+                "AND ZGENERICASSET.ZTRASHEDSTATE = 0 " + uuid_filter
+            ),
+            "resources": (
+                """ SELECT 
+                    ZGENERICASSET.ZUUID, 
+                    ZINTERNALRESOURCE.ZLOCALAVAILABILITY, 
+                    ZINTERNALRESOURCE.ZREMOTEAVAILABILITY
+                    FROM ZGENERICASSET
+                    JOIN ZADDITIONALASSETATTRIBUTES ON ZADDITIONALASSETATTRIBUTES.ZASSET = ZGENERICASSET.Z_PK 
+                    JOIN ZINTERNALRESOURCE ON ZINTERNALRESOURCE.ZASSET = ZADDITIONALASSETATTRIBUTES.ZASSET 
+                    WHERE  (ZDATASTORESUBTYPE = 0 OR ZDATASTORESUBTYPE = 3) """
+                + uuid_filter
+                # WHERE  ZDATASTORESUBTYPE = 1 OR ZDATASTORESUBTYPE = 3 """
+                # WHERE  ZDATASTORESUBTYPE = 0 OR ZDATASTORESUBTYPE = 3 """
+                # WHERE ZINTERNALRESOURCE.ZFINGERPRINT IS NULL AND ZINTERNALRESOURCE.ZDATASTORESUBTYPE = 3 """
+            ),
+            "resources_by_fingerprint": (
+                """ SELECT ZGENERICASSET.ZUUID,
+                    ZINTERNALRESOURCE.ZLOCALAVAILABILITY,
+                    ZINTERNALRESOURCE.ZREMOTEAVAILABILITY
+                    FROM ZGENERICASSET
+                    JOIN ZADDITIONALASSETATTRIBUTES ON ZADDITIONALASSETATTRIBUTES.ZASSET = ZGENERICASSET.Z_PK
+                    JOIN ZINTERNALRESOURCE ON ZINTERNALRESOURCE.ZFINGERPRINT = ZADDITIONALASSETATTRIBUTES.ZMASTERFINGERPRINT """
+                + uuid_where
+            ),
+            "cloud_master": (
+                """ SELECT
+                    ZGENERICASSET.ZUUID,
+                    ZCLOUDMASTER.ZCLOUDLOCALSTATE
+                    FROM ZCLOUDMASTER, ZGENERICASSET
+                    WHERE ZGENERICASSET.ZMASTER = ZCLOUDMASTER.Z_PK """
+                + uuid_filter
+            ),
+        }
+
+        # the queries don't depend on each other so they can run at the same time (loader="parallel")
+        # rows are always processed in the order below so the result is the same for every loader
+        with _LoaderQueries(self, queries, uuids) as results:
+            # get details about photos
+            # photos are read first so asset ids are assigned in uuid order (the query's
+            # ORDER BY), the same as _process_database5_joined, so photos() returns the
+            # photos in the same order whichever loader is used
+            logging.debug(f"Getting information about photos")
+
+            # uuids of photos processed in this pass
+            processed = []
+
+            for row in results["photos"]:
+                self._process_asset_row5(row)
+                processed.append(row[0])
+
+            # Look for all combinations of persons and pictures
+            if _debug():
+                logging.debug(f"Getting information about persons")
 
-        # add faces and keywords to photo data
-        for uuid in self._dbphotos:
-            # keywords
-            if self._dbphotos[uuid]["hasKeywords"] == 1:
-                self._dbphotos[uuid]["keywords"] = self._dbkeywords_uuid[uuid]
-            else:
-                self._dbphotos[uuid]["keywords"] = []
+            for person in results["persons"]:
+                if person[0] is None:
+                    continue
+                person_name = person[0] if person[0] != "" else _UNKNOWN_PERSON
+                self._dbfaces.add(self._asset_id(person[1]), person_name)
 
-            if uuid in self._dbfaces_uuid:
-                self._dbphotos[uuid]["hasPersons"] = 1
-                self._dbphotos[uuid]["persons"] = self._dbfaces_uuid[uuid]
-            else:
-                self._dbphotos[uuid]["hasPersons"] = 0
-                self._dbphotos[uuid]["persons"] = []
+            if _debug():
+                logging.debug(
+                    f"Finished walking through persons: {len(self._dbfaces.labels())} persons"
+                )
 
-            if uuid in self._dbalbums_uuid:
-                self._dbphotos[uuid]["albums"] = self._dbalbums_uuid[uuid]
-                self._dbphotos[uuid]["hasAlbums"] = 1
-            else:
-                self._dbphotos[uuid]["albums"] = []
-                self._dbphotos[uuid]["hasAlbums"] = 0
+            for album in results["albums"]:
+                # index album uuid by photo and photo by album uuid
+                self._dbalbums.add(self._asset_id(album[1]), album[0])
 
-            if self._dbphotos[uuid]["volumeId"] is not None:
-                self._dbphotos[uuid]["volume"] = self._dbvolumes[
-                    self._dbphotos[uuid]["volumeId"]
-                ]
-            else:
-                self._dbphotos[uuid]["volume"] = None
+            # now get additional details about albums
+            self._process_album_details5(results["album_details"])
 
-        # remove temporary files
-        self._cleanup_tmp_files()
+            if _debug():
+                logging.debug(
+                    f"Finished walking through albums: {len(self._dbalbum_details)} albums"
+                )
 
-        if _debug():
-            logging.debug("Faces:")
-            logging.debug(pformat(self._dbfaces_uuid))
+            # get details on keywords
+            for keyword in results["keywords"]:
+                self._dbkeywords.add(self._asset_id(keyword[1]), keyword[0])
 
-            logging.debug("Keywords by uuid:")
-            logging.debug(pformat(self._dbkeywords_uuid))
+            if _debug():
+                logging.debug(
+                    f"Finished walking through keywords: {len(self._dbkeywords.labels())} keywords"
+                )
 
-            logging.debug("Keywords by keyword:")
-            logging.debug(pformat(self._dbkeywords_keyword))
+            # get details on disk volumes
+            for vol in results["volumes"]:
+                self._dbvolumes[vol[0]] = vol[1]
 
-            logging.debug("Albums by uuid:")
-            logging.debug(pformat(self._dbalbums_uuid))
+            if _debug():
+                logging.debug(f"Finished walking through volumes")
+                logging.debug(self._dbvolumes)
+
+            # Get extended description
+            for row in results["descriptions"]:
+                uuid = row[0]
+                if uuid in self._dbphotos:
+                    self._dbphotos[uuid].extendedDescription = row[1]
+                else:
+                    if _debug():
+                        logging.debug(
+                            f"WARNING: found description {row[1]} but no photo for {uuid}"
+                        )
+
+            # get information about adjusted/edited photos
+            for row in results["adjustments"]:
+                uuid = row[0]
+                if uuid in self._dbphotos:
+                    self._dbphotos[uuid].adjustmentFormatID = row[2]
+                else:
+                    if _debug():
+                        logging.debug(
+                            f"WARNING: found adjustmentformatidentifier {row[2]} but no photo for uuid {row[0]}"
+                        )
+
+            # Find missing photos
+            # TODO: this code is very kludgy and I had to make lots of assumptions
+            # it's probably wrong and needs to be re-worked once I figure out how to reliably
+            # determine if a photo is missing in Photos 5
+
+            # Get info on remote/local availability for photos in shared albums
+            # Shared photos have a null fingerprint (and some other photos do too)
+            # TODO: There may be a bug here, perhaps ZDATASTORESUBTYPE should be 1 --> it's the longest ZDATALENGTH (is this the original)
+            for row in results["resources"]:
+                uuid = row[0]
+                if uuid in self._dbphotos:
+                    #  and self._dbphotos[uuid]["isMissing"] is None:
+                    self._dbphotos[uuid].localAvailability = row[1]
+                    self._dbphotos[uuid].remoteAvailability = row[2]
+
+                    # old = self._dbphotos[uuid]["isMissing"]
+
+                    if row[1] != 1:
+                        self._dbphotos[uuid].isMissing = 1
+                    else:
+                        self._dbphotos[uuid].isMissing = 0
 
-            logging.debug("Albums by album:")
-            logging.debug(pformat(self._dbalbums_album))
+                    # if old is not None and old != self._dbphotos[uuid]["isMissing"]:
+                    #     logging.warning(
+                    #         f"{uuid} isMissing changed: {old} {self._dbphotos[uuid]['isMissing']}"
+                    #     )
 
-            logging.debug("Volumes:")
-            logging.debug(pformat(self._dbvolumes))
+            # get information on local/remote availability
+            for row in results["resources_by_fingerprint"]:
+                uuid = row[0]
+                if uuid in self._dbphotos:
+                    self._dbphotos[uuid].localAvailability = row[1]
+                    self._dbphotos[uuid].remoteAvailability = row[2]
 
-            logging.debug("Photos:")
-            logging.debug(pformat(self._dbphotos))
+                    # old = self._dbphotos[uuid]["isMissing"]
 
-    def _process_database5(self):
-        """ process the Photos database to extract info """
-        """ works on Photos version >= 5.0 """
+                    if row[1] != 1:
+                        self._dbphotos[uuid].isMissing = 1
+                    else:
+                        self._dbphotos[uuid].isMissing = 0
 
-        if _debug():
-            logging.debug(f"_process_database5")
+                    # if old is not None and old != self._dbphotos[uuid]["isMissing"]:
+                    #     logging.warning(
+                    #         f"{uuid} isMissing changed: {old} {self._dbphotos[uuid]['isMissing']}"
+                    #     )
 
-        # Epoch is Jan 1, 2001
-        td = (datetime(2001, 1, 1, 0, 0) - datetime(1970, 1, 1, 0, 0)).total_seconds()
+            # get information about cloud sync state
+            for row in results["cloud_master"]:
+                uuid = row[0]
+                if uuid in self._dbphotos:
+                    self._dbphotos[uuid].cloudLocalState = row[1]
+                    self._dbphotos[uuid].incloud = True if row[1] == 3 else False
 
-        (conn, c) = self._open_sql_file(self._tmp_db)
+            # add faces and keywords to photo data
+            self._link_photo_details5(processed)
 
-        # Look for all combinations of persons and pictures
-        if _debug():
-            logging.debug(f"Getting information about persons")
+        # remove temporary files
+        self._cleanup_tmp_files()
 
-        c.execute(
-            "SELECT ZPERSON.ZFULLNAME, ZGENERICASSET.ZUUID "
-            "FROM ZPERSON, ZDETECTEDFACE, ZGENERICASSET "
-            "WHERE ZDETECTEDFACE.ZPERSON = ZPERSON.Z_PK AND ZDETECTEDFACE.ZASSET = ZGENERICASSET.Z_PK "
-            "AND ZGENERICASSET.ZTRASHEDSTATE = 0"
-        )
-        for person in c:
-            if person[0] is None:
-                continue
-            person_name = person[0] if person[0] != "" else _UNKNOWN_PERSON
-            if not person[1] in self._dbfaces_uuid:
-                self._dbfaces_uuid[person[1]] = []
-            if not person_name in self._dbfaces_person:
-                self._dbfaces_person[person_name] = []
-            self._dbfaces_uuid[person[1]].append(person_name)
-            self._dbfaces_person[person_name].append(person[1])
+        # done processing, dump debug data if requested
+        self._debug_summary()
+
+    def _process_database5_joined(self, uuids=None):
+        """ process the Photos database to extract info
+            works on Photos version >= 5.0 
+            reads the same data as _process_database5 but in two passes instead of one pass per table:
+            one pass over the assets that pulls in keywords, persons, and albums as group_concat aggregates
+            and description, adjustments, and cloud state with LEFT JOINs, 
+            and one pass over the internal resources for local/remote availability
+            uuids: if not None, only process photos whose uuid is in uuids (see refresh) """
 
         if _debug():
-            logging.debug(f"Finished walking through persons")
-            logging.debug(pformat(self._dbfaces_person))
-            logging.debug(self._dbfaces_uuid)
+            logging.debug(f"_process_database5_joined")
+
+        # if only processing some photos, restrict each query to those uuids
+        uuid_filter = uuid_where = ""
+        if uuids is not None:
+            uuid_filter = "AND ZGENERICASSET.ZUUID IN temp._osxphotos_uuids "
+            uuid_where = "WHERE ZGENERICASSET.ZUUID IN temp._osxphotos_uuids "
+
+        queries = {
+            "album_details": _PHOTOS_5_ALBUM_DETAILS_QUERY,
+            "volumes": "SELECT ZUUID, ZNAME from ZFILESYSTEMVOLUME",
+            # keywords, persons, and albums are read with correlated subqueries instead of joins
+            # so that a photo with several of each doesn't produce a row for every combination
+            # group_concat values are separated by char(31) (ASCII unit separator)
+            # which won't appear in a keyword, name, or uuid
+            "photos": (
+                "SELECT "
+                + _PHOTOS_5_ASSET_COLUMNS
+                + """, 
+                    (SELECT group_concat(ZKEYWORD.ZTITLE, char(31)) 
+                        FROM Z_1KEYWORDS 
+                        JOIN ZKEYWORD ON ZKEYWORD.Z_PK = Z_1KEYWORDS.Z_37KEYWORDS 
+                        WHERE Z_1KEYWORDS.Z_1ASSETATTRIBUTES = ZADDITIONALASSETATTRIBUTES.Z_PK), 
+                    (SELECT group_concat(ZPERSON.ZFULLNAME, char(31)) 
+                        FROM ZDETECTEDFACE 
+                        JOIN ZPERSON ON ZPERSON.Z_PK = ZDETECTEDFACE.ZPERSON 
+                        WHERE ZDETECTEDFACE.ZASSET = ZGENERICASSET.Z_PK), 
+                    (SELECT group_concat(ZGENERICALBUM.ZUUID, char(31)) 
+                        FROM Z_26ASSETS 
+                        JOIN ZGENERICALBUM ON ZGENERICALBUM.Z_PK = Z_26ASSETS.Z_26ALBUMS 
+                        WHERE Z_26ASSETS.Z_34ASSETS = ZGENERICASSET.Z_PK), 
+                    ZASSETDESCRIPTION.ZLONGDESCRIPTION, 
+                    ZUNMANAGEDADJUSTMENT.ZADJUSTMENTFORMATIDENTIFIER, 
+                    ZCLOUDMASTER.Z_PK, 
+                    ZCLOUDMASTER.ZCLOUDLOCALSTATE 
+                    FROM ZGENERICASSET 
+                    JOIN ZADDITIONALASSETATTRIBUTES ON ZADDITIONALASSETATTRIBUTES.ZASSET = ZGENERICASSET.Z_PK 
+                    LEFT JOIN ZASSETDESCRIPTION ON ZASSETDESCRIPTION.Z_PK = ZADDITIONALASSETATTRIBUTES.ZASSETDESCRIPTION 
+                    LEFT JOIN ZUNMANAGEDADJUSTMENT ON ZUNMANAGEDADJUSTMENT.Z_PK = ZADDITIONALASSETATTRIBUTES.ZUNMANAGEDADJUSTMENT 
+                    LEFT JOIN ZCLOUDMASTER ON ZCLOUDMASTER.Z_PK = ZGENERICASSET.ZMASTER 
+                    WHERE ZGENERICASSET.ZTRASHEDSTATE = 0 """
+                + uuid_filter
+                + "ORDER BY ZGENERICASSET.ZUUID "
+            ),
+            # local/remote availability, matched first by asset then by fingerprint
+            # rows are applied in order so a match by fingerprint takes precedence as in _process_database5
+            # trashed photos aren't filtered out here as it's faster to skip them when processing the rows
+            "resources": (
+                """ SELECT 
+                    ZGENERICASSET.ZUUID, 
+                    ZINTERNALRESOURCE.ZLOCALAVAILABILITY, 
+                    ZINTERNALRESOURCE.ZREMOTEAVAILABILITY
+                    FROM ZGENERICASSET
+                    JOIN ZADDITIONALASSETATTRIBUTES ON ZADDITIONALASSETATTRIBUTES.ZASSET = ZGENERICASSET.Z_PK 
+                    JOIN ZINTERNALRESOURCE ON ZINTERNALRESOURCE.ZASSET = ZADDITIONALASSETATTRIBUTES.ZASSET 
+                    WHERE (ZDATASTORESUBTYPE = 0 OR ZDATASTORESUBTYPE = 3) """
+                + uuid_filter
+                + """ UNION ALL 
+                    SELECT ZGENERICASSET.ZUUID,
+                    ZINTERNALRESOURCE.ZLOCALAVAILABILITY,
+                    ZINTERNALRESOURCE.ZREMOTEAVAILABILITY
+                    FROM ZGENERICASSET
+                    JOIN ZADDITIONALASSETATTRIBUTES ON ZADDITIONALASSETATTRIBUTES.ZASSET = ZGENERICASSET.Z_PK
+                    JOIN ZINTERNALRESOURCE ON ZINTERNALRESOURCE.ZFINGERPRINT = ZADDITIONALASSETATTRIBUTES.ZMASTERFINGERPRINT """
+                + uuid_where
+            ),
+        }
+
+        # the queries don't depend on each other so they can run at the same time (loader="parallel")
+        # rows are always processed in the order below so the result is the same for every loader
+        with _LoaderQueries(self, queries, uuids) as results:
+            self._process_album_details5(results["album_details"])
+
+            for vol in results["volumes"]:
+                self._dbvolumes[vol[0]] = vol[1]
+
+            # Order of results
+            # 0 - 24  _PHOTOS_5_ASSET_COLUMNS (see _process_asset_row5)
+            # 25   keywords
+            # 26   persons
+            # 27   album uuids
+            # 28   ZASSETDESCRIPTION.ZLONGDESCRIPTION
+            # 29   ZUNMANAGEDADJUSTMENT.ZADJUSTMENTFORMATIDENTIFIER
+            # 30   ZCLOUDMASTER.Z_PK -- NULL if no cloud master
+            # 31   ZCLOUDMASTER.ZCLOUDLOCALSTATE
+
+            for row in results["photos"]:
+                info = self._process_asset_row5(row)
+                asset_id = self._asset_ids[row[0]]
+
+                # add keywords, persons, and albums to the indexes
+                keywords = row[25].split("\x1f") if row[25] is not None else []
+                for keyword in keywords:
+                    self._dbkeywords.add(asset_id, keyword)
+                info.hasKeywords = 1 if keywords else 0
 
-        c.execute(
-            "SELECT ZGENERICALBUM.ZUUID, ZGENERICASSET.ZUUID "
-            "FROM ZGENERICASSET "
-            "JOIN Z_26ASSETS ON Z_26ASSETS.Z_34ASSETS = ZGENERICASSET.Z_PK "
-            "JOIN ZGENERICALBUM ON ZGENERICALBUM.Z_PK = Z_26ASSETS.Z_26ALBUMS "
-            "WHERE ZGENERICASSET.ZTRASHEDSTATE = 0 "
-        )
-        for album in c:
-            # store by uuid in _dbalbums_uuid and by album in _dbalbums_album
-            if not album[1] in self._dbalbums_uuid:
-                self._dbalbums_uuid[album[1]] = []
-            if not album[0] in self._dbalbums_album:
-                self._dbalbums_album[album[0]] = []
-            self._dbalbums_uuid[album[1]].append(album[0])
-            self._dbalbums_album[album[0]].append(album[1])
-
-        # now get additional details about albums
-        c.execute(
-            "SELECT "
-            "ZUUID, "  # 0
-            "ZTITLE, "  # 1
-            "ZCLOUDLOCALSTATE, "  # 2
-            "ZCLOUDOWNERFIRSTNAME, "  # 3
-            "ZCLOUDOWNERLASTNAME, "  # 4
-            "ZCLOUDOWNERHASHEDPERSONID "  # 5
-            "FROM ZGENERICALBUM"
-        )
-        for album in c:
+                persons = row[26].split("\x1f") if row[26] is not None else []
+                for person in persons:
+                    self._dbfaces.add(asset_id, person if person != "" else _UNKNOWN_PERSON)
+                info.hasPersons = 1 if persons else 0
+
+                albums = row[27].split("\x1f") if row[27] is not None else []
+                for album in albums:
+                    self._dbalbums.add(asset_id, album)
+                info.hasAlbums = 1 if albums else 0
+
+                info.extendedDescription = row[28]
+                info.adjustmentFormatID = row[29]
+                if row[30] is not None:
+                    info.cloudLocalState = row[31]
+                    info.incloud = True if row[31] == 3 else False
+
+            # local/remote availability
+            for row in results["resources"]:
+                info = self._dbphotos.get(row[0])
+                if info is None:
+                    continue
+                info.localAvailability = row[1]
+                info.remoteAvailability = row[2]
+                info.isMissing = 1 if row[1] != 1 else 0
+
+        # remove temporary files
+        self._cleanup_tmp_files()
+
+        # done processing, dump debug data if requested
+        self._debug_summary()
+
+    def _process_album_details5(self, rows):
+        """ read details about all albums into _dbalbum_details (Photos 5)
+            rows: rows of _PHOTOS_5_ALBUM_DETAILS_QUERY """
+        for album in rows:
             self._dbalbum_details[album[0]] = {
                 "title": album[1],
                 "cloudlocalstate": album[2],
@@ -902,76 +1746,11 @@ class PhotosDB:
                 "cloudidentifier": None,  # Photos4
             }
 
-        if _debug():
-            logging.debug(f"Finished walking through albums")
-            logging.debug(pformat(self._dbalbums_album))
-            logging.debug(pformat(self._dbalbums_uuid))
-            logging.debug(pformat(self._dbalbum_details))
-
-        # get details on keywords
-        c.execute(
-            "SELECT ZKEYWORD.ZTITLE, ZGENERICASSET.ZUUID "
-            "FROM ZGENERICASSET "
-            "JOIN ZADDITIONALASSETATTRIBUTES ON ZADDITIONALASSETATTRIBUTES.ZASSET = ZGENERICASSET.Z_PK "
-            "JOIN Z_1KEYWORDS ON Z_1KEYWORDS.Z_1ASSETATTRIBUTES = ZADDITIONALASSETATTRIBUTES.Z_PK "
-            "JOIN ZKEYWORD ON ZKEYWORD.Z_PK = Z_1KEYWORDS.Z_37KEYWORDS "
-            "WHERE ZGENERICASSET.ZTRASHEDSTATE = 0 "
-        )
-        for keyword in c:
-            if not keyword[1] in self._dbkeywords_uuid:
-                self._dbkeywords_uuid[keyword[1]] = []
-            if not keyword[0] in self._dbkeywords_keyword:
-                self._dbkeywords_keyword[keyword[0]] = []
-            self._dbkeywords_uuid[keyword[1]].append(keyword[0])
-            self._dbkeywords_keyword[keyword[0]].append(keyword[1])
-
-        if _debug():
-            logging.debug(f"Finished walking through keywords")
-            logging.debug(pformat(self._dbkeywords_keyword))
-            logging.debug(pformat(self._dbkeywords_uuid))
+    def _process_asset_row5(self, row):
+        """ build the _PhotoRecord for a single photo and add it to _dbphotos (Photos 5)
+            row: row of _PHOTOS_5_ASSET_COLUMNS (extra columns are ignored)
+            returns the _PhotoRecord """
 
-        # get details on disk volumes
-        c.execute("SELECT ZUUID, ZNAME from ZFILESYSTEMVOLUME")
-        for vol in c:
-            self._dbvolumes[vol[0]] = vol[1]
-
-        if _debug():
-            logging.debug(f"Finished walking through volumes")
-            logging.debug(self._dbvolumes)
-
-        # get details about photos
-        logging.debug(f"Getting information about photos")
-        c.execute(
-            """SELECT ZGENERICASSET.ZUUID, 
-                ZADDITIONALASSETATTRIBUTES.ZMASTERFINGERPRINT, 
-                ZADDITIONALASSETATTRIBUTES.ZTITLE, 
-                ZADDITIONALASSETATTRIBUTES.ZORIGINALFILENAME, 
-                ZGENERICASSET.ZMODIFICATIONDATE, 
-                ZGENERICASSET.ZDATECREATED, 
-                ZADDITIONALASSETATTRIBUTES.ZTIMEZONEOFFSET, 
-                ZADDITIONALASSETATTRIBUTES.ZINFERREDTIMEZONEOFFSET, 
-                ZADDITIONALASSETATTRIBUTES.ZTIMEZONENAME, 
-                ZGENERICASSET.ZHIDDEN, 
-                ZGENERICASSET.ZFAVORITE, 
-                ZGENERICASSET.ZDIRECTORY, 
-                ZGENERICASSET.ZFILENAME, 
-                ZGENERICASSET.ZLATITUDE, 
-                ZGENERICASSET.ZLONGITUDE, 
-                ZGENERICASSET.ZHASADJUSTMENTS, 
-                ZGENERICASSET.ZCLOUDBATCHPUBLISHDATE, 
-                ZGENERICASSET.ZKIND, 
-                ZGENERICASSET.ZUNIFORMTYPEIDENTIFIER,
-				ZGENERICASSET.ZAVALANCHEUUID,
-				ZGENERICASSET.ZAVALANCHEPICKTYPE,
-                ZGENERICASSET.ZKINDSUBTYPE,
-                ZGENERICASSET.ZCUSTOMRENDEREDVALUE,
-                ZADDITIONALASSETATTRIBUTES.ZCAMERACAPTUREDEVICE,
-                ZGENERICASSET.ZCLOUDASSETGUID 
-                FROM ZGENERICASSET 
-                JOIN ZADDITIONALASSETATTRIBUTES ON ZADDITIONALASSETATTRIBUTES.ZASSET = ZGENERICASSET.Z_PK 
-                WHERE ZGENERICASSET.ZTRASHEDSTATE = 0  
-                ORDER BY ZGENERICASSET.ZUUID  """
-        )
         # Order of results
         # 0    SELECT ZGENERICASSET.ZUUID,
         # 1    ZADDITIONALASSETATTRIBUTES.ZMASTERFINGERPRINT,
@@ -1000,318 +1779,299 @@ class PhotosDB:
         # 25   ZGENERICASSET.ZCLOUDASSETGUID  -- not null if asset is cloud asset
         #       (e.g. user has "iCloud Photos" checked in Photos preferences)
 
-        for row in c:
-            uuid = row[0]
-            info = {}
-            info["_uuid"] = uuid  # stored here for easier debugging
-            info["modelID"] = None
-            info["masterUuid"] = None
-            info["masterFingerprint"] = row[1]
-            info["name"] = row[2]
-            try:
-                info["lastmodifieddate"] = datetime.fromtimestamp(row[4] + td)
-            except:
-                info["lastmodifieddate"] = datetime.fromtimestamp(row[5] + td)
-
-            info["imageDate"] = datetime.fromtimestamp(row[5] + td)
-            info["imageTimeZoneOffsetSeconds"] = row[6]
-            info["hidden"] = row[9]
-            info["favorite"] = row[10]
-            info["originalFilename"] = row[3]
-            info["filename"] = row[12]
-            info["directory"] = row[11]
-
-            # set latitude and longitude
-            # if both latitude and longitude = -180.0, then they are NULL
-            if row[13] == -180.0 and row[14] == -180.0:
-                info["latitude"] = None
-                info["longitude"] = None
-            else:
-                info["latitude"] = row[13]
-                info["longitude"] = row[14]
-
-            info["hasAdjustments"] = row[15]
-
-            info["cloudbatchpublishdate"] = row[16]
-            info["shared"] = True if row[16] is not None else False
-
-            # these will get filled in later
-            # init to avoid key errors
-            info["extendedDescription"] = None  # fill this in later
-            info["localAvailability"] = None
-            info["remoteAvailability"] = None
-            info["isMissing"] = None
-            info["adjustmentUuid"] = None
-            info["adjustmentFormatID"] = None
-
-            # find type
-            if row[17] == 0:
-                info["type"] = _PHOTO_TYPE
-            elif row[17] == 1:
-                info["type"] = _MOVIE_TYPE
-            else:
-                if _debug():
-                    logging.debug(f"WARNING: {uuid} found unknown type {row[17]}")
-                info["type"] = None
-
-            info["UTI"] = row[18]
-
-            # handle burst photos
-            # if burst photo, determine whether or not it's a selected burst photo
-            # in Photos 5, burstUUID is called avalancheUUID
-            info["burstUUID"] = row[19]  # avalancheUUID
-            info["burstPickType"] = row[20]  # avalanchePickType
-            if row[19] is not None:
-                # it's a burst photo
-                info["burst"] = True
-                burst_uuid = row[19]
-                if burst_uuid not in self._dbphotos_burst:
-                    self._dbphotos_burst[burst_uuid] = set()
-                self._dbphotos_burst[burst_uuid].add(uuid)
-                if row[20] != 2 and row[20] != 4:
-                    info[
-                        "burst_key"
-                    ] = True  # it's a key photo (selected from the burst)
-                else:
-                    info[
-                        "burst_key"
-                    ] = False  # it's a burst photo but not one that's selected
-            else:
-                # not a burst photo
-                info["burst"] = False
-                info["burst_key"] = None
-
-            # Info on sub-type (live photo, panorama, etc)
-            # ZGENERICASSET.ZKINDSUBTYPE
-            # 1 == panorama
-            # 2 == live photo
-            # 10 = screenshot
-            # 100 = shared movie (MP4) ??
-            # 101 = slow-motion video
-            # 102 = Time lapse video
-            info["subtype"] = row[21]
-            info["live_photo"] = True if row[21] == 2 else False
-            info["screenshot"] = True if row[21] == 10 else False
-            info["slow_mo"] = True if row[21] == 101 else False
-            info["time_lapse"] = True if row[21] == 102 else False
-
-            # Handle HDR photos and portraits
-            # ZGENERICASSET.ZCUSTOMRENDEREDVALUE
-            # 3 = HDR photo
-            # 4 = non-HDR version of the photo
-            # 6 = panorama
-            # 8 = portrait
-            info["customRenderedValue"] = row[22]
-            info["hdr"] = True if row[22] == 3 else False
-            info["portrait"] = True if row[22] == 8 else False
-
-            # Set panorama from either KindSubType or RenderedValue
-            info["panorama"] = True if row[21] == 1 or row[22] == 6 else False
-
-            # Handle selfies (front facing camera, ZCAMERACAPTUREDEVICE=1)
-            info["selfie"] = True if row[23] == 1 else False
-
-            # Determine if photo is part of cloud library (ZGENERICASSET.ZCLOUDASSETGUID not NULL)
-            # Initialize cloud fields that will filled in later
-            info["cloudAssetGUID"] = row[24]
-            info["cloudLocalState"] = None
-            info["incloud"] = None
-            info["cloudLibraryState"] = None  # Photos 4
-            info["cloudStatus"] = None  # Photos 4
-            info["cloudAvailable"] = None  # Photos 4
-
-            self._dbphotos[uuid] = info
-
-            # # if row[19] is not None and ((row[20] == 2) or (row[20] == 4)):
-            # # burst photo
-            # if row[19] is not None:
-            #     # burst photo, add to _dbphotos_burst
-            #     info["burst"] = True
-            #     burst_uuid = row[19]
-            #     if burst_uuid not in self._dbphotos_burst:
-            #         self._dbphotos_burst[burst_uuid] = {}
-            #     self._dbphotos_burst[burst_uuid][uuid] = info
-            # else:
-            #     info["burst"] = False
-
-        # Get extended description
-        c.execute(
-            "SELECT ZGENERICASSET.ZUUID, "
-            "ZASSETDESCRIPTION.ZLONGDESCRIPTION "
-            "FROM ZGENERICASSET "
-            "JOIN ZADDITIONALASSETATTRIBUTES ON ZADDITIONALASSETATTRIBUTES.ZASSET = ZGENERICASSET.Z_PK "
-            "JOIN ZASSETDESCRIPTION ON ZASSETDESCRIPTION.Z_PK = ZADDITIONALASSETATTRIBUTES.ZASSETDESCRIPTION "
-            "ORDER BY ZGENERICASSET.ZUUID "
-        )
-        for row in c:
-            uuid = row[0]
-            if uuid in self._dbphotos:
-                self._dbphotos[uuid]["extendedDescription"] = row[1]
-            else:
-                if _debug():
-                    logging.debug(
-                        f"WARNING: found description {row[1]} but no photo for {uuid}"
-                    )
-
-        # get information about adjusted/edited photos
-        c.execute(
-            "SELECT ZGENERICASSET.ZUUID, "
-            "ZGENERICASSET.ZHASADJUSTMENTS, "
-            "ZUNMANAGEDADJUSTMENT.ZADJUSTMENTFORMATIDENTIFIER "
-            "FROM ZGENERICASSET, ZUNMANAGEDADJUSTMENT "
-            "JOIN ZADDITIONALASSETATTRIBUTES ON ZADDITIONALASSETATTRIBUTES.ZASSET = ZGENERICASSET.Z_PK "
-            "WHERE ZADDITIONALASSETATTRIBUTES.ZUNMANAGEDADJUSTMENT = ZUNMANAGEDADJUSTMENT.Z_PK "
-            "AND ZGENERICASSET.ZTRASHEDSTATE = 0 "
-        )
-        for row in c:
-            uuid = row[0]
-            if uuid in self._dbphotos:
-                self._dbphotos[uuid]["adjustmentFormatID"] = row[2]
-            else:
-                if _debug():
-                    logging.debug(
-                        f"WARNING: found adjustmentformatidentifier {row[2]} but no photo for uuid {row[0]}"
-                    )
-
-        # Find missing photos
-        # TODO: this code is very kludgy and I had to make lots of assumptions
-        # it's probably wrong and needs to be re-worked once I figure out how to reliably
-        # determine if a photo is missing in Photos 5
-
-        # Get info on remote/local availability for photos in shared albums
-        # Shared photos have a null fingerprint (and some other photos do too)
-        # TODO: There may be a bug here, perhaps ZDATASTORESUBTYPE should be 1 --> it's the longest ZDATALENGTH (is this the original)
-        c.execute(
-            """ SELECT 
-                ZGENERICASSET.ZUUID, 
-                ZINTERNALRESOURCE.ZLOCALAVAILABILITY, 
-                ZINTERNALRESOURCE.ZREMOTEAVAILABILITY
-                FROM ZGENERICASSET
-                JOIN ZADDITIONALASSETATTRIBUTES ON ZADDITIONALASSETATTRIBUTES.ZASSET = ZGENERICASSET.Z_PK 
-                JOIN ZINTERNALRESOURCE ON ZINTERNALRESOURCE.ZASSET = ZADDITIONALASSETATTRIBUTES.ZASSET 
-                WHERE  ZDATASTORESUBTYPE = 0 OR ZDATASTORESUBTYPE = 3 """
-            # WHERE  ZDATASTORESUBTYPE = 1 OR ZDATASTORESUBTYPE = 3 """
-            # WHERE  ZDATASTORESUBTYPE = 0 OR ZDATASTORESUBTYPE = 3 """
-            # WHERE ZINTERNALRESOURCE.ZFINGERPRINT IS NULL AND ZINTERNALRESOURCE.ZDATASTORESUBTYPE = 3 """
-        )
-
-        for row in c:
-            uuid = row[0]
-            if uuid in self._dbphotos:
-                #  and self._dbphotos[uuid]["isMissing"] is None:
-                self._dbphotos[uuid]["localAvailability"] = row[1]
-                self._dbphotos[uuid]["remoteAvailability"] = row[2]
-
-                # old = self._dbphotos[uuid]["isMissing"]
-
-                if row[1] != 1:
-                    self._dbphotos[uuid]["isMissing"] = 1
-                else:
-                    self._dbphotos[uuid]["isMissing"] = 0
-
-                # if old is not None and old != self._dbphotos[uuid]["isMissing"]:
-                #     logging.warning(
-                #         f"{uuid} isMissing changed: {old} {self._dbphotos[uuid]['isMissing']}"
-                #     )
-
-        # get information on local/remote availability
-        c.execute(
-            """ SELECT ZGENERICASSET.ZUUID,
-                ZINTERNALRESOURCE.ZLOCALAVAILABILITY,
-                ZINTERNALRESOURCE.ZREMOTEAVAILABILITY
-                FROM ZGENERICASSET
-                JOIN ZADDITIONALASSETATTRIBUTES ON ZADDITIONALASSETATTRIBUTES.ZASSET = ZGENERICASSET.Z_PK
-                JOIN ZINTERNALRESOURCE ON ZINTERNALRESOURCE.ZFINGERPRINT = ZADDITIONALASSETATTRIBUTES.ZMASTERFINGERPRINT """
-        )
-
-        for row in c:
-            uuid = row[0]
-            if uuid in self._dbphotos:
-                self._dbphotos[uuid]["localAvailability"] = row[1]
-                self._dbphotos[uuid]["remoteAvailability"] = row[2]
-
-                # old = self._dbphotos[uuid]["isMissing"]
-
-                if row[1] != 1:
-                    self._dbphotos[uuid]["isMissing"] = 1
-                else:
-                    self._dbphotos[uuid]["isMissing"] = 0
-
-                # if old is not None and old != self._dbphotos[uuid]["isMissing"]:
-                #     logging.warning(
-                #         f"{uuid} isMissing changed: {old} {self._dbphotos[uuid]['isMissing']}"
-                #     )
-
-        # get information about cloud sync state
-        c.execute(
-            """ SELECT
-                ZGENERICASSET.ZUUID,
-                ZCLOUDMASTER.ZCLOUDLOCALSTATE
-                FROM ZCLOUDMASTER, ZGENERICASSET
-                WHERE ZGENERICASSET.ZMASTER = ZCLOUDMASTER.Z_PK """
-        )
-        for row in c:
-            uuid = row[0]
-            if uuid in self._dbphotos:
-                self._dbphotos[uuid]["cloudLocalState"] = row[1]
-                self._dbphotos[uuid]["incloud"] = True if row[1] == 3 else False
-
-        # add faces and keywords to photo data
-        for uuid in self._dbphotos:
-            # keywords
-            if uuid in self._dbkeywords_uuid:
-                self._dbphotos[uuid]["hasKeywords"] = 1
-                self._dbphotos[uuid]["keywords"] = self._dbkeywords_uuid[uuid]
-            else:
-                self._dbphotos[uuid]["hasKeywords"] = 0
-                self._dbphotos[uuid]["keywords"] = []
-
-            if uuid in self._dbfaces_uuid:
-                self._dbphotos[uuid]["hasPersons"] = 1
-                self._dbphotos[uuid]["persons"] = self._dbfaces_uuid[uuid]
-            else:
-                self._dbphotos[uuid]["hasPersons"] = 0
-                self._dbphotos[uuid]["persons"] = []
-
-            if uuid in self._dbalbums_uuid:
-                self._dbphotos[uuid]["albums"] = self._dbalbums_uuid[uuid]
-                self._dbphotos[uuid]["hasAlbums"] = 1
+        uuid = row[0]
+        self._asset_id(uuid)
+        info = _PhotoRecord()
+        info._uuid = uuid  # stored here for easier debugging
+        info.modelID = None
+        info.masterUuid = None
+        info.masterFingerprint = row[1]
+        info.name = row[2]
+        # dates are stored as read (seconds since the Photos epoch)
+        # and only made into datetimes when used, see _PhotoRecord
+        info.lastmodifieddateSeconds = row[4] if row[4] is not None else row[5]
+        info.imageDateSeconds = row[5]
+        info.imageTimeZoneOffsetSeconds = row[6]
+        info.hidden = row[9]
+        info.favorite = row[10]
+        info.originalFilename = row[3]
+        info.filename = row[12]
+        info.directory = row[11]
+
+        # set latitude and longitude
+        # if both latitude and longitude = -180.0, then they are NULL
+        if row[13] == -180.0 and row[14] == -180.0:
+            info.latitude = None
+            info.longitude = None
+        else:
+            info.latitude = row[13]
+            info.longitude = row[14]
+
+        info.hasAdjustments = row[15]
+
+        info.cloudbatchpublishdate = row[16]
+        info.shared = True if row[16] is not None else False
+
+        # these will get filled in later
+        # init to avoid key errors
+        info.extendedDescription = None  # fill this in later
+        info.localAvailability = None
+        info.remoteAvailability = None
+        info.isMissing = None
+        info.adjustmentUuid = None
+        info.adjustmentFormatID = None
+
+        # find type
+        if row[17] == 0:
+            info.type = _PHOTO_TYPE
+        elif row[17] == 1:
+            info.type = _MOVIE_TYPE
+        else:
+            if _debug():
+                logging.debug(f"WARNING: {uuid} found unknown type {row[17]}")
+            info.type = None
+
+        info.UTI = row[18]
+
+        # handle burst photos
+        # if burst photo, determine whether or not it's a selected burst photo
+        # in Photos 5, burstUUID is called avalancheUUID
+        info.burstUUID = row[19]  # avalancheUUID
+        info.burstPickType = row[20]  # avalanchePickType
+        if row[19] is not None:
+            # it's a burst photo
+            info.burst = True
+            burst_uuid = row[19]
+            if burst_uuid not in self._dbphotos_burst:
+                self._dbphotos_burst[burst_uuid] = set()
+            self._dbphotos_burst[burst_uuid].add(uuid)
+            if row[20] != 2 and row[20] != 4:
+                info.burst_key = True  # it's a key photo (selected from the burst)
             else:
-                self._dbphotos[uuid]["albums"] = []
-                self._dbphotos[uuid]["hasAlbums"] = 0
-
-        # close connection and remove temporary files
-        conn.close()
-        self._cleanup_tmp_files()
-
-        # done processing, dump debug data if requested
+                info.burst_key = False  # it's a burst photo but not one that's selected
+        else:
+            # not a burst photo
+            info.burst = False
+            info.burst_key = None
+
+        # Info on sub-type (live photo, panorama, etc)
+        # ZGENERICASSET.ZKINDSUBTYPE
+        # 1 == panorama
+        # 2 == live photo
+        # 10 = screenshot
+        # 100 = shared movie (MP4) ??
+        # 101 = slow-motion video
+        # 102 = Time lapse video
+        info.subtype = row[21]
+        info.live_photo = True if row[21] == 2 else False
+        info.screenshot = True if row[21] == 10 else False
+        info.slow_mo = True if row[21] == 101 else False
+        info.time_lapse = True if row[21] == 102 else False
+
+        # Handle HDR photos and portraits
+        # ZGENERICASSET.ZCUSTOMRENDEREDVALUE
+        # 3 = HDR photo
+        # 4 = non-HDR version of the photo
+        # 6 = panorama
+        # 8 = portrait
+        info.customRenderedValue = row[22]
+        info.hdr = True if row[22] == 3 else False
+        info.portrait = True if row[22] == 8 else False
+
+        # Set panorama from either KindSubType or RenderedValue
+        info.panorama = True if row[21] == 1 or row[22] == 6 else False
+
+        # Handle selfies (front facing camera, ZCAMERACAPTUREDEVICE=1)
+        info.selfie = True if row[23] == 1 else False
+
+        # Determine if photo is part of cloud library (ZGENERICASSET.ZCLOUDASSETGUID not NULL)
+        # Initialize cloud fields that will filled in later
+        info.cloudAssetGUID = row[24]
+        info.cloudLocalState = None
+        info.incloud = None
+        info.cloudLibraryState = None  # Photos 4
+        info.cloudStatus = None  # Photos 4
+        info.cloudAvailable = None  # Photos 4
+
+        self._dbphotos[uuid] = info
+
+        # # if row[19] is not None and ((row[20] == 2) or (row[20] == 4)):
+        # # burst photo
+        # if row[19] is not None:
+        #     # burst photo, add to _dbphotos_burst
+        #     info.burst = True
+        #     burst_uuid = row[19]
+        #     if burst_uuid not in self._dbphotos_burst:
+        #         self._dbphotos_burst[burst_uuid] = {}
+        #     self._dbphotos_burst[burst_uuid][uuid] = info
+        # else:
+        #     info.burst = False
+
+        return info
+
+    def _link_photo_details5(self, uuids):
+        """ set whether the photos in uuids have keywords, persons, and albums (Photos 5)
+            the keywords, persons, and albums themselves are looked up in the indexes by PhotoInfo """
+        for uuid in uuids:
+            asset_id = self._asset_ids[uuid]
+            info = self._dbphotos[uuid]
+            info.hasKeywords = 1 if self._dbkeywords.has_labels(asset_id) else 0
+            info.hasPersons = 1 if self._dbfaces.has_labels(asset_id) else 0
+            info.hasAlbums = 1 if self._dbalbums.has_labels(asset_id) else 0
+
+    def _debug_summary(self):
+        """ log a summary of the data read from the database to the debug log
+            (only counts: the data itself is too large to log for a big library) """
         if _debug():
-            logging.debug("Faces:")
-            logging.debug(pformat(self._dbfaces_uuid))
-
-            logging.debug("Keywords by uuid:")
-            logging.debug(pformat(self._dbkeywords_uuid))
+            logging.debug(
+                f"Read {len(self._dbphotos)} photos, "
+                f"{len(self._dbphotos_burst)} burst sets, "
+                f"{len(self._dbfaces.labels())} persons, "
+                f"{len(self._dbkeywords.labels())} keywords, "
+                f"{len(self._dbalbums.labels())} albums with photos, "
+                f"{len(self._dbalbum_details)} albums, "
+                f"{len(self._dbvolumes)} volumes"
+            )
 
-            logging.debug("Keywords by keyword:")
-            logging.debug(pformat(self._dbkeywords_keyword))
+    def refresh(self):
+        """ re-read the Photos database and update the PhotosDB object with any photos
+            that were added, modified, or deleted since the database was last read
+            Only the changed photos are read from the database; photos are considered modified
+            if their modification date changed (ZMODIFICATIONDATE in Photos 5 or 
+            RKVersion.lastmodifieddate in Photos <= 4) or their persons, albums, or keywords
+            changed 
+            Returns dict with lists of uuids: {"added": [...], "updated": [...], "removed": [...]} """
+
+        changes = {"added": [], "updated": [], "removed": []}
+
+        fingerprint = self._db_fingerprint()
+        if fingerprint == self._fingerprint:
+            # database files haven't been touched, nothing to do
+            return changes
+
+        modified = {
+            uuid: info.lastmodifieddateSeconds for (uuid, info) in self._dbphotos.items()
+        }
+        if self._read_with_fallback(lambda: self._refresh_photos(changes)):
+            # the whole library was read again so compare it with what was there before
+            changes["added"] = [uuid for uuid in self._dbphotos if uuid not in modified]
+            changes["updated"] = [
+                uuid
+                for (uuid, info) in self._dbphotos.items()
+                if uuid in modified and info.lastmodifieddateSeconds != modified[uuid]
+            ]
+            changes["removed"] = [uuid for uuid in modified if uuid not in self._dbphotos]
+
+        self._build_indexes()
+
+        self._fingerprint = fingerprint
+        if self._use_cache:
+            self._save_snapshot(fingerprint)
+
+        return changes
+
+    def _refresh_photos(self, changes):
+        """ finds the photos added, modified, or deleted since the database was last read,
+            adds their uuids to changes (see refresh), and reads them again """
+        self._tmp_db = self._prepare_db_file(self._dbfile_actual)
+        (conn, c) = self._open_sql_file(self._tmp_db)
+        if int(self._db_version) < int(_PHOTOS_5_VERSION):
+            c.execute(
+                """ SELECT RKVersion.uuid, RKVersion.lastmodifieddate, RKVersion.imageDate
+                    FROM RKVersion, RKMaster WHERE RKVersion.isInTrash = 0 AND 
+                    RKVersion.masterUuid = RKMaster.uuid AND RKVersion.filename NOT LIKE '%.pdf' """
+            )
+        else:
+            c.execute(
+                """ SELECT ZGENERICASSET.ZUUID, ZGENERICASSET.ZMODIFICATIONDATE, ZGENERICASSET.ZDATECREATED
+                    FROM ZGENERICASSET 
+                    JOIN ZADDITIONALASSETATTRIBUTES ON ZADDITIONALASSETATTRIBUTES.ZASSET = ZGENERICASSET.Z_PK 
+                    WHERE ZGENERICASSET.ZTRASHEDSTATE = 0 """
+            )
 
-            logging.debug("Albums by uuid:")
-            logging.debug(pformat(self._dbalbums_uuid))
+        # compute the last modified date the same way _process_database4/5 do
+        # so it can be compared with what's already been loaded
+        current = set()
+        for (uuid, modified, created) in c:
+            current.add(uuid)
+            if uuid not in self._dbphotos:
+                changes["added"].append(uuid)
+                continue
+            lastmodifieddate = modified if modified is not None else created
+            if lastmodifieddate != self._dbphotos[uuid]["lastmodifieddateSeconds"]:
+                changes["updated"].append(uuid)
+
+        # adding a photo to an album or tagging a person doesn't always change the photo's
+        # modification date so compare the persons, albums, and keywords of every photo
+        # with what's already been loaded and read the photos whose labels changed again
+        found = set(changes["added"]) | set(changes["updated"])
+        photos5 = int(self._db_version) >= int(_PHOTOS_5_VERSION)
+        indexes = {
+            "persons": self._dbfaces,
+            "albums": self._dbalbums,
+            "keywords": self._dbkeywords,
+        }
+        for (name, sql) in self._membership_queries().items():
+            labels = {}
+            for row in c.execute(sql):
+                (label, uuid) = row[:2]
+                if label is None and name == "persons":
+                    continue
+                if label == "" and name == "persons" and photos5:
+                    label = _UNKNOWN_PERSON
+                labels.setdefault(uuid, []).append(label)
+            index = indexes[name]
+            for uuid in current:
+                if uuid in found:
+                    continue
+                loaded = index.labels_for(self._asset_ids[uuid])
+                if sorted(labels.get(uuid, [])) != sorted(loaded):
+                    changes["updated"].append(uuid)
+                    found.add(uuid)
+        conn.close()
 
-            logging.debug("Albums by album:")
-            logging.debug(pformat(self._dbalbums_album))
+        if self._prefilter is not None:
+            # photos that no longer match are removed; those that now match are added
+            matched = self._prefilter_uuids()
+            current &= matched
+            changes["added"] = [uuid for uuid in changes["added"] if uuid in matched]
+            changes["updated"] = [
+                uuid for uuid in changes["updated"] if uuid in matched
+            ]
 
-            logging.debug("Album details:")
-            logging.debug(pformat(self._dbalbum_details))
+        changes["removed"] = [uuid for uuid in self._dbphotos if uuid not in current]
 
-            logging.debug("Volumes:")
-            logging.debug(pformat(self._dbvolumes))
+        if _debug():
+            logging.debug(
+                "refresh: "
+                + ", ".join(f"{len(uuids)} {change}" for change, uuids in changes.items())
+            )
 
-            logging.debug("Photos:")
-            logging.debug(pformat(self._dbphotos))
+        self._remove_uuids(changes["removed"] + changes["updated"])
 
-            logging.debug("Burst Photos:")
-            logging.debug(pformat(self._dbphotos_burst))
+        # album details and volumes are small so they're always read again in full
+        self._dbalbum_details = {}
+        self._dbvolumes = {}
+        self._load_database(uuids=changes["added"] + changes["updated"])
+
+    def _remove_uuids(self, uuids):
+        """ remove photos with uuid in uuids from _dbphotos and all the keyword, person, album and burst indexes """
+        uuids = set(uuids)
+        if not uuids:
+            return
+
+        for uuid in uuids:
+            info = self._dbphotos.pop(uuid, None)
+            if info is not None and info["burst"]:
+                burst_uuid = info["burstUUID"]
+                self._dbphotos_burst[burst_uuid].discard(uuid)
+                if not self._dbphotos_burst[burst_uuid]:
+                    del self._dbphotos_burst[burst_uuid]
+
+        # asset ids aren't reused so a photo that's added back gets the same id
+        asset_ids = {self._asset_ids[uuid] for uuid in uuids if uuid in self._asset_ids}
+        for index in [self._dbkeywords, self._dbfaces, self._dbalbums]:
+            index.remove(asset_ids)
 
     def photos(
         self,
@@ -1323,6 +2083,26 @@ class PhotosDB:
         movies=False,
         from_date=None,
         to_date=None,
+        from_modified_date=None,
+        to_modified_date=None,
+        favorite=None,
+        hidden=None,
+        ismissing=None,
+        hasadjustments=None,
+        external_edit=None,
+        shared=None,
+        burst=None,
+        live_photo=None,
+        iscloudasset=None,
+        incloud=None,
+        text=None,
+        where=None,
+        near=None,
+        bbox=None,
+        sort_by=None,
+        descending=False,
+        limit=None,
+        offset=0,
     ):
         """ 
         Return a list of PhotoInfo objects
@@ -1333,84 +2113,767 @@ class PhotosDB:
         movies: if True, returns movie files, if False, does not return movies; default is False
         from_date: return photos with creation date >= from_date (datetime.datetime object, default None)
         to_date: return photos with creation date <= to_date (datetime.datetime object, default None)
+        from_modified_date, to_modified_date: same as from_date, to_date for the date the photo
+        was last modified, e.g. to find the photos changed since a given time
+        favorite, hidden, ismissing, hasadjustments, external_edit, shared, burst, live_photo,
+        iscloudasset, incloud: if True, returns only photos where the PhotoInfo property of the
+        same name is True, if False, only photos where it's not True; default is None (either)
+        text: return photos matching every term of text in their title, description, keywords,
+        persons or album titles (see search); default is None
+        where: return photos matching the boolean query expression where (see query);
+        default is None
+        near: (latitude, longitude, radius): return photos within radius km of the point;
+        default is None
+        bbox: (min latitude, min longitude, max latitude, max longitude): return photos inside
+        the box, which crosses the 180th meridian if min longitude > max longitude; default is None
+        sort_by: return photos sorted by one of date, modified_date, title, description,
+        filename, original_filename, or uuid; photos without a value come last;
+        default is None (no particular order)
+        descending: if True, sort in descending order; default is False
+        limit: return at most limit photos; default is None (all)
+        offset: skip the first offset photos (after sorting); default is 0
         """
-        photos_sets = []  # list of photo sets to perform intersection of
-        if not any([keywords, uuid, persons, albums, from_date, to_date]):
+        photoinfo = list(
+            self.iter_photos(
+                keywords=keywords,
+                uuid=uuid,
+                persons=persons,
+                albums=albums,
+                images=images,
+                movies=movies,
+                from_date=from_date,
+                to_date=to_date,
+                from_modified_date=from_modified_date,
+                to_modified_date=to_modified_date,
+                favorite=favorite,
+                hidden=hidden,
+                ismissing=ismissing,
+                hasadjustments=hasadjustments,
+                external_edit=external_edit,
+                shared=shared,
+                burst=burst,
+                live_photo=live_photo,
+                iscloudasset=iscloudasset,
+                incloud=incloud,
+                text=text,
+                where=where,
+                near=near,
+                bbox=bbox,
+                sort_by=sort_by,
+                descending=descending,
+                limit=limit,
+                offset=offset,
+            )
+        )
+        if _debug():
+            logging.debug(f"photos: found {len(photoinfo)} photos")
+        return photoinfo
+
+    def iter_photos(
+        self,
+        keywords=None,
+        uuid=None,
+        persons=None,
+        albums=None,
+        images=True,
+        movies=False,
+        from_date=None,
+        to_date=None,
+        from_modified_date=None,
+        to_modified_date=None,
+        favorite=None,
+        hidden=None,
+        ismissing=None,
+        hasadjustments=None,
+        external_edit=None,
+        shared=None,
+        burst=None,
+        live_photo=None,
+        iscloudasset=None,
+        incloud=None,
+        text=None,
+        where=None,
+        near=None,
+        bbox=None,
+        sort_by=None,
+        descending=False,
+        limit=None,
+        offset=0,
+    ):
+        """ 
+        Generator that yields a PhotoInfo object for each photo matching the args,
+        which are the same as for photos()
+        Each PhotoInfo is created only when it's yielded so memory use doesn't grow
+        with the number of photos if the caller doesn't keep them; with limit, only
+        the PhotoInfo objects for the requested photos are created
+        """
+        for uuid_ in self._query_uuids(
+            keywords=keywords,
+            uuid=uuid,
+            persons=persons,
+            albums=albums,
+            images=images,
+            movies=movies,
+            from_date=from_date,
+            to_date=to_date,
+            from_modified_date=from_modified_date,
+            to_modified_date=to_modified_date,
+            favorite=favorite,
+            hidden=hidden,
+            ismissing=ismissing,
+            hasadjustments=hasadjustments,
+            external_edit=external_edit,
+            shared=shared,
+            burst=burst,
+            live_photo=live_photo,
+            iscloudasset=iscloudasset,
+            incloud=incloud,
+            text=text,
+            where=where,
+            near=near,
+            bbox=bbox,
+            sort_by=sort_by,
+            descending=descending,
+            limit=limit,
+            offset=offset,
+        ):
+            yield self._photoinfos.get(uuid_)
+
+    def _query_uuids(
+        self, sort_by=None, descending=False, limit=None, offset=0, cache=True, **kwargs
+    ):
+        """ generator that yields the uuid of each photo matching the args to photos(),
+            sorted and paged if sort_by, limit, or offset are given
+            cache: if False, the query cache isn't used """
+        _check_page(sort_by, limit, offset)
+        (key, args) = self._photo_args(**kwargs)
+        if cache:
+            uuids = self._cached_photo_uuids(key, *args)
+        else:
+            uuids = self._photo_uuids(*args)
+
+        end = offset + limit if limit is not None else None
+        if sort_by is not None:
+            # only the first end photos in sorted order are needed
+            uuids = self._sorted_uuids(list(uuids), sort_by, descending, end)
+        yield from itertools.islice(uuids, offset, end)
+
+    def _photo_args(
+        self,
+        keywords=None,
+        uuid=None,
+        persons=None,
+        albums=None,
+        images=True,
+        movies=False,
+        from_date=None,
+        to_date=None,
+        from_modified_date=None,
+        to_modified_date=None,
+        favorite=None,
+        hidden=None,
+        ismissing=None,
+        hasadjustments=None,
+        external_edit=None,
+        shared=None,
+        burst=None,
+        live_photo=None,
+        iscloudasset=None,
+        incloud=None,
+        text=None,
+        where=None,
+        near=None,
+        bbox=None,
+    ):
+        """ returns (key, args): the query cache key and the _photo_uuids args
+            for the args to photos() other than sort_by, descending, limit, and offset """
+        flags = {
+            "favorite": favorite,
+            "hidden": hidden,
+            "ismissing": ismissing,
+            "hasadjustments": hasadjustments,
+            "external_edit": external_edit,
+            "shared": shared,
+            "burst": burst,
+            "live_photo": live_photo,
+            "iscloudasset": iscloudasset,
+            "incloud": incloud,
+        }
+        flags = {name: bool(value) for name, value in flags.items() if value is not None}
+        plan = _QueryPlan(where) if where is not None else None
+
+        key = _query_key(
+            keywords,
+            uuid,
+            persons,
+            albums,
+            images,
+            movies,
+            from_date,
+            to_date,
+            from_modified_date,
+            to_modified_date,
+            flags,
+            text,
+            where,
+            near,
+            bbox,
+        )
+        args = (
+            keywords,
+            uuid,
+            persons,
+            albums,
+            images,
+            movies,
+            from_date,
+            to_date,
+            from_modified_date,
+            to_modified_date,
+            flags,
+            text,
+            plan,
+            near,
+            bbox,
+        )
+        return (key, args)
+
+    def count(self, sort_by=None, descending=False, limit=None, offset=0, **kwargs):
+        """ 
+        Return the number of photos photos() returns with the same args (e.g. favorite=True)
+        without creating a PhotoInfo object for each photo
+        The photos are counted from the indexes without listing them or using the query cache
+        """
+        _check_page(sort_by, limit, offset)
+        (_, args) = self._photo_args(**kwargs)
+        count = max(self._count_photos(*args) - offset, 0)
+        return count if limit is None else min(count, limit)
+
+    def count_by(self, group_by, **kwargs):
+        """
+        Return dict of value: number of photos for the photos photos() returns with the same
+        args (kwargs), grouped by group_by, without creating a PhotoInfo object for each photo
+        group_by: one of
+            year, month: year (int) or "YYYY-MM" the photo was taken, in the photo's time zone;
+            in ascending order
+            type: "photo" or "movie"
+            uti: uniform type identifier, e.g. "public.jpeg"
+            keyword, person, album: a photo is counted once for each of its keywords, etc.
+            and photos without any aren't counted
+            a flag, e.g. favorite, hidden, shared: True or False
+        Except for year and month, the dict is in descending order of number of photos
+        Raises ValueError if group_by isn't valid
+        """
+        if group_by not in _COUNT_BY_FIELDS and group_by not in _PHOTO_FLAGS:
+            valid = ", ".join(_COUNT_BY_FIELDS + tuple(_PHOTO_FLAGS))
+            raise ValueError(f"group_by must be one of {valid}: {group_by}", group_by)
+
+        counts = {}
+        # the uuids are only read once so aren't added to the query cache
+        for uuid_ in self._query_uuids(cache=False, **kwargs):
+            for value in self._group_values(group_by, uuid_):
+                counts[value] = counts.get(value, 0) + 1
+
+        if group_by in ("year", "month"):
+            # photos without a date last
+            return dict(
+                sorted(counts.items(), key=lambda kv: (kv[0] is None, kv[0] or 0))
+            )
+        return dict(sorted(counts.items(), key=lambda kv: kv[1], reverse=True))
+
+    def _group_values(self, group_by, uuid):
+        """ returns list of the values of group_by (see count_by) for the photo with uuid """
+        info = self._dbphotos[uuid]
+        if group_by in ("year", "month"):
+            if info.imageDateSeconds is None:
+                return [None]
+            date = time.gmtime(
+                info.imageDateSeconds
+                + _PHOTOS_EPOCH
+                + (info.imageTimeZoneOffsetSeconds or 0)
+            )
+            if group_by == "year":
+                return [date.tm_year]
+            return [f"{date.tm_year:04d}-{date.tm_mon:02d}"]
+        if group_by == "type":
+            return ["movie" if info.type == _MOVIE_TYPE else "photo"]
+        if group_by == "uti":
+            return [info.UTI]
+        asset_id = self._asset_ids[uuid]
+        if group_by == "keyword":
+            return self._dbkeywords.labels_for(asset_id)
+        if group_by == "person":
+            return self._dbfaces.labels_for(asset_id)
+        if group_by == "album":
+            titles = set()
+            for album_id in self._dbalbums.labels_for(asset_id):
+                details = self._dbalbum_details.get(album_id)
+                if details is not None:
+                    titles.add(details["title"])
+            return list(titles)
+        (fields, flag) = _PHOTO_FLAGS[group_by]
+        return [bool(flag(*[getattr(info, field, None) for field in fields]))]
+
+    def _cached_photo_uuids(self, key, *args):
+        """ generator that yields the uuids from _photo_uuids(*args), from the query cache
+            if key is in it; otherwise the uuids are added to the cache with key
+            if the caller reads all of them """
+        cached = self._query_cache.get(key)
+        if cached is not None:
+            yield from cached
+            return
+
+        generation = self._query_cache.generation
+        found = [] if self._query_cache.maxsize else None
+        for uuid_ in self._photo_uuids(*args):
+            if found is not None:
+                found.append(uuid_)
+            yield uuid_
+        if found is not None:
+            self._query_cache.put(key, tuple(found), generation)
+
+    def _sorted_uuids(self, uuids, sort_by, descending, count=None):
+        """ returns list of uuids sorted by sort_by (see _SORT_FIELDS), photos without
+            a value last and photos with the same value in asset id order (reversed if
+            descending), the same order as the date indexes
+            count: if not None, only the first count uuids are returned
+            For the dates, if the matching photos are a large part of the library, the
+            sorted date index is read in order until count photos are found; otherwise
+            a heap keeps the count first photos so the uuids are never all sorted """
+        index = {"date": self._dates, "modified_date": self._modified_dates}.get(sort_by)
+        if (
+            count is not None
+            and index is not None
+            and count * len(index) <= len(uuids) * len(uuids)
+        ):
+            # about count * len(index) / len(uuids) photos are read from the index
+            asset_ids = {self._asset_ids[u] for u in uuids}
+            ordered = index.asset_ids()
+            found = []
+            for asset_id in reversed(ordered) if descending else ordered:
+                if len(found) == count:
+                    return found
+                if asset_id in asset_ids:
+                    found.append(self._asset_uuids[asset_id])
+            # photos without the date, which aren't in the index
+            dated = set(found)
+            undated = sorted(
+                (u for u in uuids if u not in dated),
+                key=lambda u: self._asset_ids[u],
+                reverse=descending,
+            )
+            found.extend(undated[: count - len(found)])
+            return found
+
+        (field, fold) = _SORT_FIELDS[sort_by]
+
+        def sort_key(uuid):
+            value = uuid if field is None else getattr(self._dbphotos[uuid], field)
+            if value is not None and fold:
+                value = value.casefold()
+            # photos without a value come last in either order
+            if descending:
+                return (value is not None, value, self._asset_ids[uuid])
+            return (value is None, value, self._asset_ids[uuid])
+
+        if count is None:
+            return sorted(uuids, key=sort_key, reverse=descending)
+        if descending:
+            return heapq.nlargest(count, uuids, key=sort_key)
+        return heapq.nsmallest(count, uuids, key=sort_key)
+
+    def query_cache_info(self):
+        """ returns QueryCacheInfo(hits, misses, maxsize, currsize) with the statistics
+            of the cache of photos() results, like functools.lru_cache's cache_info() """
+        return self._query_cache.info()
+
+    def query_cache_clear(self):
+        """ drop all the cached photos() results; the statistics are kept """
+        self._query_cache.clear()
+
+    def _photo_uuids(
+        self,
+        keywords,
+        uuid,
+        persons,
+        albums,
+        images,
+        movies,
+        from_date,
+        to_date,
+        from_modified_date,
+        to_modified_date,
+        flags,
+        text,
+        plan,
+        near,
+        bbox,
+    ):
+        """ generator that yields the uuid of each photo matching the args to photos()
+            flags: dict of flag name: True or False for the flag args to photos()
+            plan: _QueryPlan of the where arg to photos() or None """
+        selection = self._photo_sets(
+            keywords,
+            uuid,
+            persons,
+            albums,
+            from_date,
+            to_date,
+            from_modified_date,
+            to_modified_date,
+            flags,
+            text,
+            plan,
+            near,
+            bbox,
+        )
+        if selection is None:
+            return
+
+        if self._columns is not None:
+            # filter for images/movies and non-selected burst photos with vectorized masks
+            for asset_id in self._columns.select(
+                self._photo_mask(images, movies, *selection)
+            ):
+                yield self._asset_uuids[asset_id]
+            return
+
+        (flag_bits, dates, photos_sets) = selection
+        photos_sets = photos_sets + [set(asset_ids) for asset_ids in dates]
+        for asset_ids in dates:
+            logging.debug(f"Found {len(asset_ids)} items in date range")
+        if flag_bits is not None:
+            photos_sets.append(set(self._flags.asset_ids(flag_bits)))
+        if not photos_sets:
             # return all the photos, filtering for images and movies
-            # append keys of all photos as a single set to photos_sets
-            photos_sets.append(set(self._dbphotos.keys()))
+            photos_sets.append({self._asset_ids[u] for u in self._dbphotos})
+
+        # photos_sets are sets of asset ids, translated back to uuids for the results
+        # get the intersection of each argument/search criteria, in asset id order
+        # (the order _columns.select returns them in) as set order isn't defined
+        if _debug():
+            logging.debug(f"Got photo_sets of sizes {[len(s) for s in photos_sets]}")
+        for asset_id in sorted(set.intersection(*photos_sets)):
+            p = self._asset_uuids[asset_id]
+            if p not in self._dbphotos:
+                # e.g. keyword of a photo in the trash
+                continue
+
+            # filter for non-selected burst photos
+            if self._dbphotos[p]["burst"] and not self._dbphotos[p]["burst_key"]:
+                # not a key/selected burst photo, don't include in returned results
+                continue
+
+            # filter for images and/or movies
+            if (images and self._dbphotos[p]["type"] == _PHOTO_TYPE) or (
+                movies and self._dbphotos[p]["type"] == _MOVIE_TYPE
+            ):
+                yield p
+
+    def _count_photos(
+        self,
+        keywords,
+        uuid,
+        persons,
+        albums,
+        images,
+        movies,
+        from_date,
+        to_date,
+        from_modified_date,
+        to_modified_date,
+        flags,
+        text,
+        plan,
+        near,
+        bbox,
+    ):
+        """ returns the number of photos _photo_uuids yields for the same args
+            without listing them: the flags, images/movies, and burst photos are a single
+            bitset that's counted on its own or for the photos in the intersection of the
+            keyword, etc. sets or in the date range """
+        selection = self._photo_sets(
+            keywords,
+            uuid,
+            persons,
+            albums,
+            from_date,
+            to_date,
+            from_modified_date,
+            to_modified_date,
+            flags,
+            text,
+            plan,
+            near,
+            bbox,
+        )
+        if selection is None:
+            return 0
+
+        if self._columns is not None:
+            return int(self._photo_mask(images, movies, *selection).sum())
+
+        (flag_bits, dates, photos_sets) = selection
+        bits = self._flags.photos_bits(images, movies)
+        if flag_bits is not None:
+            bits &= flag_bits
+        candidates = photos_sets + list(dates)
+        if not candidates:
+            return self._flags.count(bits)
+        if len(candidates) == 1:
+            # e.g. the slice of a date index, counted without making it a set
+            return self._flags.count(bits, candidates[0])
+        candidates.sort(key=len)
+        return self._flags.count(bits, set(candidates[0]).intersection(*candidates[1:]))
+
+    def _photo_mask(self, images, movies, flag_bits, dates, photos_sets):
+        """ returns boolean array of the column store that's True for each photo
+            matching the selection from _photo_sets """
+        mask = self._columns.photos_mask(images, movies)
+        for asset_ids in dates:
+            mask &= self._columns.ids_mask(asset_ids)
+        if flag_bits is not None:
+            mask &= self._columns.bits_mask(flag_bits)
+        if photos_sets:
+            mask &= self._columns.ids_mask(set.intersection(*photos_sets))
+        return mask
+
+    def _photo_sets(
+        self,
+        keywords,
+        uuid,
+        persons,
+        albums,
+        from_date,
+        to_date,
+        from_modified_date,
+        to_modified_date,
+        flags,
+        text,
+        plan,
+        near,
+        bbox,
+    ):
+        """ returns (flag_bits, dates, photos_sets) selecting the photos that match the args
+            to photos() other than images and movies, or None if no photo matches
+            flag_bits: bitset of the photos with each of the flags, None if no flags
+            dates: list of arrays of the asset ids of the photos in each date range
+            photos_sets: list of sets of asset ids of the photos with each keyword, etc.
+            a photo matches if it's in flag_bits and in every one of dates and photos_sets """
+        # photos with each of the flags, None if no flags so all photos are considered
+        flag_bits = self._flags.bits(flags) if flags else None
+
+        # asset ids of the photos in each date range, found by binary search of the date indexes
+        # dates are compared as seconds since the Photos epoch, the way they're stored
+        # naive datetimes are taken to be local time; timezone aware ones work too
+        def seconds(date):
+            return date.timestamp() - _PHOTOS_EPOCH if date else None
+
+        dates = [
+            index.asset_ids(seconds(start), seconds(end))
+            for (index, start, end) in [
+                (self._dates, from_date, to_date),
+                (self._modified_dates, from_modified_date, to_modified_date),
+            ]
+            if start or end
+        ]
+
+        if not any([keywords, uuid, persons, albums, text, plan, near, bbox]):
+            return (flag_bits, dates, [])
+
+        photos_sets = []  # list of photo sets to perform intersection of
+        if albums:
+            for album in albums:
+                # TODO: can have >1 album with same name. This globs them together.
+                # Need a way to select with album?
+                album_ids = self._album_titles.album_ids(album)
+                if album_ids:
+                    album_set = set()
+                    for album_id in album_ids:
+                        album_set.update(self._dbalbums.asset_ids(album_id))
+                    photos_sets.append(album_set)
+                else:
+                    logging.debug(f"Could not find album '{album}' in database")
+
+        if uuid:
+            for u in uuid:
+                if u in self._dbphotos:
+                    photos_sets.append(set([self._asset_ids[u]]))
+                else:
+                    logging.debug(f"Could not find uuid '{u}' in database")
+
+        if keywords:
+            for keyword in keywords:
+                if keyword in self._dbkeywords:
+                    photos_sets.append(set(self._dbkeywords.asset_ids(keyword)))
+                else:
+                    logging.debug(f"Could not find keyword '{keyword}' in database")
+
+        if persons:
+            for person in persons:
+                if person in self._dbfaces:
+                    photos_sets.append(set(self._dbfaces.asset_ids(person)))
+                else:
+                    logging.debug(f"Could not find person '{person}' in database")
+
+        if text:
+            # unlike a missing keyword, etc., text that isn't found matches no photos
+            text_set = self._text.search(text, self._photo_texts)
+            if not text_set:
+                logging.debug(f"Could not find text '{text}' in database")
+            photos_sets.append(text_set)
+
+        # photos found by location, from the grid of the photos by location
+        # like text, a location with no photos matches no photos
+        if near:
+            photos_sets.append(set(self._locations.near_asset_ids(*near)))
+        if bbox:
+            photos_sets.append(self._locations.bbox_asset_ids(*bbox))
+
+        if plan:
+            photos_sets.append(
+                plan.asset_ids(
+                    self._where_asset_ids,
+                    lambda flags: self._flags.asset_ids(self._flags.bits(flags)),
+                    lambda: set(self._flags.asset_ids(self._flags.all)),
+                )
+            )
+
+        if not photos_sets and not dates:
+            # none of the keywords, etc. were found and there's no date range
+            return None
+        return (flag_bits, dates, photos_sets)
+
+    def _where_asset_ids(self, field, value):
+        """ returns the asset ids of the photos matching field:value in a query expression """
+        if field == "keyword":
+            return self._dbkeywords.asset_ids(value)
+        if field == "person":
+            return self._dbfaces.asset_ids(value)
+        if field == "album":
+            asset_ids = set()
+            for album_id in self._album_titles.album_ids(value):
+                asset_ids.update(self._dbalbums.asset_ids(album_id))
+            return asset_ids
+        if field == "uuid":
+            return [self._asset_ids[value]] if value in self._dbphotos else []
+        return self._text.search(value, self._photo_texts)
+
+    def query(self, expr, **kwargs):
+        """
+        Return a list of PhotoInfo objects for the photos matching the boolean query
+        expression expr, e.g. keyword:Kids AND (person:Katie OR album:"Pumpkin Farm") AND NOT hidden
+        Terms are field:value (fields keyword, person, album, uuid, text; quote values with
+        spaces) or a flag name (favorite, hidden, missing, edited, shared, burst, live, ...);
+        terms are combined with AND, OR, NOT and parentheses; terms next to each other are ANDed
+        Raises ValueError if expr isn't a valid expression
+        kwargs: any of the other args to photos(), e.g. movies=True
+        """
+        return self.photos(where=expr, **kwargs)
+
+    def photos_near(self, latitude, longitude, radius, **kwargs):
+        """
+        Return a list of PhotoInfo objects for the photos within radius km of the point
+        latitude, longitude (in degrees), nearest first unless sort_by is given;
+        limit and offset apply to the photos in that order
+        Raises ValueError if latitude, longitude, or radius isn't valid
+        kwargs: any of the other args to photos(), e.g. movies=True
+        """
+        near = (latitude, longitude, radius)
+        if kwargs.get("sort_by") is not None:
+            return self.photos(near=near, **kwargs)
+
+        limit = kwargs.pop("limit", None)
+        offset = kwargs.pop("offset", 0)
+        _check_page(None, limit, offset)
+
+        def distance(uuid):
+            # ties are in asset id order, the order photos() returns them in
+            info = self._dbphotos[uuid]
+            return (
+                _distance_km(latitude, longitude, info["latitude"], info["longitude"]),
+                self._asset_ids[uuid],
+            )
+
+        # with a limit only the nearest offset + limit photos are kept and given a PhotoInfo
+        uuids = self._query_uuids(near=near, **kwargs)
+        if limit is None:
+            uuids = sorted(uuids, key=distance)
         else:
-            if albums:
-                album_titles = {}
-                for album_id in self._dbalbum_details:
-                    title = self._dbalbum_details[album_id]["title"]
-                    if title in album_titles:
-                        album_titles[title].append(album_id)
-                    else:
-                        album_titles[title] = [album_id]
-                for album in albums:
-                    # TODO: can have >1 album with same name. This globs them together.
-                    # Need a way to select with album?
-                    if album in album_titles:
-                        album_set = set()
-                        for album_id in album_titles[album]:
-                            album_set.update(self._dbalbums_album[album_id])
-                        photos_sets.append(album_set)
-                    else:
-                        logging.debug(f"Could not find album '{album}' in database")
+            uuids = heapq.nsmallest(offset + limit, uuids, key=distance)
+        return [self._photoinfos.get(uuid) for uuid in uuids[offset:]]
 
-            if uuid:
-                for u in uuid:
-                    if u in self._dbphotos:
-                        photos_sets.append(set([u]))
-                    else:
-                        logging.debug(f"Could not find uuid '{u}' in database")
+    def photos_in_bbox(
+        self, min_latitude, min_longitude, max_latitude, max_longitude, **kwargs
+    ):
+        """
+        Return a list of PhotoInfo objects for the photos inside the bounding box, in degrees;
+        if min_longitude > max_longitude, the box crosses the 180th meridian
+        Raises ValueError if the box isn't valid
+        kwargs: any of the other args to photos(), e.g. movies=True
+        """
+        return self.photos(
+            bbox=(min_latitude, min_longitude, max_latitude, max_longitude), **kwargs
+        )
 
-            if keywords:
-                for keyword in keywords:
-                    if keyword in self._dbkeywords_keyword:
-                        photos_sets.append(set(self._dbkeywords_keyword[keyword]))
-                    else:
-                        logging.debug(f"Could not find keyword '{keyword}' in database")
+    def search(self, text, **kwargs):
+        """
+        Return a list of PhotoInfo objects for the photos matching every term of text
+        in their title, description, keywords, persons or album titles, ignoring case
+        A term is a word, a prefix ending in * (e.g. pump*), or a "quoted phrase"
+        whose words must be next to each other in the same title, keyword, etc.
+        The words are looked up in an index so the photos aren't searched one by one
+        kwargs: any of the other args to photos(), e.g. movies=True
+        """
+        return self.photos(text=text, **kwargs)
 
-            if persons:
-                for person in persons:
-                    if person in self._dbfaces_person:
-                        photos_sets.append(set(self._dbfaces_person[person]))
-                    else:
-                        logging.debug(f"Could not find person '{person}' in database")
-            if from_date or to_date:
-                dsel = self._dbphotos
-                if from_date:
-                    dsel = {
-                        k: v for k, v in dsel.items() if v["imageDate"] >= from_date
-                    }
-                    logging.debug(
-                        f"Found %i items with from_date {from_date}" % len(dsel)
-                    )
-                if to_date:
-                    dsel = {k: v for k, v in dsel.items() if v["imageDate"] <= to_date}
-                    logging.debug(f"Found %i items with to_date {to_date}" % len(dsel))
-                photos_sets.append(set(dsel.keys()))
-
-        photoinfo = []
-        if photos_sets:  # found some photos
-            # get the intersection of each argument/search criteria
-            logging.debug(f"Got photo_sets: {photos_sets}")
-            for p in set.intersection(*photos_sets):
-                # filter for non-selected burst photos
-                if self._dbphotos[p]["burst"] and not self._dbphotos[p]["burst_key"]:
-                    # not a key/selected burst photo, don't include in returned results
-                    continue
+    def get_photo(self, uuid):
+        """
+        Return the PhotoInfo object for the photo with uuid, or None if there's no such photo
+        Used to keep a list of uuids (e.g. the results of a query) instead of PhotoInfo objects
+        """
+        if uuid not in self._dbphotos:
+            return None
+        return self._photoinfos.get(uuid)
 
-                # filter for images and/or movies
-                if (images and self._dbphotos[p]["type"] == _PHOTO_TYPE) or (
-                    movies and self._dbphotos[p]["type"] == _MOVIE_TYPE
-                ):
-                    info = PhotoInfo(db=self, uuid=p, info=self._dbphotos[p])
-                    photoinfo.append(info)
-        logging.debug(f"photoinfo: {pformat(photoinfo)}")
-        return photoinfo
+    def bursts(self, photos=None):
+        """
+        Return dict of burst uuid: list of PhotoInfo objects for all the photos in the burst
+        set, including the ones photos() doesn't return; the selected key photos are first,
+        then the others in date order
+        photos: if given, only the burst sets of these PhotoInfo objects (e.g. results of
+        photos()), in the order they first appear; otherwise all the burst sets in the library
+        """
+        if photos is None:
+            burst_uuids = self._bursts
+        else:
+            burst_uuids = dict.fromkeys(p._info["burstUUID"] for p in photos if p.burst)
+        return {
+            burst_uuid: [self._photoinfos.get(u) for u in self._bursts.members(burst_uuid)]
+            for burst_uuid in burst_uuids
+        }
+
+    def union(self, *photo_lists):
+        """
+        Return a list of the PhotoInfo objects in any of photo_lists (e.g. results of
+        photos()), each photo once, in the order they first appear
+        """
+        seen = set()
+        photos = []
+        for photo in itertools.chain.from_iterable(photo_lists):
+            if photo not in seen:
+                seen.add(photo)
+                photos.append(photo)
+        return photos
+
+    def difference(self, photos, *photo_lists):
+        """
+        Return a list of the PhotoInfo objects in photos that aren't in any of photo_lists,
+        in the order of photos, e.g. difference(photos(persons=["Katie"]), photos(keywords=["wedding"]))
+        PhotoInfo objects are hashable so this is a set lookup per photo instead of a list scan
+        """
+        exclude = set(itertools.chain.from_iterable(photo_lists))
+        return [photo for photo in photos if photo not in exclude]
 
     def __repr__(self):
         return f"osxphotos.{self.__class__.__name__}(dbfile='{self.db_path}')"
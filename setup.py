@@ -62,5 +62,6 @@ setup(
         "Topic :: Software Development :: Libraries :: Python Modules",
     ],
     install_requires=["pyobjc>=6.0.1", "Click>=7", "PyYAML>=5.1.2"],
+    extras_require={"numpy": ["numpy>=1.17"], "orjson": ["orjson>=3.0"]},
     entry_points={"console_scripts": ["osxphotos=osxphotos.__main__:cli"]},
 )
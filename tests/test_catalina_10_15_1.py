@@ -1,3 +1,5 @@
+import pickle
+
 import pytest
 
 from osxphotos._constants import _UNKNOWN_PERSON
@@ -124,6 +126,551 @@ def test_db_version():
     assert photosdb.db_version == "6000"
 
 
+def test_db_open_mode():
+    # by default the database is copied; with copy_db=False, Photos.sqlite has a
+    # write-ahead log so is read in place as read-only, even if immutable is requested
+    # (on a copy of the library as reading in place updates the -shm file)
+    import pathlib
+    import shutil
+    import tempfile
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(dbfile=PHOTOS_DB)
+    assert photosdb.db_open_mode == "copy"
+
+    tempdir = tempfile.TemporaryDirectory(prefix="osxphotos_")
+    library = pathlib.Path(tempdir.name) / "Test.photoslibrary"
+    shutil.copytree(pathlib.Path(PHOTOS_DB).parent, library / "database")
+    for immutable in [False, True]:
+        photosdb2 = osxphotos.PhotosDB(library, copy_db=False, immutable=immutable)
+        assert photosdb2.db_open_mode == "readonly"
+        assert len(photosdb2.photos()) == len(photosdb.photos())
+
+
+def test_db_open_mode_fallback(monkeypatch):
+    # a library that's locked or changes while it's read in place is read again from a copy
+    import pathlib
+    import shutil
+    import sqlite3
+    import tempfile
+    import osxphotos
+
+    tempdir = tempfile.TemporaryDirectory(prefix="osxphotos_")
+    library = pathlib.Path(tempdir.name) / "Test.photoslibrary"
+    shutil.copytree(pathlib.Path(PHOTOS_DB).parent, library / "database")
+
+    load = osxphotos.PhotosDB._load_database
+
+    def load_locked(self, uuids=None):
+        if self._db_open_mode != "copy":
+            # part of the library is read before the database is found to be locked
+            load(self, uuids)
+            raise sqlite3.OperationalError("database is locked")
+        load(self, uuids)
+
+    monkeypatch.setattr(osxphotos.PhotosDB, "_load_database", load_locked)
+    photosdb = osxphotos.PhotosDB(library, copy_db=False)
+    assert photosdb.db_open_mode == "copy"
+
+    photosdb2 = osxphotos.PhotosDB(dbfile=PHOTOS_DB)
+    assert photosdb._dbphotos == photosdb2._dbphotos
+    assert photosdb.keywords_as_dict == photosdb2.keywords_as_dict
+
+
+def test_db_open_mode_copy():
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(dbfile=PHOTOS_DB, copy_db=True)
+    assert photosdb.db_open_mode == "copy"
+
+    photosdb2 = osxphotos.PhotosDB(dbfile=PHOTOS_DB)
+    assert len(photosdb.photos()) == len(photosdb2.photos())
+
+
+def test_snapshot_cache():
+    import tempfile
+    import osxphotos
+
+    tempdir = tempfile.TemporaryDirectory(prefix="osxphotos_")
+    photosdb = osxphotos.PhotosDB(
+        dbfile=PHOTOS_DB, use_cache=True, cache_dir=tempdir.name
+    )
+    assert photosdb.db_open_mode == "copy"
+
+    # second open should be restored from the snapshot
+    photosdb2 = osxphotos.PhotosDB(
+        dbfile=PHOTOS_DB, use_cache=True, cache_dir=tempdir.name
+    )
+    assert photosdb2.db_open_mode == "snapshot"
+    assert photosdb2.db_version == photosdb.db_version
+    assert photosdb2.library_path == photosdb.library_path
+    assert photosdb2.keywords_as_dict == photosdb.keywords_as_dict
+    assert photosdb2.albums_as_dict == photosdb.albums_as_dict
+
+    photos = {p.uuid: p.json() for p in photosdb.photos(movies=True)}
+    photos2 = {p.uuid: p.json() for p in photosdb2.photos(movies=True)}
+    assert photos == photos2
+
+
+@pytest.mark.parametrize(
+    "error", [pickle.PicklingError("can't pickle"), RecursionError(), OSError("disk full")]
+)
+def test_snapshot_cache_save_error(monkeypatch, error):
+    # a snapshot that can't be saved is skipped and leaves no temp file behind
+    import os
+    import tempfile
+    import osxphotos
+
+    def dump(*args, **kwargs):
+        raise error
+
+    tempdir = tempfile.TemporaryDirectory(prefix="osxphotos_")
+    monkeypatch.setattr(osxphotos.photosdb.pickle, "dump", dump)
+    photosdb = osxphotos.PhotosDB(
+        dbfile=PHOTOS_DB, use_cache=True, cache_dir=tempdir.name
+    )
+    assert photosdb.db_open_mode == "copy"
+    assert photosdb.photos()
+    assert os.listdir(tempdir.name) == []
+
+
+def test_snapshot_cache_changed():
+    # snapshot is not used if the database has changed
+    import os
+    import pathlib
+    import shutil
+    import tempfile
+    import osxphotos
+
+    tempdir = tempfile.TemporaryDirectory(prefix="osxphotos_")
+    library = pathlib.Path(tempdir.name) / "Test.photoslibrary"
+    shutil.copytree(pathlib.Path(PHOTOS_DB).parent, library / "database")
+    cache_dir = pathlib.Path(tempdir.name) / "cache"
+
+    osxphotos.PhotosDB(library, use_cache=True, cache_dir=cache_dir)
+    photosdb = osxphotos.PhotosDB(library, use_cache=True, cache_dir=cache_dir)
+    assert photosdb.db_open_mode == "snapshot"
+
+    wal = library / "database" / "Photos.sqlite-wal"
+    os.utime(wal, ns=(wal.stat().st_atime_ns, wal.stat().st_mtime_ns + 1000000000))
+    photosdb = osxphotos.PhotosDB(library, use_cache=True, cache_dir=cache_dir)
+    assert photosdb.db_open_mode == "copy"
+
+
+def test_loader_joined():
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(dbfile=PHOTOS_DB)
+    photosdb2 = osxphotos.PhotosDB(dbfile=PHOTOS_DB, loader="joined")
+
+    photos = {p.uuid: p.json() for p in photosdb.photos(movies=True)}
+    photos2 = {p.uuid: p.json() for p in photosdb2.photos(movies=True)}
+    assert photos == photos2
+    assert photosdb.keywords_as_dict == photosdb2.keywords_as_dict
+    assert photosdb.persons_as_dict == photosdb2.persons_as_dict
+    assert photosdb.albums_as_dict == photosdb2.albums_as_dict
+
+    uuids = {p.uuid for p in photosdb.photos(keywords=["Kids"], persons=["Katie"])}
+    uuids2 = {p.uuid for p in photosdb2.photos(keywords=["Kids"], persons=["Katie"])}
+    assert uuids == uuids2
+
+    # photos are returned in the same order whichever loader is used
+    assert photosdb._asset_uuids == photosdb2._asset_uuids
+    assert [p.uuid for p in photosdb.photos(movies=True)] == [
+        p.uuid for p in photosdb2.photos(movies=True)
+    ]
+    assert [p.uuid for p in photosdb.iter_photos(keywords=["Kids"])] == [
+        p.uuid for p in photosdb2.iter_photos(keywords=["Kids"])
+    ]
+
+
+def test_loader_parallel():
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(dbfile=PHOTOS_DB)
+    photosdb2 = osxphotos.PhotosDB(dbfile=PHOTOS_DB, loader="parallel")
+
+    assert photosdb._dbphotos == photosdb2._dbphotos
+    assert [p.uuid for p in photosdb.photos(movies=True)] == [
+        p.uuid for p in photosdb2.photos(movies=True)
+    ]
+    assert photosdb.keywords_as_dict == photosdb2.keywords_as_dict
+    assert photosdb.persons_as_dict == photosdb2.persons_as_dict
+    assert photosdb.albums_as_dict == photosdb2.albums_as_dict
+
+
+@pytest.mark.parametrize("loader", ["sequential", "joined", "parallel"])
+def test_loader_error_closes(monkeypatch, loader):
+    # the loader's connections and thread pool are closed if reading the library fails
+    import osxphotos
+    from osxphotos.photosdb import _LoaderQueries
+
+    opened = []
+    init = _LoaderQueries.__init__
+
+    def record_init(self, *args, **kwargs):
+        init(self, *args, **kwargs)
+        opened.append(self)
+
+    def fail(self, *args, **kwargs):
+        raise RuntimeError("failed")
+
+    monkeypatch.setattr(_LoaderQueries, "__init__", record_init)
+    monkeypatch.setattr(osxphotos.PhotosDB, "_process_album_details5", fail)
+    with pytest.raises(RuntimeError):
+        osxphotos.PhotosDB(dbfile=PHOTOS_DB, loader=loader)
+    assert opened
+    for results in opened:
+        assert results._conn is None
+        assert results._executor is None
+
+
+def test_photo_record():
+    # photo info is held in a read-only mapping that behaves like the dict used previously
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(dbfile=PHOTOS_DB)
+    photo = photosdb.photos(uuid=[UUID_DICT["favorite"]])[0]
+    info = photo._info
+
+    assert not hasattr(info, "__dict__")
+    assert info["_uuid"] == UUID_DICT["favorite"]
+    assert info.get("mainRating") is None
+    assert "mainRating" not in info
+    assert "favorite" in info
+    assert dict(info) == {key: info[key] for key in info}
+    with pytest.raises(KeyError):
+        info["foo"]
+    with pytest.raises(TypeError):
+        info["favorite"] = False
+
+
+def test_photos_columns():
+    # photos() returns the same photos with or without the NumPy column store
+    import datetime
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(dbfile=PHOTOS_DB)
+    if photosdb._columns is None:
+        pytest.skip("NumPy not installed")
+    columns = photosdb._columns
+    date = datetime.datetime(2018, 10, 28)
+    for kwargs in [
+        {},
+        {"movies": True},
+        {"images": False, "movies": True},
+        {"from_date": date},
+        {"to_date": date},
+        {"keywords": ["Kids"], "from_date": date},
+        {"keywords": ["not a keyword"], "from_date": date},
+        {"persons": ["Katie"], "keywords": ["foo"]},
+        {"uuid": [UUID_DICT["favorite"]]},
+    ]:
+        photosdb._columns = columns
+        uuids = sorted(p.uuid for p in photosdb.photos(**kwargs))
+        photosdb._columns = None
+        assert uuids == sorted(p.uuid for p in photosdb.photos(**kwargs))
+
+
+def test_photos_flags():
+    # flag args to photos() select the same photos as filtering on the PhotoInfo property
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(dbfile=PHOTOS_DB)
+    columns = photosdb._columns
+    photos = photosdb.photos(movies=True)
+    for flags in [
+        {"favorite": True},
+        {"favorite": False},
+        {"hasadjustments": True, "hidden": False},
+        {"external_edit": True},
+        {"ismissing": False, "shared": False, "burst": False},
+        {"live_photo": False, "iscloudasset": False, "incloud": False},
+        {"favorite": True, "hidden": True},
+    ]:
+        expected = sorted(
+            p.uuid
+            for p in photos
+            if all(bool(getattr(p, flag)) == value for flag, value in flags.items())
+        )
+        for store in [columns, None]:
+            photosdb._columns = store
+            assert (
+                sorted(p.uuid for p in photosdb.photos(movies=True, **flags))
+                == expected
+            )
+        photosdb._columns = columns
+
+    favorites = photosdb.photos(favorite=True)
+    assert [p.uuid for p in favorites] == [UUID_DICT["favorite"]]
+    assert photosdb.photos(keywords=["Kids"], favorite=True) == []
+    assert photosdb.photos(keywords=["not a keyword"], favorite=False) == []
+
+
+def test_iter_photos():
+    # iter_photos() yields the same photos as photos() one at a time
+    import datetime
+    import types
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(dbfile=PHOTOS_DB)
+    assert isinstance(photosdb.iter_photos(), types.GeneratorType)
+    for kwargs in [
+        {},
+        {"movies": True},
+        {"from_date": datetime.datetime(2018, 10, 28)},
+        {"keywords": ["Kids"], "persons": ["Katie"]},
+        {"keywords": ["not a keyword"]},
+    ]:
+        photos = photosdb.photos(**kwargs)
+        assert [p.uuid for p in photosdb.iter_photos(**kwargs)] == [
+            p.uuid for p in photos
+        ]
+
+
+def test_prefilter():
+    # only the photos matching the prefilter are read from the database
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(dbfile=PHOTOS_DB)
+    prefilter = {"keywords": ["Kids"], "favorite": False, "title": ["FOUND"]}
+    prefilter["ignore_case"] = True
+    photosdb2 = osxphotos.PhotosDB(dbfile=PHOTOS_DB, prefilter=prefilter)
+
+    expected = [
+        p.uuid
+        for p in photosdb.photos(keywords=["Kids"])
+        if not p.favorite and p.title and "found" in p.title.lower()
+    ]
+    assert expected
+    assert sorted(p.uuid for p in photosdb2.photos()) == sorted(expected)
+    assert len(photosdb2._dbphotos) < len(photosdb._dbphotos)
+    assert photosdb2.keywords_as_dict["Kids"] == len(expected)
+
+    # keywords, etc. not in the library are ignored, as in photos()
+    photosdb2 = osxphotos.PhotosDB(
+        dbfile=PHOTOS_DB, prefilter={"keywords": ["Kids", "not a keyword"]}
+    )
+    assert sorted(p.uuid for p in photosdb2.photos()) == sorted(
+        p.uuid for p in photosdb.photos(keywords=["Kids", "not a keyword"])
+    )
+
+    # with other filters, photos() returns photos even if no keyword, etc. is found
+    photosdb2 = osxphotos.PhotosDB(
+        dbfile=PHOTOS_DB,
+        prefilter={"keywords": ["not a keyword"], "other_filters": True},
+    )
+    expected = photosdb.photos(keywords=["not a keyword"], text="wedding")
+    assert expected
+    assert sorted(
+        p.uuid for p in photosdb2.photos(keywords=["not a keyword"], text="wedding")
+    ) == sorted(p.uuid for p in expected)
+    expected = photosdb.photos(keywords=["not a keyword"], where="favorite")
+    assert expected
+    assert sorted(
+        p.uuid for p in photosdb2.photos(keywords=["not a keyword"], where="favorite")
+    ) == sorted(p.uuid for p in expected)
+    for location in [{"near": (0, 0, 20000)}, {"bbox": (-90, -180, 90, 180)}]:
+        expected = photosdb.photos(keywords=["not a keyword"], **location)
+        assert expected
+        assert sorted(
+            p.uuid for p in photosdb2.photos(keywords=["not a keyword"], **location)
+        ) == sorted(p.uuid for p in expected)
+
+    with pytest.raises(ValueError):
+        osxphotos.PhotosDB(dbfile=PHOTOS_DB, prefilter={"not a filter": True})
+
+
+def test_asset_ids():
+    # keywords, persons, and albums are indexed by integer asset id
+    import datetime
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(dbfile=PHOTOS_DB)
+    for photo in photosdb.photos(movies=True):
+        asset_id = photosdb._asset_ids[photo.uuid]
+        assert photosdb._asset_uuids[asset_id] == photo.uuid
+        for keyword in photo.keywords:
+            assert asset_id in photosdb._dbkeywords.asset_ids(keyword)
+        for person in photo.persons:
+            assert asset_id in photosdb._dbfaces.asset_ids(person)
+
+    # photos are returned in asset id order whatever the query
+    for args in [
+        {"movies": True},
+        {"keywords": ["Kids"]},
+        {"persons": ["Katie", "Suzy"], "favorite": False},
+        {"albums": ["Pumpkin Farm"], "from_date": datetime.datetime(2018, 1, 1)},
+    ]:
+        asset_ids = [photosdb._asset_ids[p.uuid] for p in photosdb.photos(**args)]
+        assert asset_ids
+        assert asset_ids == sorted(asset_ids)
+
+    assert photosdb._dbkeywords.counts() == photosdb.keywords_as_dict
+    assert "Kids" in photosdb._dbkeywords
+    assert "foo" not in photosdb._dbkeywords
+
+
+def test_loader_invalid():
+    import osxphotos
+
+    with pytest.raises(ValueError):
+        osxphotos.PhotosDB(dbfile=PHOTOS_DB, loader="foo")
+
+
+def test_refresh_membership():
+    # refresh() finds photos added to or removed from an album or a person
+    # even if their modification date didn't change
+    import pathlib
+    import shutil
+    import sqlite3
+    import tempfile
+    import osxphotos
+
+    tempdir = tempfile.TemporaryDirectory(prefix="osxphotos_")
+    library = pathlib.Path(tempdir.name) / "Test.photoslibrary"
+    shutil.copytree(pathlib.Path(PHOTOS_DB).parent, library / "database")
+    photos_sqlite = library / "database" / "Photos.sqlite"
+
+    photosdb = osxphotos.PhotosDB(library)
+    album_photo = photosdb.photos(albums=["Pumpkin Farm"])[0].uuid
+    person_photo = photosdb.photos(persons=["Katie"])[0].uuid
+
+    conn = sqlite3.connect(photos_sqlite)
+    for (trigger,) in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger'"
+    ).fetchall():
+        conn.execute(f'DROP TRIGGER "{trigger}"')
+    conn.execute(
+        "DELETE FROM Z_26ASSETS WHERE Z_34ASSETS = "
+        "(SELECT Z_PK FROM ZGENERICASSET WHERE ZUUID = ?)",
+        (album_photo,),
+    )
+    conn.execute(
+        "UPDATE ZDETECTEDFACE SET ZPERSON = NULL WHERE ZASSET = "
+        "(SELECT Z_PK FROM ZGENERICASSET WHERE ZUUID = ?)",
+        (person_photo,),
+    )
+    conn.commit()
+    conn.close()
+
+    changes = photosdb.refresh()
+    assert sorted(changes["updated"]) == sorted({album_photo, person_photo})
+    assert changes["added"] == changes["removed"] == []
+    assert album_photo not in [p.uuid for p in photosdb.photos(albums=["Pumpkin Farm"])]
+    assert person_photo not in [p.uuid for p in photosdb.photos(persons=["Katie"])]
+
+    photosdb2 = osxphotos.PhotosDB(library)
+    assert photosdb.persons_as_dict == photosdb2.persons_as_dict
+    assert photosdb.albums_as_dict == photosdb2.albums_as_dict
+    assert photosdb.keywords_as_dict == photosdb2.keywords_as_dict
+    assert photosdb.refresh() == {"added": [], "updated": [], "removed": []}
+
+
+def test_refresh_fallback(monkeypatch):
+    # if reading the changes in place fails, the library is read again from a copy
+    # and the changes are found by comparing with what was read before
+    import pathlib
+    import shutil
+    import sqlite3
+    import tempfile
+    import osxphotos
+
+    tempdir = tempfile.TemporaryDirectory(prefix="osxphotos_")
+    library = pathlib.Path(tempdir.name) / "Test.photoslibrary"
+    shutil.copytree(pathlib.Path(PHOTOS_DB).parent, library / "database")
+    photos_sqlite = library / "database" / "Photos.sqlite"
+    removed = "DC99FBDD-7A52-4100-A5BB-344131646C30"
+
+    photosdb = osxphotos.PhotosDB(library, copy_db=False)
+    assert photosdb.db_open_mode == "readonly"
+
+    conn = sqlite3.connect(photos_sqlite)
+    for (trigger,) in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger'"
+    ).fetchall():
+        conn.execute(f'DROP TRIGGER "{trigger}"')
+    conn.execute(
+        "UPDATE ZGENERICASSET SET ZTRASHEDSTATE = 1 WHERE ZUUID = ?", (removed,)
+    )
+    conn.commit()
+    conn.close()
+
+    load = osxphotos.PhotosDB._load_database
+
+    def load_corrupt(self, uuids=None):
+        load(self, uuids)
+        if self._db_open_mode != "copy":
+            raise sqlite3.DatabaseError("database disk image is malformed")
+
+    monkeypatch.setattr(osxphotos.PhotosDB, "_load_database", load_corrupt)
+    changes = photosdb.refresh()
+    assert photosdb.db_open_mode == "copy"
+    assert changes == {"added": [], "updated": [], "removed": [removed]}
+    assert removed not in [p.uuid for p in photosdb.photos()]
+
+
+def test_refresh():
+    # refresh() re-reads only added, changed, or removed photos
+    import pathlib
+    import shutil
+    import sqlite3
+    import tempfile
+    import osxphotos
+
+    tempdir = tempfile.TemporaryDirectory(prefix="osxphotos_")
+    library = pathlib.Path(tempdir.name) / "Test.photoslibrary"
+    shutil.copytree(pathlib.Path(PHOTOS_DB).parent, library / "database")
+    photos_sqlite = library / "database" / "Photos.sqlite"
+
+    added = "D79B8D77-BFFC-460B-9312-034F2877D35B"
+    updated = "6191423D-8DB8-4D4C-92BE-9BBBA308AAC4"
+    removed = "DC99FBDD-7A52-4100-A5BB-344131646C30"
+
+    # the library's triggers call functions only Photos provides
+    conn = sqlite3.connect(photos_sqlite)
+    triggers = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger'"
+    ).fetchall()
+    for (trigger,) in triggers:
+        conn.execute(f'DROP TRIGGER "{trigger}"')
+    conn.execute("UPDATE ZGENERICASSET SET ZTRASHEDSTATE = 1 WHERE ZUUID = ?", (added,))
+    conn.commit()
+    conn.close()
+
+    photosdb = osxphotos.PhotosDB(library)
+    assert added not in [p.uuid for p in photosdb.photos()]
+    assert photosdb.refresh() == {"added": [], "updated": [], "removed": []}
+
+    conn = sqlite3.connect(photos_sqlite)
+    conn.execute("UPDATE ZGENERICASSET SET ZTRASHEDSTATE = 0 WHERE ZUUID = ?", (added,))
+    conn.execute(
+        "UPDATE ZGENERICASSET SET ZFAVORITE = 0, "
+        "ZMODIFICATIONDATE = ZMODIFICATIONDATE + 10 WHERE ZUUID = ?",
+        (updated,),
+    )
+    conn.execute(
+        "UPDATE ZGENERICASSET SET ZTRASHEDSTATE = 1 WHERE ZUUID = ?", (removed,)
+    )
+    conn.commit()
+    conn.close()
+
+    changes = photosdb.refresh()
+    assert changes == {"added": [added], "updated": [updated], "removed": [removed]}
+    assert not photosdb.photos(uuid=[updated])[0].favorite
+    # the cached result of photos() from before the refresh isn't used
+    assert added in [p.uuid for p in photosdb.photos()]
+    assert removed not in [p.uuid for p in photosdb.photos()]
+
+    photosdb2 = osxphotos.PhotosDB(library)
+    photos = {p.uuid: p.json() for p in photosdb.photos(movies=True)}
+    photos2 = {p.uuid: p.json() for p in photosdb2.photos(movies=True)}
+    assert photos == photos2
+    assert photosdb.keywords_as_dict == photosdb2.keywords_as_dict
+    assert photosdb.persons_as_dict == photosdb2.persons_as_dict
+    assert photosdb.albums_as_dict == photosdb2.albums_as_dict
+
+
 def test_os_version():
     import osxphotos
 
@@ -758,6 +1305,107 @@ def test_not_eq():
     assert photos1[0] != photos2[0]
 
 
+def test_hash():
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(dbfile=PHOTOS_DB)
+    photosdb2 = osxphotos.PhotosDB(dbfile=PHOTOS_DB)
+    photos1 = photosdb.photos(uuid=[UUID_DICT["export"]])
+    photos2 = photosdb2.photos(uuid=[UUID_DICT["export"]])
+    assert photos1[0] == photos2[0]
+    assert hash(photos1[0]) == hash(photos2[0])
+    assert len(set(photosdb.photos()) | set(photosdb2.photos())) == len(
+        photosdb.photos()
+    )
+    assert {p: p.uuid for p in photosdb.photos()}[photos2[0]] == UUID_DICT["export"]
+
+
+def test_union_difference():
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(dbfile=PHOTOS_DB)
+    kids = photosdb.photos(keywords=["Kids"])
+    katie = photosdb.photos(persons=["Katie"])
+
+    union = photosdb.union(kids, katie)
+    assert union[: len(kids)] == kids
+    assert len(union) == len(set(kids) | set(katie))
+    assert set(union) == set(kids) | set(katie)
+
+    difference = photosdb.difference(kids, katie)
+    assert difference == [p for p in kids if p not in katie]
+    assert photosdb.difference(kids, katie, kids) == []
+    assert photosdb.difference(kids) == kids
+    assert photosdb.union() == []
+
+
+def test_photoinfo_shared():
+    # queries return the same PhotoInfo object for a photo while it's in use
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(dbfile=PHOTOS_DB)
+    photo = photosdb.photos(uuid=[UUID_DICT["favorite"]])[0]
+    assert photosdb.photos(uuid=[photo.uuid], favorite=True)[0] is photo
+    assert any(p is photo for p in photosdb.photos())
+    assert not hasattr(photo, "__dict__")
+
+    # derived values are computed once and lists can't be changed by the caller
+    date = photo.date
+    assert photo.date is date
+    albums = photo.albums
+    albums.append("not an album")
+    assert photo.albums == albums[:-1]
+
+    # reading the library again (refresh() when it has changed) makes new PhotoInfo objects
+    photosdb._build_indexes()
+    assert photosdb.photos(uuid=[UUID_DICT["favorite"]])[0] is not photo
+    assert photosdb.photos(uuid=[UUID_DICT["favorite"]])[0] == photo
+
+
+def test_bursts():
+    # the test library has no burst photos so make a burst set of three photos
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(dbfile=PHOTOS_DB)
+    assert photosdb.bursts() == {}
+
+    uuids = [p.uuid for p in photosdb.photos(sort_by="date")[:3]]
+    for uuid, key in zip(uuids, [False, True, False]):
+        record = photosdb._dbphotos[uuid]
+        record.burst = True
+        record.burstUUID = "BURST"
+        record.burst_key = key
+    photosdb._dbphotos_burst = {"BURST": set(uuids)}
+    photosdb._build_indexes()
+
+    # key photo first, then the others by date
+    members = [uuids[1], uuids[0], uuids[2]]
+    bursts = photosdb.bursts()
+    assert list(bursts) == ["BURST"]
+    assert [p.uuid for p in bursts["BURST"]] == members
+
+    # photos() only returns the key photo of a burst set
+    photos = photosdb.photos(burst=True)
+    assert [p.uuid for p in photos] == [uuids[1]]
+    assert photosdb.bursts(photos) == bursts
+    assert photosdb.bursts(photosdb.photos(burst=False)) == {}
+
+    key_photo = photos[0]
+    assert key_photo.burst_key is True
+    assert key_photo.burst_key_photo is key_photo
+    assert [p.uuid for p in key_photo.burst_photos] == [uuids[0], uuids[2]]
+
+    photo = key_photo.burst_photos[0]
+    assert photo.burst_key is False
+    assert photo.burst_key_photo is key_photo
+    assert [p.uuid for p in photo.burst_photos] == [uuids[1], uuids[2]]
+
+    not_burst = photosdb.photos(burst=False)[0]
+    assert not_burst.burst_key is None
+    assert not_burst.burst_key_photo is None
+    assert not_burst.burst_photos == []
+
+
 def test_photosdb_repr():
     import osxphotos
 
@@ -779,12 +1427,10 @@ def test_photosinfo_repr():
     photo = photos[0]
     photo2 = eval(repr(photo))
 
-    assert {
-        k: str(v).encode("utf-8")
-        for k, v in photo.__dict__.items()
-    } == {
-        k: str(v).encode("utf-8")
-        for k, v in photo2.__dict__.items()
+    # PhotoInfo has __slots__; _cache only holds values computed from the others
+    attrs = ("_uuid", "_info", "_db")
+    assert {k: str(getattr(photo, k)).encode("utf-8") for k in attrs} == {
+        k: str(getattr(photo2, k)).encode("utf-8") for k in attrs
     }
 
 
@@ -803,3 +1449,467 @@ def test_from_to_date():
     photos = photosdb.photos(from_date=dt.datetime(2018, 9, 28),
                              to_date=dt.datetime(2018, 9, 29))
     assert len(photos) == 4
+
+
+def test_from_to_date_timezone():
+    # dates are kept as Photos timestamps and compared with timezone aware dates too
+    import osxphotos
+    import datetime as dt
+
+    photosdb = osxphotos.PhotosDB(PHOTOS_DB)
+    photo = photosdb.photos(uuid=[UUID_DICT["favorite"]])[0]
+    date = photo.date
+
+    assert isinstance(photo._info["imageDate"], dt.datetime)
+    assert photo._info["imageDate"].tzinfo is None
+    assert photo._info["imageDate"] == date.astimezone().replace(tzinfo=None)
+
+    photos = photosdb.photos(from_date=date, to_date=date)
+    assert [p.uuid for p in photos] == [photo.uuid]
+
+    photos = photosdb.photos(from_date=date + dt.timedelta(seconds=1))
+    assert photo.uuid not in [p.uuid for p in photos]
+
+
+def test_from_to_modified_date():
+    # last modified date ranges select the same photos as comparing each photo's date
+    import osxphotos
+    import datetime as dt
+
+    photosdb = osxphotos.PhotosDB(PHOTOS_DB)
+    photos = photosdb.photos(movies=True)
+    modified = sorted({p._info["lastmodifieddate"] for p in photos})
+    middle = modified[len(modified) // 2]
+
+    for (from_date, to_date) in [
+        (middle, None),
+        (None, middle),
+        (modified[0], modified[-1]),
+        (middle, middle),
+        (modified[-1] + dt.timedelta(days=1), None),
+    ]:
+        got = photosdb.photos(
+            movies=True, from_modified_date=from_date, to_modified_date=to_date
+        )
+        assert sorted(p.uuid for p in got) == sorted(
+            p.uuid
+            for p in photos
+            if (from_date is None or p._info["lastmodifieddate"] >= from_date)
+            and (to_date is None or p._info["lastmodifieddate"] <= to_date)
+        )
+
+    assert photosdb.photos(from_modified_date=modified[-1] + dt.timedelta(days=1)) == []
+    assert photosdb.photos(
+        movies=True, from_modified_date=middle, to_modified_date=middle
+    )
+
+
+def test_search():
+    # text search selects the same photos as looking for the words in each photo's text
+    import re
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(PHOTOS_DB)
+    photos = photosdb.photos(movies=True)
+
+    def words(p):
+        texts = [p.title, p.description] + p.keywords + p.persons + p.albums
+        return [re.findall(r"\w+", t.casefold()) for t in texts if t]
+
+    for text in ["pumpkin", "KIDS", "katie girl", "pump*", '"test album"']:
+        terms = re.findall(r"\w+", text.casefold())
+        if text.endswith("*"):
+            expected = [
+                p
+                for p in photos
+                if any(w.startswith(terms[0]) for ws in words(p) for w in ws)
+            ]
+        elif text.startswith('"'):
+            expected = [p for p in photos if terms in words(p)]
+        else:
+            expected = [
+                p
+                for p in photos
+                if all(any(t in ws for ws in words(p)) for t in terms)
+            ]
+        got = photosdb.search(text, movies=True)
+        assert sorted(p.uuid for p in got) == sorted(p.uuid for p in expected)
+        assert got
+
+    assert photosdb.search('"pumpkin girl"') == []
+    assert photosdb.search("pumpkin nosuchword") == []
+    assert photosdb.photos(keywords=["Kids"], text="nosuchword") == []
+
+
+def test_query_expression():
+    # query expressions select the same photos as the equivalent set operations
+    import pytest
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(PHOTOS_DB)
+    photos = photosdb.photos(movies=True)
+    all_uuids = {p.uuid for p in photos}
+
+    def uuids(**kwargs):
+        return {p.uuid for p in photosdb.photos(movies=True, **kwargs)}
+
+    kids = uuids(keywords=["Kids"])
+    katie = uuids(persons=["Katie"])
+    pumpkin_farm = uuids(albums=["Pumpkin Farm"])
+    favorite = uuids(favorite=True)
+
+    for (expr, expected) in [
+        ("keyword:Kids", kids),
+        ("keyword:Kids AND person:Katie", kids & katie),
+        ("keyword:Kids person:Katie", kids & katie),
+        ('person:Katie OR album:"Pumpkin Farm"', katie | pumpkin_farm),
+        ("keyword:Kids AND NOT favorite", kids - favorite),
+        ("NOT keyword:Kids", all_uuids - kids),
+        ('not (keyword:Kids or album:"Pumpkin Farm")', all_uuids - kids - pumpkin_farm),
+        (
+            'keyword:Kids AND (person:Katie OR album:"Pumpkin Farm") AND NOT hidden',
+            kids & (katie | pumpkin_farm) - uuids(hidden=True),
+        ),
+        ("favorite AND NOT favorite", set()),
+        ("keyword:nosuchkeyword OR keyword:Kids", kids),
+        ("keyword:nosuchkeyword", set()),
+    ]:
+        assert {p.uuid for p in photosdb.query(expr, movies=True)} == expected
+
+    for expr in ["", "keyword:Kids AND", "(keyword:Kids", "color:red", "nosuchflag"]:
+        with pytest.raises(ValueError):
+            photosdb.query(expr)
+
+
+def test_get_photo():
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(dbfile=PHOTOS_DB)
+    for photo in photosdb.photos(movies=True):
+        assert photosdb.get_photo(photo.uuid) == photo
+        assert photosdb.get_photo(photo.uuid).json() == photo.json()
+    assert photosdb.get_photo("not a uuid") is None
+
+
+def test_query_cache():
+    # the same query asked again is answered from the cache until the library changes
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(PHOTOS_DB, query_cache_size=2)
+    info = photosdb.query_cache_info()
+    assert (info.hits, info.misses, info.maxsize, info.currsize) == (0, 0, 2, 0)
+
+    photos = photosdb.photos(keywords=["Kids", "wedding"], favorite=False)
+    assert photosdb.query_cache_info().misses == 1
+    photos2 = photosdb.photos(keywords=["wedding", "Kids"], favorite=False)
+    assert [p.uuid for p in photos2] == [p.uuid for p in photos]
+    assert photosdb.query_cache_info().hits == 1
+
+    # a partly read iter_photos() isn't cached
+    next(photosdb.iter_photos(movies=True))
+    assert photosdb.query_cache_info().currsize == 1
+
+    photosdb.photos(persons=["Katie"])
+    photosdb.photos(albums=["Pumpkin Farm"])
+    info = photosdb.query_cache_info()
+    assert (info.hits, info.misses, info.currsize) == (1, 4, 2)
+
+    # least recently used result was dropped
+    photosdb.photos(keywords=["Kids", "wedding"], favorite=False)
+    assert photosdb.query_cache_info().misses == 5
+
+    photosdb.query_cache_clear()
+    assert photosdb.query_cache_info().currsize == 0
+
+    photosdb = osxphotos.PhotosDB(PHOTOS_DB, query_cache_size=0)
+    photosdb.photos()
+    photosdb.photos()
+    info = photosdb.query_cache_info()
+    assert (info.hits, info.misses, info.currsize) == (0, 0, 0)
+
+
+def test_query_cache_maxuuids():
+    # the cache holds at most maxuuids uuids across all its results
+    from osxphotos._querycache import _QueryCache
+
+    cache = _QueryCache(10, maxuuids=5)
+    cache.put("a", ("1", "2"), cache.generation)
+    cache.put("b", ("3", "4", "5"), cache.generation)
+    assert len(cache) == 2
+
+    # a result bigger than maxuuids isn't held
+    cache.put("c", tuple("abcdef"), cache.generation)
+    assert cache.get("c") is None
+    assert len(cache) == 2
+
+    # the least recently used results are dropped to make room
+    cache.get("a")
+    cache.put("d", ("6", "7"), cache.generation)
+    assert cache.get("b") is None
+    assert cache.get("a") == ("1", "2")
+    assert cache.get("d") == ("6", "7")
+
+    # replacing a result counts only the new one
+    cache.put("d", ("8",), cache.generation)
+    cache.put("e", ("9", "10"), cache.generation)
+    assert len(cache) == 3
+
+
+def test_photos_near_bbox():
+    # location queries select the same photos as checking each photo's location
+    import math
+    import pytest
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(PHOTOS_DB)
+    photos = [p for p in photosdb.photos(movies=True) if p._latitude is not None]
+    assert photos
+    lat, lon = photosdb.photos(uuid=[UUID_DICT["location"]])[0].location
+
+    def distance(p):
+        a = math.radians(lat), math.radians(lon)
+        b = math.radians(p._latitude), math.radians(p._longitude)
+        h = (
+            math.sin((b[0] - a[0]) / 2) ** 2
+            + math.cos(a[0]) * math.cos(b[0]) * math.sin((b[1] - a[1]) / 2) ** 2
+        )
+        return 2 * 6371.0088 * math.asin(math.sqrt(h))
+
+    for radius in [0, 1, 100, 20000]:
+        got = photosdb.photos_near(lat, lon, radius, movies=True)
+        assert [p.uuid for p in got] == [
+            p.uuid for p in sorted(photos, key=distance) if distance(p) <= radius
+        ]
+    # a page of the nearest photos is the same as slicing all of them
+    nearest = [p.uuid for p in photosdb.photos_near(lat, lon, 20000, movies=True)]
+    for (limit, offset) in [(0, 0), (1, 0), (2, 1), (100, 2)]:
+        got = photosdb.photos_near(
+            lat, lon, 20000, movies=True, limit=limit, offset=offset
+        )
+        assert [p.uuid for p in got] == nearest[offset : offset + limit]
+    with pytest.raises(ValueError):
+        photosdb.photos_near(lat, lon, 1, limit=-1)
+    assert UUID_DICT["location"] in [p.uuid for p in photosdb.photos_near(lat, lon, 0)]
+    assert photosdb.photos_near(-lat, lon + 180 if lon < 0 else lon - 180, 100) == []
+
+    got = photosdb.photos_in_bbox(lat - 1, lon - 1, lat + 1, lon + 1, movies=True)
+    assert sorted(p.uuid for p in got) == sorted(
+        p.uuid
+        for p in photos
+        if lat - 1 <= p._latitude <= lat + 1 and lon - 1 <= p._longitude <= lon + 1
+    )
+    assert UUID_DICT["location"] in [p.uuid for p in got]
+    # box across the 180th meridian that doesn't contain the photo
+    assert (
+        photosdb.photos_in_bbox(
+            lat - 1, lon + 1, lat + 1, lon - 1, uuid=[UUID_DICT["location"]]
+        )
+        == []
+    )
+    # photos without a location are never found
+    assert (
+        photosdb.photos_in_bbox(-90, -180, 90, 180, uuid=[UUID_DICT["no_location"]])
+        == []
+    )
+
+    with pytest.raises(ValueError):
+        photosdb.photos_near(91, 0, 1)
+    with pytest.raises(ValueError):
+        photosdb.photos_near(0, 0, -1)
+    with pytest.raises(ValueError):
+        photosdb.photos_in_bbox(10, 0, 0, 10)
+
+
+def test_photos_sort_limit_offset():
+    # sorted pages are the same as sorting all the photos and slicing them
+    import pytest
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(PHOTOS_DB)
+    photos = photosdb.photos(movies=True)
+
+    def expected(key, descending):
+        # photos without a value last, ties in the order the photos were read
+        def sort_key(p):
+            value = key(p)
+            missing = value is None if not descending else value is not None
+            return (missing, value if value is not None else 0, p._asset_id)
+
+        return [p.uuid for p in sorted(photos, key=sort_key, reverse=descending)]
+
+    for (sort_by, key) in [
+        ("date", lambda p: p.date),
+        ("modified_date", lambda p: p._info["lastmodifieddate"]),
+        ("title", lambda p: p.title.casefold() if p.title else None),
+        ("filename", lambda p: p.filename.casefold()),
+        ("uuid", lambda p: p.uuid),
+    ]:
+        for descending in [False, True]:
+            all_sorted = expected(key, descending)
+            got = photosdb.photos(movies=True, sort_by=sort_by, descending=descending)
+            assert [p.uuid for p in got] == all_sorted
+            for (limit, offset) in [(1, 0), (3, 0), (3, 2), (100, 0), (0, 0), (None, 4)]:
+                got = photosdb.photos(
+                    movies=True,
+                    sort_by=sort_by,
+                    descending=descending,
+                    limit=limit,
+                    offset=offset,
+                )
+                end = offset + limit if limit is not None else None
+                assert [p.uuid for p in got] == all_sorted[offset:end]
+
+    # limit and offset without sort_by page through the unsorted photos
+    uuids = [p.uuid for p in photos]
+    assert [p.uuid for p in photosdb.photos(movies=True, limit=2, offset=1)] == uuids[1:3]
+
+    # a few photos out of many: the date index is read newest first
+    kids = photosdb.photos(keywords=["Kids"], sort_by="date", descending=True, limit=1)
+    assert kids[0].date == max(p.date for p in photosdb.photos(keywords=["Kids"]))
+
+    with pytest.raises(ValueError):
+        photosdb.photos(sort_by="size")
+    with pytest.raises(ValueError):
+        photosdb.photos(limit=-1)
+    with pytest.raises(ValueError):
+        photosdb.photos(offset=-1)
+
+
+def test_count_and_count_by():
+    # counts are the same as counting the PhotoInfo objects
+    import collections
+    import pytest
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(PHOTOS_DB)
+    photos = photosdb.photos(movies=True)
+
+    assert photosdb.count() == len(photosdb.photos())
+    assert photosdb.count(movies=True) == len(photos)
+    assert photosdb.count(images=False, movies=True) == len(
+        [p for p in photos if p.ismovie]
+    )
+    assert photosdb.count(keywords=["Kids"], favorite=False) == len(
+        photosdb.photos(keywords=["Kids"], favorite=False)
+    )
+    assert photosdb.count(movies=True, limit=2) == 2
+    assert photosdb.count(movies=True, offset=len(photos) - 1, limit=5) == 1
+    assert photosdb.count(keywords=["not a keyword"]) == 0
+
+    date = sorted(p.date for p in photos)[len(photos) // 2]
+    for kwargs in [
+        {"from_date": date},
+        {"from_date": date, "favorite": False},
+        {"keywords": ["Kids"], "to_date": date},
+        {"keywords": ["Kids", "not a keyword"], "hidden": False},
+        {"text": "wedding", "movies": True},
+        {"where": "favorite OR keyword:Kids", "movies": True},
+        {"burst": True},
+    ]:
+        assert photosdb.count(**kwargs) == len(photosdb.photos(**kwargs))
+
+    # counts are made from the indexes, not the query cache
+    photosdb.query_cache_clear()
+    info = photosdb.query_cache_info()
+    photosdb.count(favorite=True)
+    photosdb.count_by("keyword", movies=True)
+    assert photosdb.query_cache_info() == info
+
+    for (group_by, values) in [
+        ("year", lambda p: [p.date.year]),
+        ("month", lambda p: [p.date.strftime("%Y-%m")]),
+        ("type", lambda p: ["movie" if p.ismovie else "photo"]),
+        ("uti", lambda p: [p.uti]),
+        ("keyword", lambda p: p.keywords),
+        ("person", lambda p: p.persons),
+        ("album", lambda p: set(p.albums)),
+        ("favorite", lambda p: [bool(p.favorite)]),
+        ("hidden", lambda p: [bool(p.hidden)]),
+        ("shared", lambda p: [bool(p.shared)]),
+    ]:
+        expected = collections.Counter(v for p in photos for v in values(p))
+        got = photosdb.count_by(group_by, movies=True)
+        assert got == dict(expected)
+        if group_by in ("year", "month"):
+            assert list(got) == sorted(got)
+        else:
+            assert list(got.values()) == sorted(got.values(), reverse=True)
+
+    assert photosdb.count_by("keyword", keywords=["Kids"])["Kids"] == len(
+        photosdb.photos(keywords=["Kids"])
+    )
+
+    with pytest.raises(ValueError):
+        photosdb.count_by("size")
+
+
+@pytest.mark.parametrize("use_orjson", [False, True])
+def test_write_json(monkeypatch, use_orjson):
+    import io
+    import json
+    import osxphotos
+    import osxphotos._jsonwriter
+    from osxphotos._jsonwriter import _ORJSON_AVAILABLE, _write_json
+
+    if use_orjson and not _ORJSON_AVAILABLE:
+        pytest.skip("orjson is not installed")
+
+    photosdb = osxphotos.PhotosDB(dbfile=PHOTOS_DB)
+    photos = photosdb.photos()
+    expected = [json.loads(p.json()) for p in photos]
+
+    output = io.BytesIO()
+    assert _write_json(photos, output, use_orjson=use_orjson) == len(photos)
+    assert json.loads(output.getvalue()) == expected
+    # compact, with non-ASCII characters written as UTF-8, whether or not orjson is used
+    compact = json.dumps(
+        [p._json_dict() for p in photos], separators=(",", ":"), ensure_ascii=False
+    )
+    assert output.getvalue() == (compact + "\n").encode("utf-8")
+
+    # more photos than fit in one batch
+    monkeypatch.setattr(osxphotos._jsonwriter, "_BATCH_SIZE", 2)
+    output = io.BytesIO()
+    assert _write_json(photos, output, use_orjson=use_orjson) == len(photos)
+    assert json.loads(output.getvalue()) == expected
+
+    output = io.BytesIO()
+    assert _write_json(photos, output, ndjson=True, use_orjson=use_orjson) == len(
+        photos
+    )
+    lines = output.getvalue().decode("utf-8").splitlines()
+    assert [json.loads(line) for line in lines] == expected
+
+    output = io.BytesIO()
+    assert _write_json([], output, use_orjson=use_orjson) == 0
+    assert json.loads(output.getvalue()) == []
+
+
+def test_write_json_same_output():
+    # the output is byte for byte the same with or without orjson
+    import io
+    import pathlib
+    from osxphotos._jsonwriter import _ORJSON_AVAILABLE, _write_json
+
+    if not _ORJSON_AVAILABLE:
+        pytest.skip("orjson is not installed")
+
+    class Photo:
+        def __init__(self, **values):
+            self._values = values
+
+        def _json_dict(self):
+            return self._values
+
+    photos = [
+        Photo(title="Café ☕", keywords=["Kids", "naïve"], path=pathlib.Path("/a/b.jpg")),
+        Photo(title='quote " and \\ and \n', latitude=-33.8688, hidden=False),
+        Photo(title=None, persons=[], longitude=151.2093, uuid="A" * 36),
+    ]
+    for ndjson in [False, True]:
+        outputs = []
+        for use_orjson in [False, True]:
+            output = io.BytesIO()
+            _write_json(photos, output, ndjson=ndjson, use_orjson=use_orjson)
+            outputs.append(output.getvalue())
+        assert outputs[0] == outputs[1]
@@ -124,4 +124,235 @@ def test_query_date():
     assert result.exit_code == 0
 
     json_got = json.loads(result.output)
-    assert len(json_got) == 4
\ No newline at end of file
+    assert len(json_got) == 4
+
+
+def test_dump_json():
+    import json
+    import osxphotos
+    from osxphotos.__main__ import cli
+
+    runner = CliRunner()
+    result = runner.invoke(
+        cli, ["--json", "dump", "./tests/Test-10.15.1.photoslibrary"]
+    )
+    assert result.exit_code == 0
+
+    photosdb = osxphotos.PhotosDB("./tests/Test-10.15.1.photoslibrary")
+    json_got = json.loads(result.output)
+    assert sorted(p["uuid"] for p in json_got) == sorted(
+        p.uuid for p in photosdb.photos(movies=True)
+    )
+
+
+def test_query_keyword_not_favorite():
+    import json
+    import osxphotos
+    from osxphotos.__main__ import query
+
+    runner = CliRunner()
+    result = runner.invoke(
+        query,
+        [
+            "--json",
+            "--db",
+            "./tests/Test-10.15.1.photoslibrary",
+            "--keyword",
+            "Kids",
+            "--not-favorite",
+        ],
+    )
+    assert result.exit_code == 0
+
+    photosdb = osxphotos.PhotosDB("./tests/Test-10.15.1.photoslibrary")
+    json_got = json.loads(result.output)
+    assert sorted(p["uuid"] for p in json_got) == sorted(
+        p.uuid for p in photosdb.photos(keywords=["Kids"]) if not p.favorite
+    )
+    assert json_got
+
+
+def test_query_text():
+    import json
+    import osxphotos
+    from osxphotos.__main__ import query
+
+    runner = CliRunner()
+    result = runner.invoke(
+        query,
+        [
+            "--json",
+            "--db",
+            "./tests/Test-10.15.1.photoslibrary",
+            "--text",
+            "pumpkin",
+            "--text",
+            "kids",
+        ],
+    )
+    assert result.exit_code == 0
+
+    photosdb = osxphotos.PhotosDB("./tests/Test-10.15.1.photoslibrary")
+    json_got = json.loads(result.output)
+    assert sorted(p["uuid"] for p in json_got) == sorted(
+        p.uuid for p in photosdb.search("pumpkin kids", movies=True)
+    )
+    assert json_got
+
+
+def test_query_where():
+    import json
+    import osxphotos
+    from osxphotos.__main__ import query
+
+    runner = CliRunner()
+    result = runner.invoke(
+        query,
+        [
+            "--json",
+            "--db",
+            "./tests/Test-10.15.1.photoslibrary",
+            "--where",
+            'keyword:Kids AND NOT album:"Pumpkin Farm"',
+        ],
+    )
+    assert result.exit_code == 0
+
+    photosdb = osxphotos.PhotosDB("./tests/Test-10.15.1.photoslibrary")
+    json_got = json.loads(result.output)
+    assert sorted(p["uuid"] for p in json_got) == sorted(
+        p.uuid
+        for p in photosdb.photos(keywords=["Kids"], movies=True)
+        if "Pumpkin Farm" not in p.albums
+    )
+    assert json_got
+
+    result = runner.invoke(
+        query,
+        ["--db", "./tests/Test-10.15.1.photoslibrary", "--where", "keyword:Kids AND"],
+    )
+    assert result.exit_code != 0
+
+
+def test_query_near():
+    import json
+    import osxphotos
+    from osxphotos.__main__ import query
+
+    photosdb = osxphotos.PhotosDB("./tests/Test-10.15.1.photoslibrary")
+    lat, lon = photosdb.photos(uuid=["DC99FBDD-7A52-4100-A5BB-344131646C30"])[0].location
+
+    runner = CliRunner()
+    result = runner.invoke(
+        query,
+        [
+            "--json",
+            "--db",
+            "./tests/Test-10.15.1.photoslibrary",
+            "--near",
+            str(lat),
+            str(lon),
+            "1",
+        ],
+    )
+    assert result.exit_code == 0
+
+    json_got = json.loads(result.output)
+    assert sorted(p["uuid"] for p in json_got) == sorted(
+        p.uuid for p in photosdb.photos_near(lat, lon, 1, movies=True)
+    )
+    assert "DC99FBDD-7A52-4100-A5BB-344131646C30" in [p["uuid"] for p in json_got]
+
+
+@pytest.mark.parametrize(
+    "args,kwargs",
+    [
+        (["--keyword", "NOPE", "--text", "wedding"], {"keywords": ["NOPE"], "text": "wedding"}),
+        (["--uuid", "NOPE", "--text", "wedding"], {"uuid": ["NOPE"], "text": "wedding"}),
+        (["--keyword", "NOPE", "--where", "favorite"], {"keywords": ["NOPE"], "where": "favorite"}),
+        (
+            ["--keyword", "NOPE", "--near", "0", "0", "20000"],
+            {"keywords": ["NOPE"], "near": (0, 0, 20000)},
+        ),
+        (
+            ["--person", "NOPE", "--bbox", "-90", "-180", "90", "180"],
+            {"persons": ["NOPE"], "bbox": (-90, -180, 90, 180)},
+        ),
+    ],
+)
+def test_query_prefilter_not_found(args, kwargs):
+    # the prefilter reads the photos a full load finds when a keyword, etc. isn't in
+    # the library but other filters are given
+    import json
+    import osxphotos
+    from osxphotos.__main__ import query
+
+    photosdb = osxphotos.PhotosDB("./tests/Test-10.15.1.photoslibrary")
+    expected = [p.uuid for p in photosdb.photos(movies=True, **kwargs)]
+    assert expected
+
+    runner = CliRunner()
+    for prefilter in [[], ["--prefilter"]]:
+        result = runner.invoke(
+            query,
+            ["--json", "--db", "./tests/Test-10.15.1.photoslibrary"] + prefilter + args,
+        )
+        assert result.exit_code == 0
+        json_got = json.loads(result.output)
+        assert sorted(p["uuid"] for p in json_got) == sorted(expected)
+
+
+def test_query_sort_limit():
+    import json
+    import osxphotos
+    from osxphotos.__main__ import query
+
+    runner = CliRunner()
+    result = runner.invoke(
+        query,
+        [
+            "--json",
+            "--db",
+            "./tests/Test-10.15.1.photoslibrary",
+            "--keyword",
+            "Kids",
+            "--sort-by",
+            "date",
+            "--descending",
+            "--limit",
+            "2",
+        ],
+    )
+    assert result.exit_code == 0
+
+    photosdb = osxphotos.PhotosDB("./tests/Test-10.15.1.photoslibrary")
+    json_got = json.loads(result.output)
+    assert [p["uuid"] for p in json_got] == [
+        p.uuid
+        for p in photosdb.photos(
+            keywords=["Kids"], movies=True, sort_by="date", descending=True, limit=2
+        )
+    ]
+    assert len(json_got) == 2
+
+
+def test_info():
+    import json
+    import osxphotos
+    from osxphotos.__main__ import cli
+
+    runner = CliRunner()
+    result = runner.invoke(
+        cli, ["info", "--json", "--db", "./tests/Test-10.15.1.photoslibrary"]
+    )
+    assert result.exit_code == 0
+
+    photosdb = osxphotos.PhotosDB("./tests/Test-10.15.1.photoslibrary")
+    photos = photosdb.photos()
+    movies = photosdb.photos(images=False, movies=True)
+    info = json.loads(result.output)
+    assert info["photo_count"] == len([p for p in photos if not p.shared])
+    assert info["hidden_photo_count"] == len([p for p in photos if p.hidden])
+    assert info["movie_count"] == len([p for p in movies if not p.shared])
+    assert info["shared_photo_count"] == len([p for p in photos if p.shared])
+    assert info["shared_movie_count"] == len([p for p in movies if p.shared])
@@ -51,6 +51,193 @@ def test_db_version():
     assert photosdb.db_version == "4025"
 
 
+def test_db_open_mode():
+    # empty write-ahead log so database can be read in place as immutable if requested
+    # (on a copy of the library so the test library isn't changed)
+    import pathlib
+    import shutil
+    import tempfile
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(dbfile=PHOTOS_DB)
+    assert photosdb.db_open_mode == "copy"
+
+    tempdir = tempfile.TemporaryDirectory(prefix="osxphotos_")
+    library = pathlib.Path(tempdir.name) / "Test.photoslibrary"
+    shutil.copytree(pathlib.Path(PHOTOS_DB).parent, library / "database")
+    photosdb2 = osxphotos.PhotosDB(library, copy_db=False)
+    assert photosdb2.db_open_mode == "readonly"
+    photosdb2 = osxphotos.PhotosDB(library, copy_db=False, immutable=True)
+    assert photosdb2.db_open_mode == "immutable"
+    assert len(photosdb2.photos()) == len(photosdb.photos())
+
+
+def test_loader_parallel():
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(dbfile=PHOTOS_DB)
+    photosdb2 = osxphotos.PhotosDB(dbfile=PHOTOS_DB, loader="parallel")
+
+    assert photosdb._dbphotos == photosdb2._dbphotos
+    assert photosdb.keywords_as_dict == photosdb2.keywords_as_dict
+    assert photosdb.persons_as_dict == photosdb2.persons_as_dict
+    assert photosdb.albums_as_dict == photosdb2.albums_as_dict
+
+
+def test_photos_columns():
+    # photos() returns the same photos with or without the NumPy column store
+    import datetime
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(dbfile=PHOTOS_DB)
+    if photosdb._columns is None:
+        pytest.skip("NumPy not installed")
+    columns = photosdb._columns
+    date = datetime.datetime(2018, 10, 28)
+    for kwargs in [
+        {},
+        {"movies": True},
+        {"images": False, "movies": True},
+        {"from_date": date},
+        {"to_date": date},
+        {"keywords": ["Kids"], "from_date": date},
+        {"persons": ["Katie"], "keywords": ["foo"]},
+        {"uuid": [UUID_DICT["favorite"]]},
+    ]:
+        photosdb._columns = columns
+        uuids = sorted(p.uuid for p in photosdb.photos(**kwargs))
+        photosdb._columns = None
+        assert uuids == sorted(p.uuid for p in photosdb.photos(**kwargs))
+
+
+def test_refresh():
+    # refresh() re-reads only added, changed, or removed photos
+    import pathlib
+    import shutil
+    import sqlite3
+    import tempfile
+    import osxphotos
+
+    tempdir = tempfile.TemporaryDirectory(prefix="osxphotos_")
+    library = pathlib.Path(tempdir.name) / "Test.photoslibrary"
+    shutil.copytree(pathlib.Path(PHOTOS_DB).parent, library / "database")
+    photos_db = library / "database" / "photos.db"
+
+    added = "15uNd7%8RguTEgNPKHfTWw"
+    updated = "6bxcNnzRQKGnK4uPrCJ9UQ"
+    removed = "HrK3ZQdlQ7qpDA0FgOYXLA"
+
+    # the library's triggers call functions only Photos provides
+    conn = sqlite3.connect(photos_db)
+    triggers = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger'"
+    ).fetchall()
+    for (trigger,) in triggers:
+        conn.execute(f'DROP TRIGGER "{trigger}"')
+    conn.execute("UPDATE RKVersion SET isInTrash = 1 WHERE uuid = ?", (added,))
+    conn.commit()
+    conn.close()
+
+    photosdb = osxphotos.PhotosDB(library)
+    assert added not in [p.uuid for p in photosdb.photos()]
+    assert photosdb.refresh() == {"added": [], "updated": [], "removed": []}
+
+    conn = sqlite3.connect(photos_db)
+    conn.execute("UPDATE RKVersion SET isInTrash = 0 WHERE uuid = ?", (added,))
+    conn.execute(
+        "UPDATE RKVersion SET isFavorite = 0, "
+        "lastmodifieddate = lastmodifieddate + 10 WHERE uuid = ?",
+        (updated,),
+    )
+    conn.execute("UPDATE RKVersion SET isInTrash = 1 WHERE uuid = ?", (removed,))
+    conn.commit()
+    conn.close()
+
+    changes = photosdb.refresh()
+    assert changes == {"added": [added], "updated": [updated], "removed": [removed]}
+    assert not photosdb.photos(uuid=[updated])[0].favorite
+
+    photosdb2 = osxphotos.PhotosDB(library)
+    photos = {p.uuid: p.json() for p in photosdb.photos(movies=True)}
+    photos2 = {p.uuid: p.json() for p in photosdb2.photos(movies=True)}
+    assert photos == photos2
+    assert photosdb.keywords_as_dict == photosdb2.keywords_as_dict
+    assert photosdb.persons_as_dict == photosdb2.persons_as_dict
+    assert photosdb.albums_as_dict == photosdb2.albums_as_dict
+
+
+def test_prefilter():
+    # only the photos matching the prefilter are read from the database
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(dbfile=PHOTOS_DB)
+    for prefilter in [
+        {"favorite": True},
+        {"persons": ["Katie"], "hidden": False},
+        {"images": False, "movies": True},
+        {"description": ["pumpkin"], "ignore_case": True},
+    ]:
+        photosdb2 = osxphotos.PhotosDB(dbfile=PHOTOS_DB, prefilter=prefilter)
+        expected = photosdb.photos(
+            persons=prefilter.get("persons"),
+            images=prefilter.get("images", True),
+            movies=prefilter.get("movies", False),
+        )
+        for flag in ["favorite", "hidden"]:
+            if flag in prefilter:
+                expected = [p for p in expected if getattr(p, flag) == prefilter[flag]]
+        if "description" in prefilter:
+            expected = [
+                p
+                for p in expected
+                if p.description and "pumpkin" in p.description.lower()
+            ]
+        got = [p.uuid for p in photosdb2.photos(movies=True)]
+        assert sorted(got) == sorted(p.uuid for p in expected)
+        # in the same order as when all the photos are read
+        assert got == [p.uuid for p in photosdb.photos(movies=True) if p.uuid in got]
+
+
+def test_refresh_prefilter():
+    # refresh() adds and removes photos as they start or stop matching the prefilter
+    import pathlib
+    import shutil
+    import sqlite3
+    import tempfile
+    import osxphotos
+
+    tempdir = tempfile.TemporaryDirectory(prefix="osxphotos_")
+    library = pathlib.Path(tempdir.name) / "Test.photoslibrary"
+    shutil.copytree(pathlib.Path(PHOTOS_DB).parent, library / "database")
+    photos_db = library / "database" / "photos.db"
+
+    favorite = UUID_DICT["favorite"]
+    not_favorite = "15uNd7%8RguTEgNPKHfTWw"
+
+    photosdb = osxphotos.PhotosDB(library, prefilter={"favorite": True})
+    assert [p.uuid for p in photosdb.photos()] == [favorite]
+
+    # the library's triggers call functions only Photos provides
+    conn = sqlite3.connect(photos_db)
+    triggers = conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger'"
+    ).fetchall()
+    for (trigger,) in triggers:
+        conn.execute(f'DROP TRIGGER "{trigger}"')
+    for (uuid, value) in [(favorite, 0), (not_favorite, 1)]:
+        conn.execute(
+            "UPDATE RKVersion SET isFavorite = ?, "
+            "lastmodifieddate = lastmodifieddate + 10 WHERE uuid = ?",
+            (value, uuid),
+        )
+    conn.commit()
+    conn.close()
+
+    changes = photosdb.refresh()
+    assert changes == {"added": [not_favorite], "updated": [], "removed": [favorite]}
+    assert [p.uuid for p in photosdb.photos()] == [not_favorite]
+
+
 def test_os_version():
     import osxphotos
 
@@ -351,6 +538,8 @@ def test_photosinfo_repr():
     photo = photos[0]
     photo2 = eval(repr(photo))
 
-    assert {k: str(v).encode("utf-8") for k, v in photo.__dict__.items()} == {
-        k: str(v).encode("utf-8") for k, v in photo2.__dict__.items()
+    # PhotoInfo has __slots__; _cache only holds values computed from the others
+    attrs = ("_uuid", "_info", "_db")
+    assert {k: str(getattr(photo, k)).encode("utf-8") for k in attrs} == {
+        k: str(getattr(photo2, k)).encode("utf-8") for k in attrs
     }
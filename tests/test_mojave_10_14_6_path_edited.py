@@ -38,3 +38,34 @@ def test_path_edited2():
     path = p.path_edited
     assert path.endswith("resources/media/version/00/02/fullsizeoutput_9.jpeg")
     assert os.path.exists(path)
+
+
+def test_path_edited_resource_index(monkeypatch):
+    # edited paths are found with one scan of resources/media/version and memoized
+    import os
+    import osxphotos
+
+    scanned = []
+    scandir = os.scandir
+
+    def counting_scandir(path):
+        scanned.append(path)
+        return scandir(path)
+
+    monkeypatch.setattr(os, "scandir", counting_scandir)
+
+    photosdb = osxphotos.PhotosDB(dbfile=PHOTOS_DB)
+    paths = {p.uuid: p.path_edited for p in photosdb.photos()}
+    assert paths[UUID_DICT["standard_00_path"]].endswith(
+        "resources/media/version/00/00/fullsizeoutput_d.jpeg"
+    )
+    assert paths[UUID_DICT["non_00_path"]].endswith(
+        "resources/media/version/00/02/fullsizeoutput_9.jpeg"
+    )
+    version = [path for path in scanned if "version" in path]
+    assert len(version) == len(set(version))
+
+    # asking again doesn't scan the folders again
+    scanned.clear()
+    assert {p.uuid: p.path_edited for p in photosdb.photos()} == paths
+    assert not scanned
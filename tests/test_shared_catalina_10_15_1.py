@@ -105,3 +105,16 @@ def test_query_shared_album():
     assert len(photos) == len(UUID_SHARED)
     for p in photos:
         assert p.uuid in UUID_SHARED
+
+
+def test_album_listings_not_shared_with_caller():
+    # album listings come from a persistent index; changing a returned listing
+    # must not change what the next call returns
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(dbfile=PHOTOS_DB)
+    photosdb.albums.append("Not an album")
+    photosdb.albums_shared_as_dict[ALBUMS_SHARED[0]] = 0
+    assert photosdb.albums == ALBUMS
+    assert photosdb.albums_shared_as_dict[ALBUMS_SHARED[0]] == 2
+    assert photosdb.photos(albums=["Not an album"]) == []